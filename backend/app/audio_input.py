@@ -0,0 +1,228 @@
+import os
+import struct
+import time
+from math import gcd
+from typing import List
+
+import numpy as np
+
+from app.metrics import observe
+from app.transcription import MAX_SEGMENT_S, SAMPLE_RATE
+from app.vad import SpeechSegment, SpeechSegmenter
+
+AUDIO_TARGET_PEAK = float(os.getenv("AUDIO_TARGET_PEAK", "0.9"))  # peak after normalization, of full scale
+AUDIO_MAX_GAIN = float(os.getenv("AUDIO_MAX_GAIN", "10"))  # quiet uploads are boosted at most 20 dB
+
+RAW_ENCODINGS = {"s16le": ("<i2", 1 / 32768), "f32le": ("<f4", 1.0)}
+
+_WAVE_PCM = 1
+_WAVE_FLOAT = 3
+_WAVE_EXTENSIBLE = 0xFFFE
+
+
+class AudioFormatError(ValueError):
+    """The upload is not audio this pipeline can decode."""
+
+
+def _wav_data(view: memoryview):
+    """(format tag, channels, sample rate, bits per sample, sample bytes) of a RIFF/WAVE buffer.
+
+    Walks the chunks in place; the sample bytes are a slice of `view`.
+    """
+    fmt = None
+    position = 12
+    while position + 8 <= len(view):
+        chunk_id = view[position:position + 4].tobytes()
+        size, = struct.unpack_from("<I", view, position + 4)
+        body = view[position + 8:position + 8 + size]
+        if chunk_id == b"fmt ":
+            if len(body) < 16:
+                raise AudioFormatError("WAV fmt chunk is too short")
+            tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", body)
+            if tag == _WAVE_EXTENSIBLE and len(body) >= 26:
+                tag, = struct.unpack_from("<H", body, 24)  # first bytes of the subformat GUID
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise AudioFormatError("WAV data chunk comes before the fmt chunk")
+            # Recorders that stream a WAV write the header before they know its size
+            return fmt + (body if size not in (0, 0xFFFFFFFF) else view[position + 8:],)
+        position += 8 + size + (size & 1)
+    raise AudioFormatError("WAV has no fmt and data chunks")
+
+
+def _wav_dtype(tag: int, bits: int):
+    """(numpy dtype, scale to [-1, 1], offset) for a WAV sample format; 24-bit is widened separately."""
+    if tag == _WAVE_PCM:
+        if bits == 8:
+            return "u1", 1 / 128, -128.0
+        if bits in (16, 24, 32):
+            return {16: "<i2", 24: "<i4", 32: "<i4"}[bits], 1 / 2 ** (bits - 1), 0.0
+    elif tag == _WAVE_FLOAT and bits in (32, 64):
+        return ("<f4" if bits == 32 else "<f8"), 1.0, 0.0
+    raise AudioFormatError(f"Unsupported WAV sample format {tag} with {bits} bits")
+
+
+def _widen_int24(data: memoryview) -> np.ndarray:
+    """Packed little-endian 24-bit samples as int32 holding value << 8."""
+    count = len(data) // 3
+    samples = np.empty(count, dtype=np.int32)
+    if count:
+        # An int32 read at every third byte has a sample in its low three bytes;
+        # shifting left drops the first byte of the next sample
+        overlapping = np.ndarray((count - 1,), dtype="<i4", buffer=data, strides=(3,))
+        np.left_shift(overlapping, 8, out=samples[:-1])
+        samples[-1] = int.from_bytes(data[3 * count - 3:3 * count], "little", signed=True) << 8
+    return samples
+
+
+def decode(data, sample_rate: int = SAMPLE_RATE, channels: int = 1, encoding: str = "s16le"):
+    """Mono float32 samples and their rate from a WAV file or raw PCM bytes.
+
+    WAV is recognised by its RIFF header and describes itself; anything
+    else is raw interleaved PCM in `encoding` at `sample_rate` with
+    `channels`. Samples are read with np.frombuffer straight from `data`,
+    so the only copy is the float32 output; channels are averaged into it.
+    """
+    view = memoryview(data).cast("B")
+    offset = 0.0
+    if view[:4] == b"RIFF" and view[8:12] == b"WAVE":
+        tag, channels, sample_rate, bits, view = _wav_data(view)
+        dtype, scale, offset = _wav_dtype(tag, bits)
+        if bits == 24:
+            scale = 1 / 2 ** 31
+    elif encoding in RAW_ENCODINGS:
+        dtype, scale = RAW_ENCODINGS[encoding]
+        bits = np.dtype(dtype).itemsize * 8
+    else:
+        raise AudioFormatError(f"Unknown PCM encoding: {encoding}")
+    if channels < 1 or not 1000 <= sample_rate <= 384000:
+        raise AudioFormatError(f"Unsupported audio: {channels} channels at {sample_rate} Hz")
+
+    if bits == 24:
+        samples = _widen_int24(view)
+    else:
+        width = np.dtype(dtype).itemsize
+        samples = np.frombuffer(view[:len(view) - len(view) % width], dtype=dtype)
+    samples = samples[:len(samples) - len(samples) % channels]  # drop a partial last frame
+    # One NaN or inf would make the peak, and so every sample after normalizing, NaN
+    if samples.dtype.kind == "f" and not np.isfinite(samples).all():
+        raise AudioFormatError("Audio has NaN or infinite samples")
+    # Sum the channels through strided views; much faster than mean(axis=1) over a short axis
+    audio = samples[::channels].astype(np.float32)  # always a new, writable array
+    for channel in range(1, channels):
+        audio += samples[channel::channels]
+    if offset:
+        audio += offset * channels
+    if scale != 1.0 or channels > 1:
+        audio *= scale / channels
+    return audio, sample_rate, channels
+
+
+def resample(audio: np.ndarray, rate: int, target: int = SAMPLE_RATE) -> np.ndarray:
+    """Polyphase resampling to `target` Hz, in float32; a no-op at the target rate."""
+    if rate == target:
+        return audio
+    from scipy.signal import resample_poly
+
+    factor = gcd(rate, target)
+    return resample_poly(audio, target // factor, rate // factor).astype(np.float32, copy=False)
+
+
+def normalize(audio: np.ndarray, target_peak: float = AUDIO_TARGET_PEAK, max_gain: float = AUDIO_MAX_GAIN) -> float:
+    """Remove DC and scale the peak to `target_peak`, in place; returns the gain applied."""
+    if not len(audio):
+        return 1.0
+    audio -= audio.mean()
+    peak = max(float(audio.max()), -float(audio.min()))
+    gain = min(target_peak / peak, max_gain) if peak > 0 else 1.0
+    audio *= gain
+    return gain
+
+
+def speech_segments(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[SpeechSegment]:
+    """The speech in a whole recording, through the same detector as the microphone loop."""
+    segmenter = SpeechSegmenter(sample_rate)
+    segments = segmenter.feed(audio)
+    last = segmenter.flush()
+    if last is not None:
+        segments.append(last)
+    return segments
+
+
+def split_long(segments: List[SpeechSegment], max_seconds: float = MAX_SEGMENT_S) -> List[SpeechSegment]:
+    """Cut segments longer than `max_seconds` into back-to-back pieces a backend decodes whole."""
+    pieces = []
+    for segment in segments:
+        size = int(max_seconds * segment.sample_rate)
+        if len(segment.audio) <= size:
+            pieces.append(segment)
+            continue
+        for offset in range(0, len(segment.audio), size):
+            audio = segment.audio[offset:offset + size]
+            last = offset + size >= len(segment.audio)
+            pieces.append(SpeechSegment(audio, segment.start + offset, segment.sample_rate, segment.split or not last))
+    return pieces
+
+
+class PreparedAudio:
+    """An upload decoded to 16 kHz mono, normalized and cut into speech segments."""
+
+    __slots__ = ("audio", "segments", "source_rate", "channels", "gain", "timings")
+
+    def __init__(self, audio: np.ndarray, segments: List[SpeechSegment], source_rate: int, channels: int,
+                 gain: float, timings: dict):
+        self.audio = audio
+        self.segments = segments
+        self.source_rate = source_rate
+        self.channels = channels
+        self.gain = gain
+        self.timings = timings  # stage -> seconds
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / SAMPLE_RATE
+
+    def to_dict(self) -> dict:
+        return {
+            "duration": self.duration,
+            "speech_duration": sum(segment.duration for segment in self.segments),
+            "source_rate": self.source_rate,
+            "channels": self.channels,
+            "gain": self.gain,
+            "segments": [{"start": segment.start_time, "end": segment.end_time} for segment in self.segments],
+            "timings_ms": {stage: seconds * 1000 for stage, seconds in self.timings.items()},
+        }
+
+
+def prepare(data, sample_rate: int = SAMPLE_RATE, channels: int = 1, encoding: str = "s16le",
+            trim: bool = True) -> PreparedAudio:
+    """Decode, resample to 16 kHz, normalize and (with `trim`) keep only the speech.
+
+    Each stage is recorded as dependency "audio" in /metrics. Without
+    `trim` the whole recording is kept. Either way segments longer than
+    MAX_SEGMENT_S are split, since Whisper would drop the rest.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    def stage(name: str):
+        nonlocal started
+        now = time.perf_counter()
+        timings[name] = now - started
+        observe("audio", name, now - started)
+        started = now
+
+    audio, source_rate, channels = decode(data, sample_rate, channels, encoding)
+    stage("decode")
+    audio = resample(audio, source_rate)
+    stage("resample")
+    gain = normalize(audio)
+    stage("normalize")
+    if trim:
+        segments = speech_segments(audio)
+    else:
+        segments = [SpeechSegment(audio, 0, SAMPLE_RATE, False)] if len(audio) else []
+    segments = split_long(segments)
+    stage("vad")
+    return PreparedAudio(audio, segments, source_rate, channels, gain, timings)
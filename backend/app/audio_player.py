@@ -0,0 +1,66 @@
+import subprocess
+from typing import Callable, Iterable, List, Optional
+
+PLAYER_COMMAND = ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet"]
+# Start playing as soon as the first bytes arrive instead of probing the input
+STREAM_INPUT_ARGS = ["-fflags", "nobuffer", "-probesize", "4096", "-analyzeduration", "0", "-i", "-"]
+
+
+def play_file(
+    path: str,
+    on_start: Optional[Callable[[subprocess.Popen], None]] = None,
+    command: List[str] = PLAYER_COMMAND,
+):
+    """Play an audio file, blocking until playback finishes.
+
+    `on_start` receives the player process, e.g. so it can be terminated.
+    """
+    player = subprocess.Popen(command + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if on_start is not None:
+        on_start(player)
+    player.wait()
+
+
+def play_stream(
+    chunks: Iterable[bytes],
+    on_complete: Optional[Callable[[bytes], None]] = None,
+    on_start: Optional[Callable[[subprocess.Popen], None]] = None,
+    command: List[str] = PLAYER_COMMAND + STREAM_INPUT_ARGS,
+):
+    """Pipe audio chunks into the player as they arrive.
+
+    Blocks until playback finishes. Once the last chunk has been received,
+    `on_complete` is called with the full audio so it can be cached while
+    the tail is still playing. `on_start` receives the player process.
+    """
+    player = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if on_start is not None:
+        on_start(player)
+    received = []
+    try:
+        for chunk in chunks:
+            received.append(chunk)
+            if not player.stdin.closed:
+                try:
+                    player.stdin.write(chunk)
+                    player.stdin.flush()
+                except BrokenPipeError:
+                    # Player exited early; keep draining so the audio can still be cached
+                    _close_stdin(player)
+    except BaseException:
+        _close_stdin(player)
+        player.wait()
+        raise
+
+    _close_stdin(player)
+    if on_complete is not None:
+        on_complete(b"".join(received))
+    player.wait()
+
+
+def _close_stdin(player: subprocess.Popen):
+    if not player.stdin.closed:
+        try:
+            player.stdin.close()
+        except BrokenPipeError:
+            pass
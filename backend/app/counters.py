@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+from collections import Counter
+
+from app.metrics import log
+
+DOWNLOAD_FLUSH_INTERVAL = float(os.getenv("DOWNLOAD_FLUSH_INTERVAL", "1.0"))  # seconds
+DOWNLOAD_FLUSH_THRESHOLD = int(os.getenv("DOWNLOAD_FLUSH_THRESHOLD", "1000"))  # increments
+
+
+class DownloadCounter:
+    """Write-behind aggregator for design download counts.
+
+    Increments are coalesced in memory per design and written in one batched
+    transaction every `flush_interval` seconds, or sooner once
+    `flush_threshold` increments are pending. At most one flush window of
+    counts can be lost if the process dies; `read()` runs a database query
+    together with the not-yet-flushed counts to add to what it returns.
+    """
+
+    def __init__(self, pool, flush_interval=DOWNLOAD_FLUSH_INTERVAL, flush_threshold=DOWNLOAD_FLUSH_THRESHOLD):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = Counter()
+        self._in_flight = Counter()
+        self._pending_total = 0
+        self._version = 0  # odd while a flush is being written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def increment(self, design_id: str, amount: int = 1):
+        with self._lock:
+            self._pending[design_id] += amount
+            self._pending_total += amount
+            if self._pending_total >= self.flush_threshold:
+                self._wake.set()
+
+    def pending(self, design_id: str) -> int:
+        """Increments for a design that are not in the database yet; see read() to add them to a query."""
+        with self._lock:
+            return self._pending[design_id] + self._in_flight[design_id]
+
+    def read(self, query):
+        """Run `query()` and return (its result, Counter of increments it does not include).
+
+        A query that overlaps a flush is run again once the flush is done,
+        so a batch is never counted both in the database and as pending,
+        nor missed between the two.
+        """
+        while True:
+            with self._lock:
+                version = self._version
+            if version % 2 == 0:
+                result = query()
+                with self._lock:
+                    if self._version == version:
+                        return result, self._pending.copy()
+            with self._flush_lock:  # wait for the flush to be written
+                pass
+
+    def flush(self) -> int:
+        """Write all pending increments in a single transaction.
+
+        Returns the number of designs updated. On failure the increments are
+        put back so the next flush retries them.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, Counter()
+                self._in_flight = batch
+                self._pending_total = 0
+                self._version += 1
+
+            try:
+                with self.pool.connection() as conn, conn:
+                    conn.executemany(
+                        "UPDATE designs SET downloads = downloads + ? WHERE id = ?",
+                        [(count, design_id) for design_id, count in batch.items()],
+                    )
+            except Exception:
+                with self._lock:
+                    self._pending.update(batch)
+                    self._pending_total += sum(batch.values())
+                    self._in_flight = Counter()
+                    self._version += 1
+                raise
+
+            with self._lock:
+                self._in_flight = Counter()
+                self._version += 1
+            return len(batch)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log(f"Error flushing download counts: {str(e)}", logging.ERROR)
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="download-counter", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background flusher and write whatever is still pending."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -0,0 +1,317 @@
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app.design_content import CONTENT_CODEC, canonical_content, compress_content, summarize_content
+from app.metrics import span
+
+# SQLite setup
+DATABASE_URL = os.getenv("DATABASE_URL", "designs.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5.0"))  # seconds
+
+
+class ConnectionPool:
+    """A fixed-size pool of long-lived SQLite connections.
+
+    Connections are opened lazily, switched to WAL journaling so readers never
+    block the writer, and keep sqlite3's per-connection statement cache warm
+    across requests.
+    """
+
+    def __init__(self, database: str, size: int = DB_POOL_SIZE):
+        self.database = database
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database,
+            timeout=DB_BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+
+        return self._idle.get()
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block."""
+        with span("sqlite", "acquire"):
+            conn = self.acquire()
+        try:
+            with span("sqlite", "connection"):
+                yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._opened -= 1
+
+
+pool = ConnectionPool(DATABASE_URL)
+
+
+def _create_designs(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS designs (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            author TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            tags TEXT NOT NULL,
+            downloads INTEGER DEFAULT 0
+        )
+    ''')
+
+
+def _add_tag_index(conn):
+    # created_at is copied into design_tags so a tag page is a single index
+    # range scan in (created_at, id) order.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS design_tags (
+            design_id TEXT NOT NULL REFERENCES designs(id) ON DELETE CASCADE,
+            tag TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (design_id, tag)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_design_tags_tag
+        ON design_tags (tag, created_at DESC, design_id DESC)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_designs_created_at
+        ON designs (created_at DESC, id DESC)
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO design_tags (design_id, tag, created_at)
+        SELECT designs.id, json_each.value, designs.created_at
+        FROM designs, json_each(designs.tags)
+    ''')
+
+
+def _add_summary_columns(conn):
+    conn.execute("ALTER TABLE designs ADD COLUMN shape_count INTEGER NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE designs ADD COLUMN node_types TEXT NOT NULL DEFAULT '[]'")
+    rows = conn.execute("SELECT id, content FROM designs").fetchall()
+    for row in rows:
+        shape_count, node_types = summarize_content(json.loads(row["content"]))
+        conn.execute(
+            "UPDATE designs SET shape_count = ?, node_types = ? WHERE id = ?",
+            (shape_count, json.dumps(node_types), row["id"]),
+        )
+
+
+def _move_content_to_blobs(conn):
+    # Design content lives in a content-addressed, compressed blob table so
+    # identical and forked canvases are stored once.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS design_blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+    ''')
+    conn.execute("ALTER TABLE designs ADD COLUMN content_hash TEXT REFERENCES design_blobs(hash)")
+    rows = conn.execute("SELECT id, content FROM designs").fetchall()
+    for row in rows:
+        content_hash, raw = canonical_content(json.loads(row["content"]))
+        store_content(conn, content_hash, raw)
+        conn.execute("UPDATE designs SET content_hash = ? WHERE id = ?", (content_hash, row["id"]))
+    # Rebuild the table without the content column rather than DROP COLUMN,
+    # which needs SQLite 3.35; rowids are kept, and init_db has foreign keys
+    # off so dropping the old table does not cascade to design_tags.
+    conn.execute('''
+        CREATE TABLE designs_new (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            author TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            tags TEXT NOT NULL,
+            downloads INTEGER DEFAULT 0,
+            shape_count INTEGER NOT NULL DEFAULT 0,
+            node_types TEXT NOT NULL DEFAULT '[]',
+            content_hash TEXT REFERENCES design_blobs(hash)
+        )
+    ''')
+    columns = "id, title, description, author, created_at, tags, downloads, shape_count, node_types, content_hash"
+    conn.execute(f"INSERT INTO designs_new (rowid, {columns}) SELECT rowid, {columns} FROM designs")
+    conn.execute("DROP TABLE designs")
+    conn.execute("ALTER TABLE designs_new RENAME TO designs")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_designs_created_at ON designs (created_at DESC, id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_designs_content_hash ON designs (content_hash)")
+
+
+def _add_search_index(conn):
+    # designs has no INTEGER PRIMARY KEY, so its implicit rowid can change on
+    # VACUUM; search_rowid pins each design to its row in designs_fts.
+    conn.execute("ALTER TABLE designs ADD COLUMN search_rowid INTEGER")
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS designs_fts USING fts5(
+            design_id UNINDEXED, title, description, author, tags,
+            tokenize = 'porter unicode61'
+        )
+    ''')
+    # Rank matches by BM25 with per-column weights:
+    # design_id (unindexed), title, description, author, tags
+    conn.execute("INSERT INTO designs_fts (designs_fts, rank) VALUES ('rank', 'bm25(0.0, 10.0, 2.0, 4.0, 6.0)')")
+    conn.execute('''
+        INSERT INTO designs_fts (rowid, design_id, title, description, author, tags)
+        SELECT rowid, id, title, description, author,
+               (SELECT group_concat(value, ' ') FROM json_each(designs.tags))
+        FROM designs
+    ''')
+    conn.execute("UPDATE designs SET search_rowid = rowid")
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS designs_fts_insert AFTER INSERT ON designs BEGIN
+            INSERT INTO designs_fts (design_id, title, description, author, tags)
+            VALUES (new.id, new.title, new.description, new.author,
+                    (SELECT group_concat(value, ' ') FROM json_each(new.tags)));
+            UPDATE designs SET search_rowid = last_insert_rowid() WHERE id = new.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS designs_fts_update
+        AFTER UPDATE OF title, description, author, tags ON designs BEGIN
+            UPDATE designs_fts
+            SET title = new.title, description = new.description, author = new.author,
+                tags = (SELECT group_concat(value, ' ') FROM json_each(new.tags))
+            WHERE rowid = new.search_rowid;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS designs_fts_delete AFTER DELETE ON designs BEGIN
+            DELETE FROM designs_fts WHERE rowid = old.search_rowid;
+        END
+    ''')
+
+
+def _add_llm_cache(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            prompt TEXT NOT NULL,
+            response TEXT NOT NULL,
+            latency REAL NOT NULL,
+            signature BLOB NOT NULL,
+            created_at REAL NOT NULL,
+            last_hit_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache (last_hit_at)")
+    # MinHash LSH buckets for near-duplicate prompt lookup
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS llm_cache_bands (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            key TEXT NOT NULL REFERENCES llm_cache(key) ON DELETE CASCADE,
+            PRIMARY KEY (band, bucket, key)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_bands_key ON llm_cache_bands (key)")
+
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have run, so existing designs.db files are upgraded in place on startup.
+MIGRATIONS = [
+    _create_designs,
+    _add_tag_index,
+    _add_summary_columns,
+    _move_content_to_blobs,
+    _add_search_index,
+    _add_llm_cache,
+]
+
+
+def init_db():
+    with pool.connection() as conn:
+        # Foreign keys can only be switched outside a transaction; with them off
+        # a migration can rebuild a table that others reference
+        conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            with conn:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                for migration in MIGRATIONS[version:]:
+                    migration(conn)
+                broken = conn.execute("PRAGMA foreign_key_check").fetchone()
+                if broken is not None:
+                    raise sqlite3.IntegrityError(f"Migration left a broken foreign key in {broken[0]}")
+                conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+
+
+def store_content(conn, content_hash: str, raw: bytes):
+    """Store canonical design JSON as a compressed blob unless it already exists."""
+    exists = conn.execute("SELECT 1 FROM design_blobs WHERE hash = ?", (content_hash,)).fetchone()
+    if not exists:
+        conn.execute(
+            "INSERT INTO design_blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+            (content_hash, CONTENT_CODEC, len(raw), compress_content(raw)),
+        )
+
+
+def release_content(conn, content_hash: str):
+    """Delete a blob once no design references it any more."""
+    conn.execute('''
+        DELETE FROM design_blobs
+        WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM designs WHERE content_hash = ?)
+    ''', (content_hash, content_hash))
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 MATCH expression.
+
+    Every word must match (the last one as a prefix, for search-as-you-type)
+    and is quoted so user input can never be parsed as FTS5 syntax.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import zlib
+from typing import Iterator, List, Tuple
+
+CONTENT_CODEC = "zlib"
+
+# Custom shape types registered by the frontend (src/lib/shapes)
+NODE_TYPES = {"start", "llm", "decide", "speech", "movement", "audio_input", "status", "text_input"}
+
+
+def iter_shapes(content: dict) -> Iterator[dict]:
+    """Yield the shape records of a stored design.
+
+    Designs are saved as tldraw store snapshots ({"store": {id: record}}),
+    but older/hand-written designs may use a plain {"shapes": [...]} list.
+    """
+    store = content.get("store")
+    if isinstance(store, dict):
+        for record in store.values():
+            if isinstance(record, dict) and record.get("typeName") == "shape":
+                yield record
+        return
+
+    for shape in content.get("shapes") or []:
+        if isinstance(shape, dict):
+            yield shape
+
+
+def summarize_content(content: dict) -> Tuple[int, List[str]]:
+    """Return (shape count, sorted node types used) for a design's content."""
+    shape_count = 0
+    node_types = set()
+    for shape in iter_shapes(content):
+        shape_count += 1
+        if shape.get("type") in NODE_TYPES:
+            node_types.add(shape["type"])
+    return shape_count, sorted(node_types)
+
+
+def canonical_content(content: dict) -> Tuple[str, bytes]:
+    """Serialize content canonically and return (sha256 hex digest, JSON bytes).
+
+    Sorted keys and compact separators make identical canvases hash the same
+    regardless of how the client ordered them.
+    """
+    raw = json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+def compress_content(raw: bytes) -> bytes:
+    return zlib.compress(raw, 6)
+
+
+def decode_content(codec: str, data: bytes) -> dict:
+    if codec != "zlib":
+        raise ValueError(f"Unknown content codec: {codec}")
+    return json.loads(zlib.decompress(data))
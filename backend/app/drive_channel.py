@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Callable, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.metrics import log
+from app.motion import Motion, MotionScheduler
+
+DRIVE_WATCHDOG_TIMEOUT = float(os.getenv("DRIVE_WATCHDOG_TIMEOUT", "0.5"))  # seconds without a frame before stopping
+DRIVE_STATE_INTERVAL = float(os.getenv("DRIVE_STATE_INTERVAL", "1.0"))  # seconds between state pushes
+
+DRIVE_DIRECTIONS = ("forward", "back", "left", "right")
+
+# Binary frames: command code and sequence number, optionally followed by a
+# value (cm or degrees). Acks echo the sequence number with a status byte.
+BINARY_COMMANDS = ("stop", "forward", "back", "left", "right", "ping")
+FRAME = struct.Struct("!BH")
+FRAME_WITH_VALUE = struct.Struct("!BHH")
+ACK = struct.Struct("!BHB")
+ACK_CODE = 0xFF
+ACK_OK, ACK_ERROR = 0, 1
+
+
+class DriveChannel:
+    """Teleoperation over a WebSocket: drive frames in, acks and robot state out.
+
+    Text frames are short JSON, `{"d": "forward", "s": 7}` with an optional
+    value `"v"` in cm or degrees; binary frames pack the same fields (see
+    FRAME). Each frame goes straight to the motion scheduler. A drive frame
+    without a value keeps the robot moving until the next frame, so a
+    per-connection watchdog stops it if no frame (a `ping` will do) arrives
+    within `watchdog_timeout`. The robot is also stopped when the socket
+    closes mid-move.
+    """
+
+    def __init__(self, motion: MotionScheduler, state: Callable[[], dict],
+                 watchdog_timeout: float = DRIVE_WATCHDOG_TIMEOUT, state_interval: float = DRIVE_STATE_INTERVAL):
+        self.motion = motion
+        self.state = state
+        self.watchdog_timeout = watchdog_timeout
+        self.state_interval = state_interval
+        self.sessions = 0
+        self.frames = 0
+        self.errors = 0
+        self.watchdog_stops = 0
+
+    def stats(self) -> dict:
+        return {
+            "sessions": self.sessions,
+            "frames": self.frames,
+            "errors": self.errors,
+            "watchdog_stops": self.watchdog_stops,
+            "watchdog_timeout": self.watchdog_timeout,
+        }
+
+    async def serve(self, websocket: WebSocket):
+        await websocket.accept()
+        self.sessions += 1
+        session = _DriveSession(self, websocket)
+        pusher = asyncio.create_task(session.push_state())
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    await session.handle_binary(message["bytes"])
+                elif message.get("text") is not None:
+                    await session.handle_text(message["text"])
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.sessions -= 1
+            pusher.cancel()
+            session.close()
+
+
+class _DriveSession:
+    def __init__(self, channel: DriveChannel, websocket: WebSocket):
+        self.channel = channel
+        self.websocket = websocket
+        self.current: Optional[Motion] = None  # the last move this connection started
+        self._watchdog: Optional[asyncio.TimerHandle] = None
+
+    async def handle_text(self, text: str):
+        seq = None
+        try:
+            frame = json.loads(text)
+            seq = frame.get("s")
+            self._apply(frame["d"], frame.get("v"))
+        except Exception as e:
+            self.channel.errors += 1
+            await self.websocket.send_text(json.dumps({"t": "ack", "s": seq, "ok": False, "error": str(e)}))
+            return
+        await self.websocket.send_text(json.dumps({"t": "ack", "s": seq, "ok": True}))
+
+    async def handle_binary(self, data: bytes):
+        seq = 0
+        try:
+            if len(data) == FRAME_WITH_VALUE.size:
+                code, seq, value = FRAME_WITH_VALUE.unpack(data)
+            else:
+                code, seq = FRAME.unpack(data)
+                value = None
+            self._apply(BINARY_COMMANDS[code], value)
+        except Exception:
+            self.channel.errors += 1
+            await self.websocket.send_bytes(ACK.pack(ACK_CODE, seq, ACK_ERROR))
+            return
+        await self.websocket.send_bytes(ACK.pack(ACK_CODE, seq, ACK_OK))
+
+    def _apply(self, command: str, value: Optional[float]):
+        channel = self.channel
+        channel.frames += 1
+        if command == "stop":
+            self._disarm()
+            channel.motion.stop()
+            return
+        if command == "ping":
+            if self._watchdog is not None:
+                self._arm()
+            return
+        if command not in DRIVE_DIRECTIONS:
+            raise ValueError(f"Invalid direction: {command}")
+        self.current = channel.motion.move(command, value)
+        if self.current.duration is None:
+            self._arm()
+        else:
+            self._disarm()
+
+    def _arm(self):
+        self._disarm()
+        loop = asyncio.get_running_loop()
+        self._watchdog = loop.call_later(self.channel.watchdog_timeout, self._on_watchdog)
+
+    def _disarm(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+
+    def _on_watchdog(self):
+        self._watchdog = None
+        if self.current is None or self.channel.motion.current is not self.current:
+            return
+        log(f"Drive watchdog: no frame for {self.channel.watchdog_timeout}s - stopping", logging.WARNING)
+        self.channel.watchdog_stops += 1
+        self.channel.motion.stop()
+        asyncio.ensure_future(self._send_quietly({"t": "watchdog"}))
+
+    async def push_state(self):
+        while True:
+            await self._send_quietly({"t": "state", **self.channel.state()})
+            await asyncio.sleep(self.channel.state_interval)
+
+    async def _send_quietly(self, message: dict):
+        try:
+            await self.websocket.send_text(json.dumps(message))
+        except Exception:
+            pass  # the socket closed; serve() cleans up
+
+    def close(self):
+        self._disarm()
+        # Do not leave an open-ended move running with nobody driving
+        current = self.current
+        if current is not None and current.duration is None and self.channel.motion.current is current:
+            self.channel.motion.stop()
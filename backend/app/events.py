@@ -0,0 +1,37 @@
+import asyncio
+import time
+from typing import List
+
+
+class EventHistory:
+    """Progress events recorded in order, which followers replay and then follow live.
+
+    Each event is a dict with its `seq`, `event` name and `time`, plus the
+    fields passed to `emit`. Followers stop once `done` is set, after the
+    last event.
+    """
+
+    def __init__(self, done: asyncio.Event):
+        self.done = done
+        self.items: List[dict] = []
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def emit(self, event: str, **data):
+        self.items.append({"seq": len(self.items), "event": event, "time": time.time(), **data})
+        # Wake everyone following the stream, then arm a fresh event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self, after: int = 0):
+        """Yield events from index `after` on, until `done` is set."""
+        index = after
+        while True:
+            while index < len(self.items):
+                yield self.items[index]
+                index += 1
+            if self.done.is_set():
+                return
+            await self._changed.wait()
@@ -0,0 +1,387 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.events import EventHistory
+from app.metrics import log
+
+MAX_FINISHED_RUNS = 64
+
+# Compiled plans, keyed by (design id, content hash)
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "128"))  # entries
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "3600"))  # seconds
+
+# Prompt layout used by the Think node in the browser (LLMNode.tsx)
+CONTEXT_SEPARATOR = "\n\nContext:\n"
+# Distance sent for a movement command, as MovementNode.tsx does
+DEFAULT_MOVE_VALUE = 10
+
+# Node kinds the executor acts on; every other shape type is KIND_OTHER
+NODE_KINDS = ("other", "start", "text", "llm", "decide", "speech", "movement")
+KIND_OTHER, KIND_START, KIND_TEXT, KIND_LLM, KIND_DECIDE, KIND_SPEECH, KIND_MOVEMENT = range(len(NODE_KINDS))
+_KIND_CODES = {kind: code for code, kind in enumerate(NODE_KINDS)}
+
+
+class FlowPlan:
+    """A design's canvas compiled into an executable DAG.
+
+    Nodes are numbered in topological order and stored column-wise: `ids`,
+    `types` and `kinds` per node, the Think instruction in `instructions`
+    and the initial text of text shapes in `texts` (None elsewhere). Arrows
+    are kept as CSR adjacency arrays, so the successors of node i are
+    `succ_targets[succ_offsets[i]:succ_offsets[i + 1]]`. `loop_edges` lists
+    the arrows dropped to break loops.
+    """
+
+    __slots__ = ("content_hash", "ids", "types", "kinds", "instructions", "texts",
+                 "succ_offsets", "succ_targets", "pred_offsets", "pred_sources",
+                 "index", "start_nodes", "loop_edges", "_reachable")
+
+    def __init__(self, content_hash, ids, types, kinds, instructions, texts, successors, loop_edges):
+        self.content_hash = content_hash
+        self.ids = ids
+        self.types = types
+        self.kinds = kinds
+        self.instructions = instructions
+        self.texts = texts
+        self.loop_edges = loop_edges
+        self.index = {node_id: i for i, node_id in enumerate(ids)}
+        self.start_nodes = tuple(i for i, kind in enumerate(kinds) if kind == KIND_START)
+
+        self.succ_offsets = array("I", [0])
+        self.succ_targets = array("I")
+        pred_lists = [[] for _ in ids]
+        for i, targets in enumerate(successors):
+            self.succ_targets.extend(targets)
+            self.succ_offsets.append(len(self.succ_targets))
+            for target in targets:
+                pred_lists[target].append(i)
+        self.pred_offsets = array("I", [0])
+        self.pred_sources = array("I")
+        for sources in pred_lists:
+            self.pred_sources.extend(sources)
+            self.pred_offsets.append(len(self.pred_sources))
+        self._reachable = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def successors(self, i: int):
+        return self.succ_targets[self.succ_offsets[i]:self.succ_offsets[i + 1]]
+
+    def predecessors(self, i: int):
+        return self.pred_sources[self.pred_offsets[i]:self.pred_offsets[i + 1]]
+
+    def reachable(self, roots: Tuple[int, ...]) -> bytearray:
+        """Mask of the nodes reachable from `roots`; memoized per root set."""
+        mask = self._reachable.get(roots)
+        if mask is None:
+            mask = bytearray(len(self.ids))
+            # Indices are topological, so one forward sweep is enough
+            for root in roots:
+                mask[root] = 1
+            for i in range(min(roots, default=len(self.ids)), len(self.ids)):
+                if mask[i]:
+                    for target in self.successors(i):
+                        mask[target] = 1
+            self._reachable[roots] = mask
+        return mask
+
+
+def compile_flow(content: dict, content_hash: Optional[str] = None) -> FlowPlan:
+    """Compile a stored design's content into a FlowPlan.
+
+    Arrows are read from their start/end bindings in a tldraw store
+    snapshot; plain {"shapes": [...], "connections": [{"from", "to"}]}
+    content is accepted too.
+    """
+    nodes = {}
+    edges = []
+    store = content.get("store")
+    if isinstance(store, dict):
+        ends = {}
+        for record in store.values():
+            if not isinstance(record, dict):
+                continue
+            if record.get("typeName") == "shape" and record.get("type") != "arrow":
+                nodes[record["id"]] = record
+            elif record.get("typeName") == "binding" and record.get("type") == "arrow":
+                terminal = (record.get("props") or {}).get("terminal")
+                ends.setdefault(record["fromId"], {})[terminal] = record["toId"]
+        edges = [(arrow["start"], arrow["end"]) for arrow in ends.values() if "start" in arrow and "end" in arrow]
+    else:
+        for shape in content.get("shapes") or []:
+            if isinstance(shape, dict) and "id" in shape:
+                nodes[shape["id"]] = shape
+        edges = [(c.get("from"), c.get("to")) for c in content.get("connections") or [] if isinstance(c, dict)]
+
+    successors = {node_id: [] for node_id in nodes}
+    for source, target in edges:
+        # Skip arrows bound to shapes that no longer exist
+        if source in nodes and target in nodes and target not in successors[source]:
+            successors[source].append(target)
+
+    # Depth-first from the Start nodes; an arrow back into the current path
+    # closes a loop (e.g. a patrol of Move nodes) and is dropped, so each
+    # node runs at most once per run. Reverse postorder is a topological order.
+    roots = [n for n in nodes if nodes[n].get("type") == "start"] + [n for n in nodes if nodes[n].get("type") != "start"]
+    state = {}
+    postorder = []
+    loop_edges = []
+    for root in roots:
+        if root in state:
+            continue
+        state[root] = "open"
+        stack = [(root, iter(list(successors[root])))]
+        while stack:
+            node_id, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[node_id] = "closed"
+                postorder.append(node_id)
+                stack.pop()
+            elif state.get(child) == "open":
+                successors[node_id].remove(child)
+                loop_edges.append((node_id, child))
+            elif child not in state:
+                state[child] = "open"
+                stack.append((child, iter(list(successors[child]))))
+    order = postorder[::-1]
+    position = {node_id: i for i, node_id in enumerate(order)}
+
+    types = []
+    kinds = array("B")
+    instructions = []
+    texts = []
+    for node_id in order:
+        node_type = nodes[node_id].get("type")
+        props = nodes[node_id].get("props") or {}
+        kind = _KIND_CODES.get(node_type, KIND_OTHER)
+        types.append(node_type)
+        kinds.append(kind)
+        instructions.append((props.get("instruction") or "") if kind == KIND_LLM else None)
+        texts.append((props.get("text") or "") if kind == KIND_TEXT else None)
+
+    return FlowPlan(
+        content_hash,
+        tuple(order),
+        tuple(types),
+        kinds,
+        tuple(instructions),
+        tuple(texts),
+        [sorted(position[target] for target in successors[node_id]) for node_id in order],
+        tuple(loop_edges),
+    )
+
+
+class FlowActions:
+    """The side effects a flow can have; wired to the app's LLM, speech queue and MQTT."""
+
+    def __init__(self, generate: Callable[[str], Awaitable[str]], speak: Callable[[str], Awaitable[None]],
+                 move: Callable[[str, float], Awaitable[None]],
+                 move_sequence: Callable[[List[Tuple[str, float]]], Awaitable[None]]):
+        self.generate = generate
+        self.speak = speak
+        self.move = move
+        self.move_sequence = move_sequence
+
+
+class FlowRun:
+    """One execution of a FlowPlan.
+
+    Every node reachable from the chosen start nodes runs as soon as all of
+    its reachable predecessors have finished, so independent branches run
+    concurrently. A node is skipped when none of its reachable predecessors
+    ran (e.g. the branch a Decide node did not take, or after a failure).
+    Progress is recorded in `history`, which followers replay and then
+    follow live.
+    """
+
+    def __init__(self, plan: FlowPlan, actions: FlowActions, design_id: Optional[str] = None, start_ids: Optional[List[str]] = None):
+        self.id = str(uuid.uuid4())
+        self.plan = plan
+        self.actions = actions
+        self.design_id = design_id
+        if start_ids is None:
+            self.start_nodes = plan.start_nodes
+        else:
+            self.start_nodes = tuple(plan.index[node_id] for node_id in start_ids)
+        self.status = "running"  # running -> done | failed | cancelled
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.node_status: Dict[str, str] = {}
+        self.text = list(plan.texts)
+        self.done = asyncio.Event()
+        self.history = EventHistory(self.done)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        self._task.add_done_callback(self._on_task_done)
+
+    def cancel(self) -> bool:
+        if self.done.is_set():
+            return False
+        self._task.cancel()
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "design_id": self.design_id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "nodes": self.node_status,
+        }
+
+    def _emit_node(self, event: str, i: int, status: str, **data):
+        node_id = self.plan.ids[i]
+        self.node_status[node_id] = status
+        self.history.emit(event, node_id=node_id, node_type=self.plan.types[i], **data)
+
+    def _on_task_done(self, task: asyncio.Task):
+        # Cancelled before it got to run, so _run's cleanup never happened
+        if not self.done.is_set():
+            self.status = "cancelled"
+            self.finished_at = time.time()
+            self.history.emit("run_finished", status=self.status)
+            self.done.set()
+
+    async def _run(self):
+        plan = self.plan
+        reachable = plan.reachable(self.start_nodes)
+        loop = asyncio.get_running_loop()
+        finished: Dict[int, asyncio.Future] = {}
+        for i, included in enumerate(reachable):
+            if included:
+                finished[i] = loop.create_future()
+                self.node_status[plan.ids[i]] = "pending"
+
+        self.history.emit("run_started", nodes=len(finished))
+        tasks = [asyncio.create_task(self._run_node(i, finished)) for i in finished]
+        try:
+            await asyncio.gather(*tasks)
+            self.status = "failed" if "failed" in self.node_status.values() else "done"
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.status = "cancelled"
+        except Exception as e:
+            log(f"Error in flow run {self.id}: {str(e)}", logging.ERROR)
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+            self.history.emit("run_finished", status=self.status)
+            self.done.set()
+
+    async def _run_node(self, i: int, finished: Dict[int, asyncio.Future]):
+        waits = [finished[p] for p in self.plan.predecessors(i) if p in finished]
+        results = await asyncio.gather(*waits)
+        # Start nodes always run; anything else needs an upstream node that activated it
+        active = not waits or any(i in activated for activated in results)
+        if not active:
+            self._emit_node("node_skipped", i, "skipped")
+            finished[i].set_result(())
+            return
+
+        self._emit_node("node_started", i, "running")
+        try:
+            activated, output = await self._execute(i)
+        except asyncio.CancelledError:
+            self.node_status[self.plan.ids[i]] = "cancelled"
+            raise
+        except Exception as e:
+            log(f"Error in flow node {self.plan.ids[i]}: {str(e)}", logging.ERROR)
+            self._emit_node("node_failed", i, "failed", error=str(e))
+            finished[i].set_result(())
+            return
+
+        self._emit_node("node_finished", i, "done", output=output)
+        finished[i].set_result(activated)
+
+    def _inputs(self, i: int) -> List[str]:
+        text = self.text
+        return [text[p] for p in self.plan.predecessors(i) if text[p] is not None]
+
+    async def _execute(self, i: int):
+        """Run one node; returns (successor indices it activates, output)."""
+        plan = self.plan
+        successors = plan.successors(i)
+        kind = plan.kinds[i]
+        output = None
+
+        if kind == KIND_LLM:
+            prompt = CONTEXT_SEPARATOR.join([plan.instructions[i]] + self._inputs(i))
+            output = await self.actions.generate(prompt)
+            for next_i in successors:
+                if self.text[next_i] is not None:
+                    self.text[next_i] = output
+
+        elif kind == KIND_DECIDE:
+            inputs = [text.lower().strip() for text in self._inputs(i)]
+            choice = "left" if "left" in inputs else "right" if "right" in inputs else None
+            # Only text outputs labelled with the choice are taken; they read "started"
+            taken = [n for n in successors if self.text[n] is not None and self.text[n].lower().strip() == choice]
+            for next_i in taken:
+                self.text[next_i] = "started"
+            return taken, choice
+
+        elif kind == KIND_SPEECH:
+            output = "\n".join(text for text in self._inputs(i) if text)
+            if output:
+                await self.actions.speak(output)
+
+        elif kind == KIND_MOVEMENT:
+            # Same steps as the Move node in the browser: several moves and no
+            # stop run as one timed sequence, otherwise only the last command
+            commands = [text.lower().strip() for text in self._inputs(i)]
+            if len(commands) > 1 and "stop" not in commands:
+                await self.actions.move_sequence([(direction, DEFAULT_MOVE_VALUE) for direction in commands])
+                output = commands[-1]
+            elif commands:
+                direction = commands[-1]
+                value = 0 if direction == "stop" else DEFAULT_MOVE_VALUE
+                await self.actions.move(direction, value)
+                output = direction
+
+        elif kind == KIND_TEXT:
+            output = self.text[i]
+
+        return successors, output
+
+
+class FlowRunner:
+    """Starts flow runs and keeps the most recent ones for status queries."""
+
+    def __init__(self, actions: FlowActions):
+        self.actions = actions
+        self._runs = OrderedDict()
+
+    def start(self, plan: FlowPlan, design_id: Optional[str] = None, start_ids: Optional[List[str]] = None) -> FlowRun:
+        run = FlowRun(plan, self.actions, design_id, start_ids)
+        self._runs[run.id] = run
+        while len(self._runs) > MAX_FINISHED_RUNS:
+            oldest_id, oldest = next(iter(self._runs.items()))
+            if not oldest.done.is_set():
+                break
+            del self._runs[oldest_id]
+        run.start()
+        return run
+
+    def get(self, run_id: str) -> Optional[FlowRun]:
+        return self._runs.get(run_id)
+
+    async def stop(self):
+        runs = [run for run in self._runs.values() if run.cancel()]
+        for run in runs:
+            await run.done.wait()
@@ -0,0 +1,251 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.motion import TURN_DIRECTIONS
+
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.5"))  # below this a match is ignored
+INTENT_MOVE_DISTANCE = 20  # cm when a "forward"/"back" has no value
+INTENT_TURN_ANGLE = 90  # degrees when a "left"/"right" has no value
+
+# Phrase -> (direction or "stop", weight). Matched on whole words, longest first.
+PHRASES = {
+    "forward": ("forward", 0.9), "forwards": ("forward", 0.9), "go forward": ("forward", 1.0),
+    "move forward": ("forward", 1.0), "drive forward": ("forward", 1.0), "ahead": ("forward", 0.8),
+    "go ahead": ("forward", 0.9), "straight ahead": ("forward", 1.0), "go straight": ("forward", 1.0),
+    "advance": ("forward", 0.8), "onward": ("forward", 0.7),
+    "back": ("back", 0.8), "backward": ("back", 0.9), "backwards": ("back", 0.9), "go back": ("back", 1.0),
+    "move back": ("back", 1.0), "back up": ("back", 1.0), "reverse": ("back", 0.9), "go backwards": ("back", 1.0),
+    "left": ("left", 0.8), "turn left": ("left", 1.0), "go left": ("left", 1.0), "rotate left": ("left", 1.0),
+    "spin left": ("left", 1.0), "to the left": ("left", 1.0), "anticlockwise": ("left", 0.9),
+    "counterclockwise": ("left", 0.9), "counter clockwise": ("left", 0.9),
+    "right": ("right", 0.8), "turn right": ("right", 1.0), "go right": ("right", 1.0), "rotate right": ("right", 1.0),
+    "spin right": ("right", 1.0), "to the right": ("right", 1.0), "clockwise": ("right", 0.9),
+    "turn around": ("right", 1.0), "u turn": ("right", 1.0),
+    "stop": ("stop", 1.0), "halt": ("stop", 1.0), "freeze": ("stop", 0.9), "stay": ("stop", 0.7),
+    "stand still": ("stop", 1.0), "hold on": ("stop", 0.7), "stop moving": ("stop", 1.0), "emergency stop": ("stop", 1.0),
+}
+# Phrases that contain a command word but are not commands; matching them consumes the words
+NON_COMMANDS = ["right now", "all right", "alright", "that's right", "thats right", "right away", "you're right",
+                "youre right", "right there", "right back", "left over", "leftover", "what's left", "whats left",
+                "feedback", "stop by"]
+# A turn phrase with a fixed angle when no number is given
+IMPLIED_VALUES = {"turn around": 180, "u turn": 180}
+NEGATIONS = {"don't", "dont", "never", "not"}
+# Words that carry no meaning for a command; they count toward how much of the text was understood
+FILLER = {"please", "the", "robot", "go", "move", "turn", "now", "then", "and", "a", "an", "by", "about", "to",
+          "can", "you", "could", "would", "okay", "ok", "hey", "just", "again", "little", "bit", "more", "some",
+          "drive", "rotate", "spin", "of", "for", "first", "after", "up", "quickly", "slowly", "i", "we", "let's",
+          "lets", "should", "want", "need", "will"}
+THEN_WORDS = {"then", "and", "after"}
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+# Unit -> (kind, factor to cm or degrees)
+UNITS = {
+    "cm": ("linear", 1), "centimeter": ("linear", 1), "centimeters": ("linear", 1), "centimetre": ("linear", 1),
+    "centimetres": ("linear", 1), "m": ("linear", 100), "meter": ("linear", 100), "meters": ("linear", 100),
+    "metre": ("linear", 100), "metres": ("linear", 100), "inch": ("linear", 2.54), "inches": ("linear", 2.54),
+    "foot": ("linear", 30.48), "feet": ("linear", 30.48), "ft": ("linear", 30.48),
+    "degree": ("turn", 1), "degrees": ("turn", 1), "deg": ("turn", 1),
+}
+
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|[a-z]+(?:'[a-z]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower().replace("°", " degrees "))
+
+
+class Intent:
+    __slots__ = ("action", "direction", "value", "confidence", "span")
+
+    def __init__(self, action: str, direction: Optional[str], value: Optional[float], confidence: float,
+                 span: Tuple[int, int]):
+        self.action = action  # "move" or "stop"
+        self.direction = direction
+        self.value = value  # cm for forward/back, degrees for left/right; None for the default
+        self.confidence = confidence
+        self.span = span  # token range that matched
+
+    def to_dict(self) -> dict:
+        return {
+            "action": self.action,
+            "direction": self.direction,
+            "value": self.value,
+            "confidence": round(self.confidence, 3),
+        }
+
+
+class IntentMatcher:
+    """Maps transcripts to motion commands with a compiled phrase trie.
+
+    Phrases are matched on whole tokens, longest first, so "feedback" is
+    not "back" and "turn left" beats "left". Known non-commands ("right
+    now", "all right") are matched too and ignored. A number with an
+    optional unit next to a command fills its value ("turn left 90
+    degrees", "forward two meters" -> 200 cm). A negation just before a
+    command cancels it.
+
+    Confidence is the phrase weight scaled by how much of the transcript
+    was understood (commands, values and filler words), and lowered when
+    the unit does not fit the direction (a distance for a turn).
+    """
+
+    def __init__(self, phrases: Dict[str, Tuple[str, float]] = PHRASES, non_commands: List[str] = NON_COMMANDS):
+        self._trie: dict = {}
+        for phrase, (target, weight) in phrases.items():
+            self._add(phrase, (target, weight, phrase))
+        for phrase in non_commands:
+            self._add(phrase, None)
+
+    def _add(self, phrase: str, value):
+        node = self._trie
+        for token in tokenize(phrase):
+            node = node.setdefault(token, {})
+        node[""] = value  # "" never comes out of the tokenizer
+
+    def parse(self, text: str) -> List[Intent]:
+        """Every command in the transcript, in the order spoken."""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        understood = [token in FILLER for token in tokens]
+        matches = []  # (start, end, target, weight, phrase)
+        i = 0
+        while i < len(tokens):
+            end, found = self._longest(tokens, i)
+            if end is None:
+                i += 1
+                continue
+            if found is not None:
+                matches.append((i, end) + found)
+                understood[i:end] = [True] * (end - i)
+            i = end
+
+        intents = []
+        taken = 0  # tokens before this belong to an earlier command
+        for n, (start, end, target, weight, phrase) in enumerate(matches):
+            # "don't turn left", "do not stop"; only words since the previous command count
+            negated = any(token in NEGATIONS for token in tokens[max(taken, start - 3):start])
+            limit = matches[n + 1][0] if n + 1 < len(matches) else len(tokens)
+            if target == "stop":
+                closing = n + 1 == len(matches) and intents and tokens[start - 1] in THEN_WORDS
+                taken = end
+                # "forward one meter and stop" ends a sequence, which stops anyway
+                if not negated and not closing:
+                    intents.append(Intent("stop", None, None, weight, (start, end)))
+                continue
+
+            # "left 90 degrees", or failing that "90 degrees left"
+            value, fits, slot = self._slot_after(tokens, end, limit, target)
+            if value is None:
+                value, fits, slot = self._slot_before(tokens, taken, start, target)
+            if slot is not None:
+                understood[slot[0]:slot[1]] = [True] * (slot[1] - slot[0])
+            elif phrase in IMPLIED_VALUES:
+                value = IMPLIED_VALUES[phrase]
+            taken = max(end, slot[1] if slot else end)
+            if not negated:
+                intents.append(Intent("move", target, value, weight * (1.0 if fits else 0.6), (start, end)))
+
+        coverage = sum(understood) / len(tokens)
+        for intent in intents:
+            intent.confidence *= 0.3 + 0.7 * coverage
+        return intents
+
+    def match(self, text: str, min_confidence: float = INTENT_MIN_CONFIDENCE) -> Optional[Intent]:
+        """The command to act on: a stop anywhere wins, otherwise the first confident move."""
+        intents = [intent for intent in self.parse(text) if intent.confidence >= min_confidence]
+        for intent in intents:
+            if intent.action == "stop":
+                return intent
+        return intents[0] if intents else None
+
+    def _longest(self, tokens: List[str], start: int):
+        node = self._trie
+        end, found = None, None
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if "" in node:
+                end, found = i + 1, node[""]
+        return end, found
+
+    @staticmethod
+    def _slot_after(tokens: List[str], start: int, limit: int, direction: str):
+        """A number and unit after a command, past a few filler words: (value, unit fits, token span)."""
+        for i in range(start, min(limit, start + 4)):
+            number, used = _parse_number(tokens, i, limit)
+            if number is not None:
+                return _with_unit(tokens, i, i + used, limit, number, direction)
+            if tokens[i] not in FILLER or tokens[i] in THEN_WORDS:
+                break
+        return None, True, None
+
+    @staticmethod
+    def _slot_before(tokens: List[str], low: int, start: int, direction: str):
+        """A number and unit right before a command, with only filler words in between."""
+        for i in range(max(low, start - 4), start):
+            number, used = _parse_number(tokens, i, start)
+            if number is None:
+                continue
+            value, fits, slot = _with_unit(tokens, i, i + used, start, number, direction)
+            if all(token in FILLER for token in tokens[slot[1]:start]):
+                return value, fits, slot
+        return None, True, None
+
+
+def _with_unit(tokens: List[str], start: int, i: int, limit: int, number: float, direction: str):
+    unit = UNITS.get(tokens[i]) if i < limit else None
+    if unit is None:
+        return number, True, (start, i)  # bare number: cm or degrees, whichever the direction takes
+    kind, factor = unit
+    return number * factor, (kind == "turn") == (direction in TURN_DIRECTIONS), (start, i + 1)
+
+
+def _parse_number(tokens: List[str], i: int, limit: int) -> Tuple[Optional[float], int]:
+    """A number in digits or words starting at tokens[i]: (value, tokens used)."""
+    token = tokens[i]
+    if token[0].isdigit():
+        return float(token), 1
+    following = tokens[i + 1] if i + 1 < limit else None
+    if token == "half":
+        # "half a meter"
+        return 0.5, 2 if following in ("a", "an") else 1
+    start, current = i, None
+    if token in ("a", "an"):
+        if following in UNITS:
+            return 1.0, 1  # "a meter"
+        if following == "half":
+            return 0.5, 2  # "a half meter"
+        if following != "hundred":
+            return None, 0
+        current, i = 1, i + 1  # "a hundred"
+    while i < limit:
+        token = tokens[i]
+        if token in NUMBER_WORDS:
+            current = (current or 0) + NUMBER_WORDS[token]
+        elif token == "hundred":
+            current = (current or 1) * 100
+        elif not (token == "and" and current and i + 1 < limit and tokens[i + 1] in NUMBER_WORDS):
+            break  # "one hundred and twenty" keeps going
+        i += 1
+    if current is None:
+        return None, 0
+    return float(current), i - start
+
+
+def motion_steps(intents: List[Intent], move_distance: float = INTENT_MOVE_DISTANCE,
+                 turn_angle: float = INTENT_TURN_ANGLE) -> List[Tuple[str, float]]:
+    """(direction, value) for each move, with the defaults filled in where no value was spoken."""
+    return [
+        (intent.direction,
+         intent.value or (turn_angle if intent.direction in TURN_DIRECTIONS else move_distance))
+        for intent in intents if intent.action == "move"
+    ]
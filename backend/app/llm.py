@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator
+
+from app.metrics import observe, span
+
+GEMINI_MODEL = "gemini-2.0-flash"
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))  # seconds, including time queued
+
+CONCISE_SUFFIX = "\n Be Concise, keep all responses to 1 or two sentences"
+
+
+class LLMClient:
+    """Shared, concurrency-limited front end for a generative model.
+
+    One model object is reused for every request. At most `max_concurrency`
+    generations run at once; the rest wait their turn, and each request
+    fails with asyncio.TimeoutError once `timeout` seconds have passed.
+    """
+
+    def __init__(self, model, max_concurrency: int = GEMINI_MAX_CONCURRENCY, timeout: float = GEMINI_TIMEOUT):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.waiting = 0
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(self, prompt: str) -> str:
+        return await asyncio.wait_for(self._generate(prompt), self.timeout)
+
+    async def _generate(self, prompt: str) -> str:
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            with span("gemini", "generate"):
+                if hasattr(self.model, "generate_content_async"):
+                    response = await self.model.generate_content_async(prompt)
+                else:
+                    response = await asyncio.to_thread(self.model.generate_content, prompt)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+        return response.candidates[0].content.parts[0].text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield response text as the model produces it.
+
+        Holds a concurrency slot until the stream finishes or is closed, and
+        raises asyncio.TimeoutError if the whole response is not done within
+        `timeout` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        first = True
+        try:
+            if hasattr(self.model, "generate_content_async"):
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, stream=True), deadline - loop.time()
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), deadline - loop.time())
+                    except StopAsyncIteration:
+                        break
+                    text = _chunk_text(chunk)
+                    if text:
+                        if first:
+                            observe("gemini", "first_token", time.perf_counter() - started)
+                            first = False
+                        yield text
+            else:
+                # No async API: generate in one piece on a worker thread
+                response = await asyncio.wait_for(
+                    asyncio.to_thread(self.model.generate_content, prompt), deadline - loop.time()
+                )
+                observe("gemini", "first_token", time.perf_counter() - started)
+                yield response.candidates[0].content.parts[0].text
+        finally:
+            observe("gemini", "stream", time.perf_counter() - started)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+        }
+
+
+def _chunk_text(chunk) -> str:
+    # The last chunk of a stream can carry only a finish reason and no parts
+    if not chunk.candidates:
+        return ""
+    return "".join(part.text for part in chunk.candidates[0].content.parts)
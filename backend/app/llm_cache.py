@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 60 * 60)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+# Minimum estimated Jaccard similarity for a near-duplicate hit; 0 disables it
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+
+SHINGLE_SIZE = 4  # characters
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16  # 4 rows per band
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash signature of the character shingles of normalized text."""
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # Universal hashing (a * x + b) mod p, as a permutation per row
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> List[Tuple[int, int]]:
+    """(band, bucket) pairs for LSH lookup of similar signatures."""
+    rows = NUM_PERMUTATIONS // NUM_BANDS
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=7).digest(), "little"))
+        for band in range(NUM_BANDS)
+    ]
+
+
+class LLMResponseCache:
+    """SQLite-backed cache of LLM responses.
+
+    Prompts are matched exactly on their normalized text, and optionally
+    by MinHash/LSH near-duplicate search when `similarity` > 0. Entries
+    expire after `ttl` seconds and the least recently hit are evicted past
+    `max_entries`. Tables are created by the app.database migrations.
+    """
+
+    def __init__(self, pool, ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 similarity: float = LLM_CACHE_SIMILARITY):
+        self.pool = pool
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.sha256(normalize_prompt(prompt).encode()).hexdigest()
+
+    def lookup(self, prompt: str) -> Optional[Tuple[str, str]]:
+        """Return (response, "exact" | "near") for a cached prompt, or None."""
+        now = time.time()
+        normalized = normalize_prompt(prompt)
+        key = self.key(prompt)
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT key, response, latency FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            kind = "exact"
+
+            if row is None and self.similarity > 0:
+                row = self._nearest(conn, minhash_signature(normalized), now)
+                kind = "near"
+
+            if row is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            with conn:
+                conn.execute("UPDATE llm_cache SET last_hit_at = ?, hits = hits + 1 WHERE key = ?", (now, row["key"]))
+
+        with self._lock:
+            if kind == "exact":
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+            self.saved_seconds += row["latency"]
+        return row["response"], kind
+
+    def _nearest(self, conn, signature: np.ndarray, now: float):
+        buckets = band_buckets(signature)
+        placeholders = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+        candidates = conn.execute(f'''
+            SELECT DISTINCT c.key, c.response, c.latency, c.signature FROM llm_cache_bands b
+            JOIN llm_cache c ON c.key = b.key
+            WHERE ({placeholders}) AND c.created_at > ?
+        ''', [value for pair in buckets for value in pair] + [now - self.ttl]).fetchall()
+
+        best, best_score = None, self.similarity
+        for candidate in candidates:
+            other = np.frombuffer(candidate["signature"], dtype=np.uint32)
+            score = float(np.mean(other == signature))
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def store(self, prompt: str, response: str, latency: float):
+        now = time.time()
+        normalized = normalize_prompt(prompt)
+        key = self.key(prompt)
+        signature = minhash_signature(normalized)
+        with self.pool.connection() as conn, conn:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.execute('''
+                INSERT INTO llm_cache (key, prompt, response, latency, signature, created_at, last_hit_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            ''', (key, normalized, response, latency, signature.tobytes(), now, now))
+            conn.executemany(
+                "INSERT OR IGNORE INTO llm_cache_bands (band, bucket, key) VALUES (?, ?, ?)",
+                [(band, bucket, key) for band, bucket in band_buckets(signature)],
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now: float):
+        conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+        conn.execute('''
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,))
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> dict:
+        with self.pool.connection() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_ratio": (self.exact_hits + self.near_hits) / lookups if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
@@ -1,78 +1,114 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
 import base64
-import io
-import paho.mqtt.client as mqtt
 import json
-import sounddevice as sd
-import soundfile as sf
-from io import BytesIO
-from scipy import signal
-import numpy as np
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional, Tuple
 from datetime import datetime
-import sqlite3
 import uuid
-import subprocess
+import threading
+import asyncio
+import time
+import logging
+
+from app.database import pool, init_db, store_content, release_content, fts_query
+from app.design_content import canonical_content, decode_content, summarize_content
+from app.counters import DownloadCounter
+from app.cache import CachedResponse, LRUCache
+from app.tts_cache import AudioCache
+from app.audio_player import play_file, play_stream
+from app.playback import PlaybackNotStarted, PlaybackQueue, SpeechJob
+from app.llm import CONCISE_SUFFIX, GEMINI_MODEL, GEMINI_TIMEOUT, LLMClient
+from app.llm_cache import LLMResponseCache
+from app.sentences import SentenceChunker
+from app.robot_transport import MQTT_TOPIC, RobotTransport
+from app.motion import MotionScheduler
+from app.intents import INTENT_MIN_CONFIDENCE, IntentMatcher, motion_steps
+from app.drive_channel import DriveChannel
+from app.events import EventHistory
+from app.flows import PLAN_CACHE_SIZE, PLAN_CACHE_TTL, FlowActions, FlowRunner, compile_flow
+from app.providers import LazyProvider, ProviderUnavailable
+from app.audio_input import AudioFormatError, prepare
+from app.transcription import SAMPLE_RATE, TRANSCRIBE_BACKEND, MicroBatcher, create_backend
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, log, observe, registry, span
 
 # Load environment variables
 load_dotenv()
 
-# SQLite setup
-DATABASE_URL = "designs.db"
-
-def init_db():
-    conn = sqlite3.connect(DATABASE_URL)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS designs (
-            id TEXT PRIMARY KEY,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            author TEXT NOT NULL,
-            content TEXT NOT NULL,
-            created_at TIMESTAMP NOT NULL,
-            tags TEXT NOT NULL,
-            downloads INTEGER DEFAULT 0
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-# Initialize database
-init_db()
-
-# Configure API keys
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
-
-if not gemini_api_key:
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
-if not elevenlabs_api_key:
-    raise ValueError("ELEVENLABS_API_KEY environment variable is not set")
-
-genai.configure(api_key=gemini_api_key)
-eleven = ElevenLabs(api_key=elevenlabs_api_key)
-
-# Initialize MQTT client
-mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-mqtt_connected = False
-try:
-    mqtt_client.connect("localhost")
-    mqtt_client.loop_start()
-    mqtt_connected = True
-    print("Successfully connected to MQTT broker")
-except Exception as e:
-    print(f"Warning: Could not connect to MQTT broker: {e}")
-    print("Robot movement commands will be logged but not sent to robot")
-
-app = FastAPI()
+# The schema is created at startup, in lifespan()
+download_counter = DownloadCounter(pool)
+
+# Serialized design responses, keyed by ("design", id) and ("list", query)
+design_cache = LRUCache()
+# Compiled flow plans, keyed by (design id, content hash)
+plan_cache = LRUCache(PLAN_CACHE_SIZE, PLAN_CACHE_TTL)
+
+def _create_llm() -> LLMClient:
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable is not set")
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    return LLMClient(genai.GenerativeModel(GEMINI_MODEL))
+
+def _create_eleven():
+    api_key = os.getenv("ELEVENLABS_API_KEY")
+    if not api_key:
+        raise ValueError("ELEVENLABS_API_KEY environment variable is not set")
+    from elevenlabs.client import ElevenLabs
+
+    return ElevenLabs(api_key=api_key)
+
+TRANSCRIBE_MODAL_APP = os.getenv("TRANSCRIBE_MODAL_APP", "voice-command-whisper")  # `modal deploy voice_commands.py`
+AUDIO_MAX_UPLOAD_MB = float(os.getenv("AUDIO_MAX_UPLOAD_MB", "50"))
+
+def _create_transcriber() -> MicroBatcher:
+    remote = None
+    if TRANSCRIBE_BACKEND == "modal":
+        import modal
+
+        remote = modal.Cls.lookup(TRANSCRIBE_MODAL_APP, "WhisperModel")().transcribe_batch.remote
+    elif TRANSCRIBE_BACKEND == "fake":
+        log("TRANSCRIBE_BACKEND=fake: uploads get placeholder text, not a transcript", logging.WARNING)
+    return MicroBatcher(create_backend(TRANSCRIBE_BACKEND, remote))
+
+# SDKs are imported on first use; without a key only the endpoints that need the provider fail (503).
+# One long-lived Gemini model is shared by every /api/generate request.
+gemini = LazyProvider("Gemini", _create_llm)
+eleven = LazyProvider("ElevenLabs", _create_eleven)
+transcriber = LazyProvider("Transcription", _create_transcriber)
+
+async def _llm() -> LLMClient:
+    # The first call imports the Gemini SDK; keep that off the event loop
+    if gemini.ready:
+        return gemini.instance
+    return await asyncio.to_thread(gemini.get)
+
+llm_cache = LLMResponseCache(pool)
+
+# Shared MQTT connection to the robot; connects (and reconnects) in the background
+robot = RobotTransport()
+
+# Startup state of each subsystem, for /api/health
+subsystems = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Each subsystem starts on its own; one failing leaves the others (and the designs API) up
+    _start_subsystem("database", _start_database)
+    _start_subsystem("robot", robot.start)
+    _start_subsystem("speech", _start_speech)
+    if TTS_PREWARM_FILE:
+        threading.Thread(target=_prewarm_from_file, args=(TTS_PREWARM_FILE,), daemon=True).start()
+    yield
+    await _shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -81,18 +117,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Search-Truncated", "ETag", "X-Request-ID"],
 )
+# Outermost, so the latency includes the other middleware; sets the request id for log()
+app.add_middleware(MetricsMiddleware)
 
 class PromptRequest(BaseModel):
     prompt: str
+    cache: bool = True  # false skips the response cache lookup
+
+class StreamPromptRequest(PromptRequest):
+    speak: bool = False  # queue each finished sentence for speech as it arrives
 
 class SpeechRequest(BaseModel):
     text: str
+    priority: int = 0
+    interrupt: bool = False
+    wait: bool = False
+
+class FlowRunRequest(BaseModel):
+    start_id: Optional[str] = None  # the Start node to run from; required when there are several
+    all_starts: bool = False  # run every Start node at once instead
+
+class PrewarmRequest(BaseModel):
+    phrases: List[str]
 
 class MovementRequest(BaseModel):
     direction: str
     value: Optional[float]
 
+class MovementStep(BaseModel):
+    direction: str
+    value: float
+
+class MovementSequenceRequest(BaseModel):
+    steps: List[MovementStep]
+
+class IntentRequest(BaseModel):
+    text: str
+    execute: bool = False  # run the commands, not just parse them
+
 class Design(BaseModel):
     id: Optional[str] = None
     title: str
@@ -114,20 +178,23 @@ class Design(BaseModel):
             }
         }
 
-# Constants for movement
-LINEAR_SPEED = 0.2  # m/s
-ANGULAR_SPEED = 1.2  # rad/s
-
-MQTT_TOPIC = "robot/drive"
+# Text-to-speech settings
+TTS_VOICE_ID = "X5Vm9Ph9ZjPIHXw2QQQc"
+TTS_MODEL = "eleven_multilingual_v2"
+# Optional file with one phrase per line to synthesize at startup
+TTS_PREWARM_FILE = os.getenv("TTS_PREWARM_FILE")
 
-# Create audio directory if it doesn't exist
+# Synthesized speech is cached in the audio directory; its index is opened
+# when the speech subsystem starts, not at import
 AUDIO_DIR = os.path.join(os.path.dirname(__file__), "audio")
-os.makedirs(AUDIO_DIR, exist_ok=True)
+audio_cache = LazyProvider("Speech cache", lambda: AudioCache(AUDIO_DIR))
 
 def list_audio_devices():
     """List all available audio devices"""
     print("\nAvailable Audio Devices:")
     print("-" * 50)
+    import sounddevice as sd
+
     devices = sd.query_devices()
     for i, device in enumerate(devices):
         print(f"Device {i}: {device['name']}")
@@ -138,6 +205,8 @@ def list_audio_devices():
 
 def get_audio_device():
     """Find the USB audio device"""
+    import sounddevice as sd
+
     devices = sd.query_devices()
     device_id = None
     for i, device in enumerate(devices):
@@ -150,127 +219,626 @@ def get_audio_device():
     
     return device_id
 
+async def _generate(prompt: str, use_cache: bool = True):
+    """Return (text, cached) for a prompt, going through the response cache."""
+    if use_cache:
+        cached = await asyncio.to_thread(llm_cache.lookup, prompt)
+        if cached is not None:
+            return cached
+    else:
+        llm_cache.record_bypass()
+
+    # Generate content; queued behind other requests past the concurrency limit
+    llm = await _llm()
+    started = time.perf_counter()
+    text = await llm.generate(prompt)
+    log(f"LLM response: {text}")
+
+    await asyncio.to_thread(llm_cache.store, prompt, text, time.perf_counter() - started)
+    return text, None
+
 @app.post("/api/generate")
 async def generate_response(request: PromptRequest):
     try:
-        # Initialize the model
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # Generate content
-        response = model.generate_content(request.prompt + "\n Be Concise, keep all responses to 1 or two sentences")
-        print("ARJUN LOG RESPONSE")
-        print(response.candidates[0].content.parts[0].text)
-
-        return {"response": response.candidates[0].content.parts[0].text}
+        text, cached = await _generate(request.prompt + CONCISE_SUFFIX, request.cache)
+        return {"response": text, "cached": cached}
+    except asyncio.TimeoutError:
+        log(f"Timed out in generate_response after {GEMINI_TIMEOUT}s")
+        log(f"  Prompt: {request.prompt}")
+        raise HTTPException(status_code=504, detail="LLM request timed out")
+    except ProviderUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"Error in generate_response:")
-        print(f"  Type: {type(e).__name__}")
-        print(f"  Message: {str(e)}")
-        print(f"  Prompt: {request.prompt}")
+        log(f"Error in generate_response:")
+        log(f"  Type: {type(e).__name__}")
+        log(f"  Message: {str(e)}")
+        log(f"  Prompt: {request.prompt}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _sse_response(events) -> StreamingResponse:
+    """Stream an async iterator of _sse() strings as Server-Sent Events."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse_history(history: EventHistory, after: int) -> StreamingResponse:
+    """Replay an event history from `after` as Server-Sent Events, then follow it live."""
+    async def events():
+        async for event in history.follow(after):
+            yield _sse(event["event"], event)
+    return _sse_response(events())
+
+@app.post("/api/generate/stream")
+async def generate_stream(request: StreamPromptRequest):
+    """Stream the response as Server-Sent Events.
+
+    Emits `token` events as text arrives, a `sentence` event for each
+    sentence queued for speech when `speak` is set, then `done` with the
+    full response (or `error`).
+    """
+    if request.speak and not speech_queue.running:
+        raise _speech_unavailable()
+    prompt = request.prompt + CONCISE_SUFFIX
+
+    async def events():
+        chunker = SentenceChunker()
+
+        def speak(sentence):
+            job = speech_queue.submit(sentence)
+            return _sse("sentence", {"text": sentence, "job_id": job.id})
+
+        try:
+            if request.cache:
+                cached = await asyncio.to_thread(llm_cache.lookup, prompt)
+                if cached is not None:
+                    text, match = cached
+                    yield _sse("token", {"text": text})
+                    if request.speak:
+                        for sentence in chunker.feed(text) + [chunker.flush()]:
+                            if sentence:
+                                yield speak(sentence)
+                    yield _sse("done", {"response": text, "cached": match})
+                    return
+            else:
+                llm_cache.record_bypass()
+
+            started = time.perf_counter()
+            parts = []
+            llm = await _llm()
+            async for token in llm.stream(prompt):
+                parts.append(token)
+                yield _sse("token", {"text": token})
+                if request.speak:
+                    for sentence in chunker.feed(token):
+                        yield speak(sentence)
+            if request.speak:
+                rest = chunker.flush()
+                if rest:
+                    yield speak(rest)
+
+            text = "".join(parts)
+            log(f"LLM response: {text}")
+            await asyncio.to_thread(llm_cache.store, prompt, text, time.perf_counter() - started)
+            yield _sse("done", {"response": text, "cached": None})
+        except asyncio.TimeoutError:
+            log(f"Timed out in generate_stream after {GEMINI_TIMEOUT}s")
+            log(f"  Prompt: {request.prompt}")
+            yield _sse("error", {"detail": "LLM request timed out"})
+        except Exception as e:
+            log(f"Error in generate_stream: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+
+    return _sse_response(events())
+
+@app.get("/api/generate/stats")
+async def generate_stats():
+    return {
+        "client": gemini.instance.stats() if gemini.ready else None,
+        "provider": gemini.status(),
+        "cache": await asyncio.to_thread(llm_cache.stats)
+    }
+
+def _synthesize(text: str) -> bytes:
+    with span("elevenlabs", "synthesize"):
+        audio = eleven.get().generate(
+            text=text,
+            voice=TTS_VOICE_ID,
+            model=TTS_MODEL
+        )
+        return b''.join(audio)
+
+def _time_first_chunk(chunks):
+    """Pass audio chunks through, recording how long ElevenLabs took to send the first one."""
+    started = time.perf_counter()
+    for chunk in chunks:
+        if started is not None:
+            observe("elevenlabs", "first_chunk", time.perf_counter() - started)
+            started = None
+        yield chunk
+
+def _speak(job: SpeechJob, on_player):
+    """Play one queued speech job, from the cache or streamed from ElevenLabs."""
+    cache = audio_cache.get()
+    key = cache.key(job.text, TTS_VOICE_ID, TTS_MODEL)
+    filepath = cache.get(key)
+    job.cached = filepath is not None
+    
+    if filepath is not None:
+        with span("ffplay", "play_file"):
+            play_file(filepath, on_start=on_player)
+    else:
+        chunks = eleven.get().generate(
+            text=job.text,
+            voice=TTS_VOICE_ID,
+            model=TTS_MODEL,
+            stream=True
+        )
+        # Includes the synthesis, which streams into the player as it plays
+        with span("ffplay", "play_stream"):
+            play_stream(
+                _time_first_chunk(chunks),
+                on_complete=lambda data: cache.put(key, data, job.text),
+                on_start=on_player
+            )
+
+speech_queue = PlaybackQueue(_speak)
+
+def _speech_unavailable() -> HTTPException:
+    """503 for speech requests when the speech subsystem did not start."""
+    error = subsystems.get("speech", {}).get("error") or "not started"
+    return HTTPException(status_code=503, detail=f"Speech is unavailable: {error}")
+
 @app.post("/api/speak")
 async def text_to_speech(request: SpeechRequest):
+    """Queue text to be spoken through the robot's speaker.
+
+    Returns immediately with a job id; poll GET /api/speak/{job_id} for its
+    status. Higher `priority` jumps the queue and `interrupt` cuts off the
+    current and queued speech first (barge-in). `wait` holds the request
+    until playback has finished.
+    """
     try:
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        filename = f"speech_{timestamp}_{unique_id}.wav"
-        filepath = os.path.join(AUDIO_DIR, filename)
-
-        # Check for special phrases that use pre-recorded audio
-        text_normalized = request.text.lower().strip('-.,!?')
-        if text_normalized in ["wow", "uhhhhhhhhh lemme think about that"]:
-            special_filename = "wow.wav" if text_normalized == "wow" else "uhh.wav"
-            special_filepath = os.path.join(AUDIO_DIR, special_filename)
-            
-            if os.path.exists(special_filepath):
-                # Play existing special audio file using ffplay
-                subprocess.run(["ffplay", "-nodisp", "-autoexit", "-volume", "256", special_filepath], 
-                             stdout=subprocess.DEVNULL, 
-                             stderr=subprocess.DEVNULL)
-                return {"status": "success"}
+        job = speech_queue.submit(request.text, request.priority, request.interrupt)
         
-        # Generate audio using ElevenLabs
-        audio = eleven.generate(
-            text=request.text,
-            voice="X5Vm9Ph9ZjPIHXw2QQQc",
-            model="eleven_multilingual_v2"
-        )
+        if request.wait:
+            await job.done.wait()
+            if job.status == "failed":
+                raise HTTPException(status_code=500, detail=job.error)
 
-        # Save audio to file
-        audio_data = b''.join(audio)
-        with open(filepath, "wb") as f:
-            f.write(audio_data)
+        return {"status": "success", "job_id": job.id, "job_status": job.status}
+    except PlaybackNotStarted:
+        raise _speech_unavailable()
+    except HTTPException:
+        raise
+    except Exception as e:
+        log(f"Error in text_to_speech: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/speak")
+async def speech_status():
+    current = speech_queue.current
+    return {
+        "current": current.to_dict() if current else None,
+        "queued": [job.to_dict() for job in speech_queue.queued()]
+    }
+
+@app.get("/api/speak/{job_id}")
+async def speech_job_status(job_id: str):
+    job = speech_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Speech job not found")
+    return job.to_dict()
 
-        # Play the audio using ffplay
-        subprocess.run(["ffplay", "-nodisp", "-autoexit", filepath],
-                      stdout=subprocess.DEVNULL, 
-                      stderr=subprocess.DEVNULL)
+@app.post("/api/speak/stop")
+async def stop_speech():
+    """Cut off the current utterance and drop everything queued."""
+    stopped = speech_queue.stop_all()
+    return {"status": "success", "stopped": stopped}
 
-        # Save to special filename if it's a special phrase
-        if text_normalized in ["wow", "uhhhhhhhhh lemme think about that"]:
-            special_filename = "wow.wav" if text_normalized == "wow" else "uhh.wav"
-            special_filepath = os.path.join(AUDIO_DIR, special_filename)
-            with open(special_filepath, "wb") as f:
-                f.write(audio_data)
+@app.delete("/api/speak/{job_id}")
+async def cancel_speech(job_id: str):
+    if not speech_queue.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Speech job not found or already finished")
+    return {"status": "success"}
 
-        return {"status": "success", "filename": filename}
+@app.post("/api/speak/prewarm")
+def prewarm_speech(request: PrewarmRequest):
+    """Synthesize phrases ahead of time so their first use skips ElevenLabs."""
+    try:
+        added = audio_cache.get().prewarm(request.phrases, TTS_VOICE_ID, TTS_MODEL, _synthesize)
+        return {"status": "success", "added": added}
+    except ProviderUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"Error in text_to_speech: {str(e)}")
+        log(f"Error in prewarm_speech: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Map directions to MQTT commands
+VALID_DIRECTIONS = ["forward", "back", "left", "right"]
+
+def _publish_drive(command: str):
+    # Queued until the broker is reachable if the robot is offline
+    if not robot.publish(MQTT_TOPIC, command):
+        log(f"MQTT not connected - queued command: {command} ({robot.queued()} waiting)")
+
+# Turns distances and angles into drive commands at a fixed control rate
+motion = MotionScheduler(_publish_drive)
+# Same compiled matcher as the voice loop
+intent_matcher = IntentMatcher()
+
+@app.get("/api/robot/transport")
+async def robot_transport_stats():
+    return robot.stats()
+
+@app.get("/api/robot/motion")
+async def robot_motion_stats():
+    return motion.stats()
+
+def _drive_state() -> dict:
+    current = motion.current
+    return {
+        "connected": robot.connected,
+        "queued": robot.queued(),
+        "motion": current.to_dict() if current else None,
+    }
+
+# Persistent teleoperation socket; see app/drive_channel.py for the frames
+drive_channel = DriveChannel(motion, _drive_state)
+
+@app.websocket("/ws/drive")
+async def drive_socket(websocket: WebSocket):
+    await drive_channel.serve(websocket)
+
+@app.get("/api/robot/drive")
+async def robot_drive_stats():
+    return drive_channel.stats()
+
 @app.post("/api/move")
 async def handle_movement(request: MovementRequest):
     try:
-        print(f"Movement command received - Direction: {request.direction}, Value: {request.value}")
-        
-        # Map directions to MQTT commands
-        valid_directions = ["forward", "back", "left", "right"]
+        log(f"Movement command received - Direction: {request.direction}, Value: {request.value}")
         
-        if request.direction in valid_directions:
-            # Send command via MQTT only if connected
-            if mqtt_connected:
-                mqtt_client.publish(MQTT_TOPIC, request.direction)
-                print(f"Published MQTT command: {request.direction}")
-            else:
-                print(f"MQTT not connected - would have sent command: {request.direction}")
-            return {"status": "success", "message": f"Moving {request.direction}"}
+        if request.direction in VALID_DIRECTIONS:
+            if request.value is None or request.value <= 0:
+                # No distance or angle: one command, as before timed moves; /api/stop ends it
+                motion.send(request.direction)
+                return {"status": "success", "message": f"Moving {request.direction}", "motion": None}
+            # Returns straight away; the scheduler sends the stop when the move is done
+            current = motion.move(request.direction, request.value)
+            return {"status": "success", "message": f"Moving {request.direction}", "motion": current.to_dict()}
         else:
             raise ValueError(f"Invalid direction: {request.direction}")
 
     except Exception as e:
-        print(f"Error in handle_movement: {str(e)}")
+        log(f"Error in handle_movement: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/stop")
 async def handle_stop():
     try:
-        # Send stop command via MQTT only if connected
-        if mqtt_connected:
-            mqtt_client.publish(MQTT_TOPIC, "stop")
-            print("Published MQTT stop command")
-        else:
-            print("MQTT not connected - would have sent stop command")
-        return {"status": "success", "message": "Robot stopped"}
+        stopped = motion.stop()
+        log("Published MQTT command: stop")
+        return {"status": "success", "message": "Robot stopped", "motion": stopped.to_dict() if stopped else None}
+
+    except Exception as e:
+        log(f"Error in handle_stop: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/move/sequence")
+async def handle_movement_sequence(request: MovementSequenceRequest):
+    """Run the steps back to back on the server; follow them at /api/move/sequence/{id}/events."""
+    invalid = [step.direction for step in request.steps if step.direction not in VALID_DIRECTIONS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid direction: {invalid[0]}")
+    try:
+        trajectory = motion.run_sequence([(step.direction, step.value) for step in request.steps])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    log(f"Movement sequence {trajectory.id} started - {len(request.steps)} steps")
+    return trajectory.to_dict()
 
+@app.get("/api/move/sequence/{trajectory_id}")
+async def get_movement_sequence(trajectory_id: str):
+    trajectory = motion.get_trajectory(trajectory_id)
+    if trajectory is None:
+        raise HTTPException(status_code=404, detail="Trajectory not found")
+    return trajectory.to_dict()
+
+@app.get("/api/move/sequence/{trajectory_id}/events")
+async def movement_sequence_events(trajectory_id: str, after: int = Query(0, ge=0)):
+    """Server-Sent Events for a trajectory: past events from `after`, then live ones."""
+    trajectory = motion.get_trajectory(trajectory_id)
+    if trajectory is None:
+        raise HTTPException(status_code=404, detail="Trajectory not found")
+    return _sse_history(trajectory.history, after)
+
+@app.post("/api/intent")
+async def handle_intent(request: IntentRequest):
+    """Map a transcript to motion commands; with `execute`, run them like /api/move or /api/move/sequence."""
+    intents = intent_matcher.parse(request.text)
+    accepted = [intent for intent in intents if intent.confidence >= INTENT_MIN_CONFIDENCE]
+    stop = any(intent.action == "stop" for intent in accepted)
+    steps = [] if stop else motion_steps(accepted)
+    result = {
+        "intents": [intent.to_dict() for intent in intents],
+        "stop": stop,
+        "steps": [{"direction": direction, "value": value} for direction, value in steps],
+        "executed": None,
+    }
+    if not request.execute:
+        return result
+
+    if stop:
+        stopped = motion.stop()
+        result["executed"] = {"motion": stopped.to_dict() if stopped else None}
+    elif len(steps) == 1:
+        result["executed"] = {"motion": motion.move(*steps[0]).to_dict()}
+    elif steps:
+        result["executed"] = {"trajectory": motion.run_sequence(steps).to_dict()}
+    log(f"Intent executed - {request.text!r} -> {'stop' if stop else steps}")
+    return result
+
+async def _read_upload(request: Request) -> bytearray:
+    """The request body, chunked or not, in one buffer the decoder can view without copying."""
+    limit = int(AUDIO_MAX_UPLOAD_MB * 1024 * 1024)
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limit:
+        raise HTTPException(status_code=413, detail=f"Audio is larger than {AUDIO_MAX_UPLOAD_MB:g} MB")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Audio is larger than {AUDIO_MAX_UPLOAD_MB:g} MB")
+    return body
+
+@app.post("/api/audio")
+async def upload_audio(
+    request: Request,
+    sample_rate: int = Query(SAMPLE_RATE, ge=1000, le=384000),
+    channels: int = Query(1, ge=1, le=16),
+    encoding: Literal["s16le", "f32le"] = "s16le",
+    trim: bool = True,
+    transcribe: bool = True,
+):
+    """Transcribe an uploaded recording (WAV, or raw PCM described by the query), like the Listen node.
+
+    The audio is resampled to 16 kHz, normalized and, with `trim`, cut down
+    to the speech segments the voice activity detector finds. Each segment
+    is transcribed through the shared micro-batcher.
+    """
+    body = await _read_upload(request)
+    if not body:
+        raise HTTPException(status_code=400, detail="No audio in the request body")
+    try:
+        prepared = await asyncio.to_thread(prepare, body, sample_rate, channels, encoding, trim)
+    except AudioFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = prepared.to_dict()
+    result["text"] = None
+    if not transcribe:
+        return result
+
+    try:
+        batcher = transcriber.instance if transcriber.ready else await asyncio.to_thread(transcriber.get)
+        with span("transcription", "segments"):
+            futures = [asyncio.wrap_future(batcher.submit(segment.audio)) for segment in prepared.segments]
+            texts = await asyncio.gather(*futures)
+    except ProviderUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"Error in handle_stop: {str(e)}")
+        log(f"Error in upload_audio: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    for segment, text in zip(result["segments"], texts):
+        segment["text"] = text.strip()
+    result["text"] = " ".join(segment["text"] for segment in result["segments"] if segment["text"])
+    log(f"Audio transcribed - {prepared.duration:.1f} s, {len(texts)} segments: {result['text']!r}")
+    return result
+
+async def _flow_generate(prompt: str) -> str:
+    text, _ = await _generate(prompt + CONCISE_SUFFIX)
+    return text
+
+async def _flow_speak(text: str):
+    job = speech_queue.submit(text)
+    try:
+        await job.done.wait()
+    except asyncio.CancelledError:
+        speech_queue.cancel(job.id)
+        raise
+    if job.status == "failed":
+        raise RuntimeError(job.error)
+
+async def _flow_move(direction: str, value: float):
+    if direction != "stop" and direction not in VALID_DIRECTIONS:
+        raise ValueError(f"Invalid direction: {direction}")
+    if direction == "stop":
+        motion.stop()
+        return
+    current = motion.move(direction, value)
+    try:
+        await current.done.wait()
+    except asyncio.CancelledError:
+        if motion.current is current:
+            motion.stop()
+        raise
+
+async def _flow_move_sequence(steps: List[Tuple[str, float]]):
+    invalid = [direction for direction, _ in steps if direction not in VALID_DIRECTIONS]
+    if invalid:
+        raise ValueError(f"Invalid direction: {invalid[0]}")
+    trajectory = motion.run_sequence(steps)
+    try:
+        await trajectory.done.wait()
+    except asyncio.CancelledError:
+        if not trajectory.done.is_set():
+            motion.stop()
+        raise
+
+def _flow_step(operation: str, action):
+    """Time each flow node of one kind, as dependency "flow" in /metrics."""
+    async def timed(*args):
+        with span("flow", operation):
+            return await action(*args)
+    return timed
+
+# Runs design flows in-process, the way the Start node does in the browser
+flow_runner = FlowRunner(FlowActions(
+    _flow_step("generate", _flow_generate),
+    _flow_step("speak", _flow_speak),
+    _flow_step("move", _flow_move),
+    _flow_step("move_sequence", _flow_move_sequence),
+))
+
+def _start_database():
+    init_db()
+    download_counter.start()
+
+def _start_speech():
+    audio_cache.get()
+    speech_queue.start()
+
+def _start_subsystem(name: str, start):
+    started = time.perf_counter()
+    try:
+        start()
+        subsystems[name] = {"status": "ok", "error": None}
+    except Exception as e:
+        log(f"Error starting {name}: {str(e)}")
+        subsystems[name] = {"status": "failed", "error": str(e)}
+    subsystems[name]["startup_ms"] = (time.perf_counter() - started) * 1000
+
+def _prewarm_from_file(path: str):
+    try:
+        with open(path) as f:
+            added = audio_cache.get().prewarm(f, TTS_VOICE_ID, TTS_MODEL, _synthesize)
+        log(f"Prewarmed {added} phrases into the speech cache")
+    except Exception as e:
+        log(f"Error prewarming speech cache: {str(e)}")
+
+async def _shutdown():
+    steps = [
+        ("download counter", download_counter.stop),
+        ("flows", flow_runner.stop),
+        ("motion", lambda: motion.stop() if motion.current else None),
+        # After the flows, so their last commands get a chance to go out
+        ("robot", lambda: asyncio.to_thread(robot.stop)),
+        ("speech", speech_queue.stop),
+        ("database", pool.close),
+        ("audio cache", lambda: audio_cache.instance.close() if audio_cache.ready else None),
+        ("transcription", lambda: asyncio.to_thread(transcriber.instance.stop) if transcriber.ready else None),
+    ]
+    for name, stop in steps:
+        try:
+            result = stop()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            log(f"Error stopping {name}: {str(e)}")
+
+@app.get("/api/health")
+async def health():
+    """Startup state of each subsystem and provider; "degraded" if any of them is down."""
+    providers = {provider.name: provider.status() for provider in (gemini, eleven, transcriber)}
+    down = [name for name, state in subsystems.items() if state["status"] != "ok"]
+    down += [name for name, state in providers.items() if state["status"] == "unavailable"]
+    return {"status": "degraded" if down else "ok", "down": down, "subsystems": subsystems, "providers": providers}
+
+def _cache_lookups():
+    """(hits, misses) per cache, from counters in memory; no SQLite queries at scrape time."""
+    return {
+        "llm": (llm_cache.exact_hits + llm_cache.near_hits, llm_cache.misses),
+        "tts": (audio_cache.instance.hits, audio_cache.instance.misses) if audio_cache.ready else (0, 0),
+        "designs": (design_cache.hits, design_cache.misses),
+        "flow_plans": (plan_cache.hits, plan_cache.misses),
+    }
+
+registry.counter("cache_hits_total", "Cache hits since startup",
+                 lambda: {(name,): hits for name, (hits, _) in _cache_lookups().items()}, ("cache",))
+registry.counter("cache_misses_total", "Cache misses since startup",
+                 lambda: {(name,): misses for name, (_, misses) in _cache_lookups().items()}, ("cache",))
+registry.gauge("cache_hit_ratio", "Hits per lookup since startup",
+               lambda: {(name,): hits / (hits + misses) if hits + misses else 0.0
+                        for name, (hits, misses) in _cache_lookups().items()}, ("cache",))
+registry.gauge("mqtt_connected", "1 while connected to the MQTT broker", lambda: int(robot.connected))
+registry.gauge("mqtt_queue_depth", "Commands waiting for the broker", robot.queued)
+registry.counter("mqtt_published_total", "Commands handed to the broker", lambda: robot.published)
+registry.counter("mqtt_dropped_total", "Commands dropped from a full queue", lambda: robot.dropped)
+registry.counter("mqtt_disconnects_total", "Lost broker connections", lambda: robot.disconnects)
+registry.gauge("speech_queue_depth", "Speech jobs waiting to play", lambda: len(speech_queue.queued()))
+registry.gauge("speech_playing", "1 while a speech job is playing", lambda: int(speech_queue.current is not None))
+registry.gauge("llm_requests_waiting", "Gemini requests waiting for a concurrency slot",
+               lambda: gemini.instance.waiting if gemini.ready else 0)
+registry.gauge("llm_requests_in_flight", "Gemini requests running",
+               lambda: gemini.instance.in_flight if gemini.ready else 0)
+registry.gauge("provider_ready", "1 once a provider client is built, 0 before or when unavailable",
+               lambda: {(provider.name,): int(provider.ready) for provider in (gemini, eleven, transcriber)}, ("provider",))
+registry.gauge("transcription_queue_depth", "Speech segments waiting for the transcription backend",
+               lambda: transcriber.instance.stats()["queued"] if transcriber.ready else 0)
+registry.gauge("motion_active", "1 while a timed move is running", lambda: int(motion.current is not None))
+registry.counter("drive_frames_total", "Frames received on /ws/drive", lambda: drive_channel.frames)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: request and dependency latency histograms, caches, queues and MQTT state."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    # Stop MQTT client only if it was connected
-    if mqtt_connected:
-        mqtt_client.loop_stop()
-        mqtt_client.disconnect()
+# When set, searches rank only this many of the newest matches, so a term in every design
+# costs no more than a rare one; 0 ranks every match
+SEARCH_RANK_CANDIDATES = int(os.getenv("SEARCH_RANK_CANDIDATES", "0"))
 
+# Columns returned by ?fields=summary; everything except the content blob
+SUMMARY_COLUMNS = ["id", "title", "description", "author", "created_at", "tags", "downloads", "shape_count", "node_types"]
+
+def _row_to_design(row, pending):
+    design = {
+        "id": row["id"],
+        "title": row["title"],
+        "description": row["description"],
+        "author": row["author"],
+        "created_at": row["created_at"],
+        "tags": json.loads(row["tags"]),
+        "downloads": row["downloads"] + pending[row["id"]],
+        "shape_count": row["shape_count"],
+        "node_types": json.loads(row["node_types"])
+    }
+    if "data" in row.keys():
+        design["content"] = decode_content(row["codec"], row["data"])
+    return design
+
+def _write_tags(conn, design_id: str, tags: List[str]):
+    conn.execute('DELETE FROM design_tags WHERE design_id = ?', (design_id,))
+    conn.executemany('''
+        INSERT INTO design_tags (design_id, tag, created_at)
+        SELECT id, ?, created_at FROM designs WHERE id = ?
+    ''', [(tag, design_id) for tag in dict.fromkeys(tags)])
+
+def _invalidate_design(design_id: Optional[str] = None):
+    """Drop cached responses that may include the given design."""
+    if design_id is not None:
+        design_cache.invalidate(("design", design_id))
+    design_cache.invalidate_where(lambda key: key[0] == "list")
+
+def _cached_json_response(request: Request, cached: CachedResponse):
+    """Send a cached body, or 304 Not Modified if the client already has it."""
+    # no-cache: browsers may keep the body but must revalidate with the ETag
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", **cached.headers}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or cached.etag in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+# Design handlers are plain `def` so FastAPI runs them in its threadpool and
+# SQLite work never blocks the event loop serving /api/move and /api/stop.
 @app.post("/api/designs")
-async def create_design(design: Design):
+def create_design(design: Design):
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        c = conn.cursor()
-        
         design_id = str(uuid.uuid4())
         created_at = datetime.utcnow()
         
@@ -282,29 +850,33 @@ async def create_design(design: Design):
             )
         
         try:
-            content_json = json.dumps(design.content)
+            shape_count, node_types = summarize_content(design.content)
+            content_hash, content_json = canonical_content(design.content)
         except Exception as e:
             raise HTTPException(
                 status_code=422,
                 detail=f"Failed to serialize content: {str(e)}"
             )
         
-        c.execute('''
-            INSERT INTO designs (id, title, description, author, content, created_at, tags, downloads)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            design_id,
-            design.title,
-            design.description,
-            design.author,
-            content_json,
-            created_at.isoformat(),
-            json.dumps(design.tags),
-            0
-        ))
-        
-        conn.commit()
-        conn.close()
+        with pool.connection() as conn, conn:
+            store_content(conn, content_hash, content_json)
+            conn.execute('''
+                INSERT INTO designs (id, title, description, author, content_hash, created_at, tags, downloads, shape_count, node_types)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                design_id,
+                design.title,
+                design.description,
+                design.author,
+                content_hash,
+                created_at.isoformat(),
+                json.dumps(design.tags),
+                0,
+                shape_count,
+                json.dumps(node_types)
+            ))
+            _write_tags(conn, design_id, design.tags)
+        _invalidate_design()
         
         return {
             "id": design_id,
@@ -314,158 +886,342 @@ async def create_design(design: Design):
             "content": design.content,
             "created_at": created_at,
             "tags": design.tags,
-            "downloads": 0
+            "downloads": 0,
+            "shape_count": shape_count,
+            "node_types": node_types
         }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in create_design: {str(e)}")
+        log(f"Error in create_design: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create design: {str(e)}"
         )
 
+def _encode_cursor(row):
+    raw = json.dumps([row["created_at"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, design_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(design_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/api/designs")
-async def list_designs(skip: int = 0, limit: int = 10, tag: Optional[str] = None):
+def list_designs(
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    tag: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Literal["full", "summary"] = "full",
+):
+    """List designs newest first.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page; keyset pagination keeps deep pages as cheap as the first.
+    `skip` is still honoured when no cursor is given. `fields=summary` leaves
+    out the design content; fetch it from GET /api/designs/{design_id}.
+    """
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        c = conn.cursor()
-        
+        cache_key = ("list", skip, limit, tag, cursor, fields)
+        cached = design_cache.get(cache_key)
+        if cached is not None:
+            return _cached_json_response(request, cached)
+        generation = design_cache.generation
+
+        params = []
+        where = []
         if tag:
-            # Search for tag in JSON array
-            c.execute('''
-                SELECT * FROM designs 
-                WHERE json_array_length(json_extract(tags, '$[*]')) > 0 
-                AND tags LIKE ?
-                ORDER BY created_at DESC
-                LIMIT ? OFFSET ?
-            ''', (f'%"{tag}"%', limit, skip))
+            source = 'design_tags t JOIN designs d ON d.id = t.design_id'
+            order = 't.created_at DESC, t.design_id DESC'
+            where.append('t.tag = ?')
+            params.append(tag)
+            key = '(t.created_at, t.design_id)'
         else:
-            c.execute('''
-                SELECT * FROM designs 
-                ORDER BY created_at DESC
-                LIMIT ? OFFSET ?
-            ''', (limit, skip))
-            
-        rows = c.fetchall()
-        conn.close()
+            source = 'designs d'
+            order = 'd.created_at DESC, d.id DESC'
+            key = '(d.created_at, d.id)'
+
+        offset = skip
+        if cursor:
+            where.append(f'{key} < (?, ?)')
+            params.extend(_decode_cursor(cursor))
+            offset = 0
+
+        if fields == "summary":
+            columns = ', '.join(f'd.{column}' for column in SUMMARY_COLUMNS)
+        else:
+            columns = 'd.*, b.codec, b.data'
+            source += ' JOIN design_blobs b ON b.hash = d.content_hash'
+
+        query = f'SELECT {columns} FROM {source}'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += f' ORDER BY {order} LIMIT ? OFFSET ?'
+        params.extend([limit, offset])
+
+        def fetch():
+            with pool.connection() as conn:
+                return conn.execute(query, params).fetchall()
+
+        rows, pending = download_counter.read(fetch)
+
+        headers = {}
+        if rows and len(rows) == limit:
+            headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+
+        body = json.dumps([_row_to_design(row, pending) for row in rows]).encode()
+        cached = CachedResponse(body, headers)
+        design_cache.set(cache_key, cached, generation)
+        return _cached_json_response(request, cached)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log(f"Error in list_designs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/designs/search")
+def search_designs(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100)):
+    """Full-text search over title, description, author and tags, best match first.
+
+    Every match is ranked unless SEARCH_RANK_CANDIDATES is set; then only
+    that many of the newest are, and X-Search-Truncated says when some
+    matches were left out.
+    """
+    try:
+        match = fts_query(q)
+        if not match:
+            return []
         
-        designs = []
-        for row in rows:
-            designs.append({
-                "id": row[0],
-                "title": row[1],
-                "description": row[2],
-                "author": row[3],
-                "content": json.loads(row[4]),
-                "created_at": row[5],
-                "tags": json.loads(row[6]),
-                "downloads": row[7]
-            })
-            
-        return designs
+        columns = ', '.join(f'd.{column}' for column in SUMMARY_COLUMNS)
+
+        def fetch():
+            with pool.connection() as conn:
+                cutoff = None
+                if SEARCH_RANK_CANDIDATES:
+                    # The first match past the newest SEARCH_RANK_CANDIDATES, found by
+                    # walking the doclist in rowid order, which is cheap
+                    cutoff = conn.execute('''
+                        SELECT rowid FROM designs_fts
+                        WHERE designs_fts MATCH ?
+                        ORDER BY rowid DESC
+                        LIMIT 1 OFFSET ?
+                    ''', (match, SEARCH_RANK_CANDIDATES)).fetchone()
+                # rank is BM25 with the column weights configured in init_db;
+                # only the top hits are joined back to designs
+                rows = conn.execute(f'''
+                    SELECT {columns} FROM (
+                        SELECT design_id, rank FROM designs_fts
+                        WHERE designs_fts MATCH :match AND rowid > :cutoff
+                        ORDER BY rank
+                        LIMIT :limit
+                    ) AS hits
+                    JOIN designs d ON d.id = hits.design_id
+                    ORDER BY hits.rank
+                ''', {"match": match, "cutoff": cutoff[0] if cutoff else 0, "limit": limit}).fetchall()
+                return rows, cutoff is not None
+
+        (rows, truncated), pending = download_counter.read(fetch)
+        headers = {"X-Search-Truncated": "true"} if truncated else None
+        return JSONResponse([_row_to_design(row, pending) for row in rows], headers=headers)
     except Exception as e:
-        print(f"Error in list_designs: {str(e)}")
+        log(f"Error in search_designs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/designs/{design_id}")
-async def get_design(design_id: str):
+def get_design(design_id: str, request: Request):
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        c = conn.cursor()
-        
-        c.execute('SELECT * FROM designs WHERE id = ?', (design_id,))
-        row = c.fetchone()
-        conn.close()
+        cache_key = ("design", design_id)
+        cached = design_cache.get(cache_key)
+        if cached is not None:
+            return _cached_json_response(request, cached)
+        generation = design_cache.generation
         
+        def fetch():
+            with pool.connection() as conn:
+                return conn.execute('''
+                    SELECT d.*, b.codec, b.data FROM designs d
+                    JOIN design_blobs b ON b.hash = d.content_hash
+                    WHERE d.id = ?
+                ''', (design_id,)).fetchone()
+
+        row, pending = download_counter.read(fetch)
         if row:
-            return {
-                "id": row[0],
-                "title": row[1],
-                "description": row[2],
-                "author": row[3],
-                "content": json.loads(row[4]),
-                "created_at": row[5],
-                "tags": json.loads(row[6]),
-                "downloads": row[7]
-            }
+            cached = CachedResponse(json.dumps(_row_to_design(row, pending)).encode())
+            design_cache.set(cache_key, cached, generation)
+            return _cached_json_response(request, cached)
         raise HTTPException(status_code=404, detail="Design not found")
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in get_design: {str(e)}")
+        log(f"Error in get_design: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/designs/{design_id}")
-async def update_design(design_id: str, design: Design):
+def update_design(design_id: str, design: Design):
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        c = conn.cursor()
-        
-        c.execute('''
-            UPDATE designs 
-            SET title = ?, description = ?, author = ?, content = ?, tags = ?
-            WHERE id = ?
-        ''', (
-            design.title,
-            design.description,
-            design.author,
-            json.dumps(design.content),
-            json.dumps(design.tags),
-            design_id
-        ))
+        shape_count, node_types = summarize_content(design.content)
+        content_hash, content_json = canonical_content(design.content)
         
-        if c.rowcount == 0:
-            conn.close()
-            raise HTTPException(status_code=404, detail="Design not found")
+        with pool.connection() as conn, conn:
+            row = conn.execute('SELECT content_hash FROM designs WHERE id = ?', (design_id,)).fetchone()
+            if row is None:
+                raise HTTPException(status_code=404, detail="Design not found")
             
-        conn.commit()
-        conn.close()
+            store_content(conn, content_hash, content_json)
+            conn.execute('''
+                UPDATE designs 
+                SET title = ?, description = ?, author = ?, content_hash = ?, tags = ?, shape_count = ?, node_types = ?
+                WHERE id = ?
+            ''', (
+                design.title,
+                design.description,
+                design.author,
+                content_hash,
+                json.dumps(design.tags),
+                shape_count,
+                json.dumps(node_types),
+                design_id
+            ))
+            _write_tags(conn, design_id, design.tags)
+            if row["content_hash"] != content_hash:
+                release_content(conn, row["content_hash"])
+        _invalidate_design(design_id)
+        plan_cache.invalidate_where(lambda key: key[0] == design_id)
+        
         return {"message": "Design updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in update_design: {str(e)}")
+        log(f"Error in update_design: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/designs/{design_id}")
-async def delete_design(design_id: str):
+def delete_design(design_id: str):
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        c = conn.cursor()
-        
-        c.execute('DELETE FROM designs WHERE id = ?', (design_id,))
-        
-        if c.rowcount == 0:
-            conn.close()
-            raise HTTPException(status_code=404, detail="Design not found")
+        with pool.connection() as conn, conn:
+            row = conn.execute('SELECT content_hash FROM designs WHERE id = ?', (design_id,)).fetchone()
+            if row is None:
+                raise HTTPException(status_code=404, detail="Design not found")
             
-        conn.commit()
-        conn.close()
+            conn.execute('DELETE FROM designs WHERE id = ?', (design_id,))
+            release_content(conn, row["content_hash"])
+        _invalidate_design(design_id)
+        plan_cache.invalidate_where(lambda key: key[0] == design_id)
+        
         return {"message": "Design deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in delete_design: {str(e)}")
+        log(f"Error in delete_design: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/designs/{design_id}/download")
-async def increment_downloads(design_id: str):
+def increment_downloads(design_id: str):
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        c = conn.cursor()
+        with pool.connection() as conn:
+            row = conn.execute('SELECT 1 FROM designs WHERE id = ?', (design_id,)).fetchone()
         
-        c.execute('''
-            UPDATE designs 
-            SET downloads = downloads + 1
-            WHERE id = ?
-        ''', (design_id,))
-        
-        if c.rowcount == 0:
-            conn.close()
+        if row is None:
             raise HTTPException(status_code=404, detail="Design not found")
-            
-        conn.commit()
-        conn.close()
+        
+        # Coalesced in memory and written in batches by download_counter. Only the
+        # design's own response is dropped: list pages pick the count up when they
+        # expire, so a download click does not throw away every cached page.
+        download_counter.increment(design_id)
+        design_cache.discard(("design", design_id))
         return {"message": "Download count incremented"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        log(f"Error in increment_downloads: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _load_plan(design_id: str):
+    """Return the compiled plan for a design, or None if it does not exist.
+
+    Only the content hash is read on a cache hit; the content blob is
+    decompressed, parsed and compiled on a miss.
+    """
+    generation = plan_cache.generation
+    with pool.connection() as conn:
+        row = conn.execute('SELECT content_hash FROM designs WHERE id = ?', (design_id,)).fetchone()
+        if row is None:
+            return None
+        
+        cache_key = (design_id, row["content_hash"])
+        plan = plan_cache.get(cache_key)
+        if plan is not None:
+            return plan
+        
+        blob = conn.execute('SELECT codec, data FROM design_blobs WHERE hash = ?', (row["content_hash"],)).fetchone()
+    
+    plan = compile_flow(decode_content(blob["codec"], blob["data"]), row["content_hash"])
+    plan_cache.set(cache_key, plan, generation)
+    return plan
+
+@app.post("/api/designs/{design_id}/run")
+async def run_design(design_id: str, request: Optional[FlowRunRequest] = None):
+    """Execute a saved design's flow on the server.
+
+    Returns a run id right away; follow it with GET /api/runs/{run_id} or
+    the event stream at GET /api/runs/{run_id}/events.
+    """
+    try:
+        plan = await asyncio.to_thread(_load_plan, design_id)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="Design not found")
+        
+        start_ids = None
+        if request is not None and request.start_id is not None:
+            if plan.index.get(request.start_id) not in plan.start_nodes:
+                raise HTTPException(status_code=400, detail="start_id is not a Start node in this design")
+            start_ids = [request.start_id]
+        elif len(plan.start_nodes) > 1 and (request is None or not request.all_starts):
+            starts = ", ".join(plan.ids[i] for i in plan.start_nodes)
+            raise HTTPException(status_code=400, detail=f"The design has several Start nodes ({starts}); "
+                                                        "send start_id, or all_starts to run them all")
+        
+        run = flow_runner.start(plan, design_id, start_ids)
+        return {"status": "success", "run_id": run.id, "run_status": run.status}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in increment_downloads: {str(e)}")
+        log(f"Error in run_design: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/runs/{run_id}")
+async def run_status(run_id: str):
+    run = flow_runner.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run.to_dict()
+
+@app.get("/api/runs/{run_id}/events")
+async def run_events(run_id: str, after: int = Query(0, ge=0)):
+    """Server-Sent Events for a run: past events from `after`, then live ones."""
+    run = flow_runner.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return _sse_history(run.history, after)
+
+@app.post("/api/runs/{run_id}/cancel")
+async def cancel_run(run_id: str):
+    run = flow_runner.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if not run.cancel():
+        raise HTTPException(status_code=409, detail="Run already finished")
+    return {"status": "success"}
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {"designs": design_cache.stats(), "plans": plan_cache.stats(), "speech": audio_cache.instance.stats() if audio_cache.ready else None}
+
 @app.get("/")
 async def root():
     return RedirectResponse(url="http://localhost:3000")
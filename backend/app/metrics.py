@@ -0,0 +1,267 @@
+import bisect
+import contextvars
+import itertools
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "0") == "1"  # log the spans of every request, not just X-Trace ones
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Seconds; covers SQLite and MQTT (sub-ms) through LLM calls and playback (seconds)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette adds the charset
+
+# (request id as bytes, spans list or None) for the request being handled; one variable so setting it is cheap
+_request_var = contextvars.ContextVar("request", default=(None, None))
+_id_prefix = uuid.uuid4().hex[:8].encode() + b"-"
+_next_id = itertools.count(1).__next__
+
+# Every module logs through log() to this logger: plain lines on stdout, as the prints were,
+# and not passed on to the root logger so basicConfig() elsewhere does not repeat them
+logger = logging.getLogger("app")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, one series per label combination.
+
+    Each thread counts into its own shard, so `observe` is a bisect and two
+    list updates with no lock; shards are summed and the buckets made
+    cumulative only when rendered.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple, List[float]]] = []  # per thread: label values -> counts per bucket, +Inf, sum
+        self._shards_lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        try:
+            shard = self._local.series
+        except AttributeError:
+            shard = self._local.series = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        series = shard.get(label_values)
+        if series is None:
+            series = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        merged = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for values, series in list(shard.items()):
+                total = merged.setdefault(values, [0] * len(series))
+                for i, count in enumerate(series):
+                    total[i] += count
+        for values, series in sorted(merged.items(), key=lambda item: tuple(map(str, item[0]))):
+            total = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                total += count
+                labels = _format_labels(self.labels, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {total}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {total}")
+        return lines
+
+
+class Collected:
+    """A gauge or counter read from the live objects when /metrics is scraped.
+
+    `read()` returns a number, or {label values: number} for a labelled metric.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, read: Callable, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind  # "gauge" or "counter"
+        self.read = read
+        self.labels = labels
+
+    def render(self) -> List[str]:
+        value = self.read()
+        if value is None:
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        series = value if isinstance(value, dict) else {(): value}
+        for values, number in sorted(series.items()):
+            if number is not None:
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(number)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Everything /metrics exposes, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._names = set()
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable, labels: Tuple[str, ...] = ()) -> Collected:
+        return self._add(Collected(name, help, "gauge", read, labels))
+
+    def counter(self, name: str, help: str, read: Callable, labels: Tuple[str, ...] = ()) -> Collected:
+        return self._add(Collected(name, help, "counter", read, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines += metric.render()
+            except Exception as e:
+                # One broken reader must not take the whole scrape down
+                log(f"Error collecting metric {metric.name}: {str(e)}", logging.ERROR)
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        if metric.name in self._names:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._names.add(metric.name)
+        self._metrics.append(metric)
+        return metric
+
+
+registry = MetricsRegistry()
+request_latency = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency, including streamed bodies",
+    ("method", "route", "status"))
+dependency_latency = registry.histogram(
+    "dependency_duration_seconds", "Time spent in external dependencies and flow steps",
+    ("dependency", "operation"))
+
+
+def observe(dependency: str, operation: str, seconds: float):
+    """Record a dependency call timed elsewhere; also a span of the current request."""
+    if not METRICS_ENABLED:
+        return
+    dependency_latency.observe(seconds, dependency, operation)
+    spans = _request_var.get()[1]
+    if spans is not None:
+        spans.append((f"{dependency}.{operation}", seconds))
+
+
+class span:
+    """Time a block as a dependency call, e.g. `with span("gemini", "generate"):`."""
+
+    __slots__ = ("dependency", "operation", "started")
+
+    def __init__(self, dependency: str, operation: str):
+        self.dependency = dependency
+        self.operation = operation
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.dependency, self.operation, time.perf_counter() - self.started)
+        return False
+
+
+def log(message: str, level: int = logging.INFO):
+    """Log a line, prefixed with the current request id when there is one."""
+    if not logger.isEnabledFor(level):
+        return
+    request_id = _request_var.get()[0]
+    logger.log(level, f"[{request_id.decode('latin-1')}] {message}" if request_id else message)
+
+
+def new_request_id() -> bytes:
+    return b"%s%x" % (_id_prefix, _next_id())
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request ids, per-route latency, and span logs when tracing.
+
+    The request id comes from an `X-Request-ID` header or is generated,
+    is echoed in the response, and is available to `log()`
+    while the request runs, including in threads started with
+    asyncio.to_thread and tasks it creates. Routes are labelled by their
+    path template, so ids in URLs do not create new series.
+
+    A request with `X-Trace: 1` (or every request when TRACE_REQUESTS is
+    set) logs one line at the end with the dependency spans it waited on.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        trace = TRACE_REQUESTS
+        for name, value in scope["headers"]:
+            if name[0] == 120:  # only x- headers matter here
+                if name == b"x-request-id":
+                    request_id = value[:64]
+                elif name == b"x-trace":
+                    trace = value == b"1"
+        if request_id is None:
+            request_id = b"%s%x" % (_id_prefix, _next_id())
+        spans = [] if trace else None
+        token = _request_var.set((request_id, spans))
+        status = 500
+
+        def send_with_id(message):
+            # A plain function handing back send()'s awaitable: no extra coroutine per message
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", request_id)]
+            return send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            request_latency.observe(elapsed, scope["method"], route.path if route is not None else "unmatched", status)
+            if spans is not None:
+                waited = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in spans)
+                log(f"{scope['method']} {scope['path']} {status} {elapsed * 1000:.1f} ms" + (f" | {waited}" if waited else ""))
+            _request_var.reset(token)
@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, List, Optional, Tuple
+
+from app.events import EventHistory
+
+# Robot speeds used to turn distances and angles into drive durations
+LINEAR_SPEED = 0.2  # m/s
+ANGULAR_SPEED = 1.2  # rad/s
+
+MOTION_CONTROL_RATE = float(os.getenv("MOTION_CONTROL_RATE", "10"))  # drive commands per second
+
+LINEAR_DIRECTIONS = ("forward", "back")
+TURN_DIRECTIONS = ("left", "right")
+STOP_COMMAND = "stop"
+
+JITTER_SAMPLES = 1000
+# Finished trajectories kept around for status queries
+MAX_FINISHED_TRAJECTORIES = 32
+
+
+def motion_duration(direction: str, value: Optional[float]) -> Optional[float]:
+    """Seconds to drive for `value` cm (forward/back) or degrees (left/right).
+
+    Units match the Move node in the UI. A missing or zero value means
+    "until stopped" and returns None.
+    """
+    if not value or value <= 0:
+        return None
+    if direction in LINEAR_DIRECTIONS:
+        return (value / 100) / LINEAR_SPEED
+    if direction in TURN_DIRECTIONS:
+        return math.radians(value) / ANGULAR_SPEED
+    raise ValueError(f"Invalid direction: {direction}")
+
+
+class Motion:
+    __slots__ = ("id", "direction", "value", "duration", "status", "ticks",
+                 "started_at", "finished_at", "done", "trajectory")
+
+    def __init__(self, motion_id: int, direction: str, value: Optional[float], duration: Optional[float],
+                 trajectory: Optional["Trajectory"] = None):
+        self.id = motion_id
+        self.direction = direction
+        self.value = value
+        self.duration = duration
+        self.status = "running"  # running -> done | preempted
+        self.ticks = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self.done = asyncio.Event()
+        self.trajectory = trajectory
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "direction": self.direction,
+            "value": self.value,
+            "duration": self.duration,
+            "status": self.status,
+            "ticks": self.ticks,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class Trajectory:
+    """An ordered list of timed moves run back to back, with an event history."""
+
+    def __init__(self, steps: List[Tuple[str, float]], durations: List[float]):
+        self.id = str(uuid.uuid4())
+        self.steps = steps
+        self.durations = durations
+        self.step = -1  # index of the step running now
+        self.status = "running"  # running -> done | cancelled
+        self.started_at = time.time()
+        self.finished_at = None
+        self.done = asyncio.Event()
+        self.history = EventHistory(self.done)
+
+    def to_dict(self) -> dict:
+        return {
+            "trajectory_id": self.id,
+            "status": self.status,
+            "step": self.step,
+            "steps": [{"direction": d, "value": v, "duration": t}
+                      for (d, v), t in zip(self.steps, self.durations)],
+            "duration": sum(self.durations),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def _finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+        self.history.emit("trajectory_finished", status=status)
+        self.done.set()
+
+
+class MotionScheduler:
+    """Turns timed moves into drive commands published at a fixed control rate.
+
+    A move publishes its direction immediately and then every
+    1 / `control_rate` seconds until its duration is up, followed by a
+    stop. Ticks are event-loop timers at absolute times from the start of
+    the move, so a late tick does not push the later ones back, and no
+    thread sleeps. A new move or `stop()` preempts the current one.
+
+    A trajectory runs several moves back to back: each step starts from
+    the timer that ends the one before, with no stop in between.
+
+    `publish(command)` must not block. Pass `loop` to drive the scheduler
+    from something other than the running asyncio loop (e.g. a fake clock).
+    """
+
+    def __init__(self, publish: Callable[[str], None], control_rate: float = MOTION_CONTROL_RATE, loop=None):
+        self.publish = publish
+        self.period = 1 / control_rate
+        self.current: Optional[Motion] = None
+        self.jitter = deque(maxlen=JITTER_SAMPLES)  # seconds each tick ran late
+        self._loop = loop
+        self._timer = None
+        self._ids = itertools.count(1)
+        self._trajectories = OrderedDict()
+
+    def move(self, direction: str, value: Optional[float] = None) -> Motion:
+        duration = motion_duration(direction, value)
+        self._preempt()
+        motion = Motion(next(self._ids), direction, value, duration)
+        self._begin(motion, self._time())
+        return motion
+
+    def send(self, direction: str):
+        """Publish one drive command with no timing; the robot keeps going until a stop.
+
+        Any timed move is cut off first, without a stop in between.
+        """
+        if direction not in LINEAR_DIRECTIONS and direction not in TURN_DIRECTIONS:
+            raise ValueError(f"Invalid direction: {direction}")
+        self._preempt()
+        self.publish(direction)
+
+    def run_sequence(self, steps: List[Tuple[str, float]]) -> Trajectory:
+        """Run `steps` of (direction, value) in order; each needs a value."""
+        if not steps:
+            raise ValueError("A sequence needs at least one step")
+        durations = []
+        for direction, value in steps:
+            duration = motion_duration(direction, value)
+            if duration is None:
+                raise ValueError(f"Step {direction} needs a value greater than 0")
+            durations.append(duration)
+
+        self._preempt()
+        trajectory = Trajectory(steps, durations)
+        self._trajectories[trajectory.id] = trajectory
+        while len(self._trajectories) > MAX_FINISHED_TRAJECTORIES:
+            oldest_id, oldest = next(iter(self._trajectories.items()))
+            if not oldest.done.is_set():
+                break
+            del self._trajectories[oldest_id]
+
+        trajectory.history.emit("trajectory_started", steps=len(steps), duration=sum(durations))
+        self._next_step(trajectory, self._time())
+        return trajectory
+
+    def get_trajectory(self, trajectory_id: str) -> Optional[Trajectory]:
+        return self._trajectories.get(trajectory_id)
+
+    def stop(self) -> Optional[Motion]:
+        """Stop the robot now, cutting off the current move if there is one."""
+        stopped = self._preempt()
+        self.publish(STOP_COMMAND)
+        return stopped
+
+    def stats(self) -> dict:
+        jitter = sorted(self.jitter)
+        return {
+            "control_rate": 1 / self.period,
+            "current": self.current.to_dict() if self.current else None,
+            "jitter_ms": {
+                "samples": len(jitter),
+                "p50": jitter[len(jitter) // 2] * 1000 if jitter else None,
+                "p99": jitter[max(0, int(len(jitter) * 0.99) - 1)] * 1000 if jitter else None,
+                "max": jitter[-1] * 1000 if jitter else None,
+            },
+        }
+
+    def _time(self) -> float:
+        return (self._loop or asyncio.get_running_loop()).time()
+
+    def _begin(self, motion: Motion, start: float):
+        self.current = motion
+        end = start + motion.duration if motion.duration is not None else None
+        self._tick(motion, start, 0, start, end)
+
+    def _next_step(self, trajectory: Trajectory, start: float):
+        trajectory.step += 1
+        direction, value = trajectory.steps[trajectory.step]
+        duration = trajectory.durations[trajectory.step]
+        trajectory.history.emit("step_started", step=trajectory.step, direction=direction, value=value,
+                                 duration=duration, late_ms=(self._time() - start) * 1000)
+        self._begin(Motion(next(self._ids), direction, value, duration, trajectory), start)
+
+    def _on_timer(self, motion: Motion, scheduled: float, slot: int, start: float, end: Optional[float]):
+        self.jitter.append(max(0.0, self._time() - scheduled))
+        self._tick(motion, scheduled, slot, start, end)
+
+    def _tick(self, motion: Motion, scheduled: float, slot: int, start: float, end: Optional[float]):
+        if end is not None and scheduled >= end:
+            trajectory = motion.trajectory
+            self._finish(motion, "done")
+            if trajectory is not None:
+                trajectory.history.emit("step_finished", step=trajectory.step)
+                if trajectory.step + 1 < len(trajectory.steps):
+                    # Straight into the next step from the same deadline
+                    self._next_step(trajectory, end)
+                    return
+            self.publish(STOP_COMMAND)
+            if trajectory is not None:
+                trajectory._finish("done")
+            return
+
+        self.publish(motion.direction)
+        motion.ticks += 1
+        # Next slot on the fixed grid from the start; skip slots already missed
+        now = self._time()
+        slot = max(slot + 1, math.floor((now - start) / self.period) + 1)
+        next_tick = start + slot * self.period
+        if end is not None and next_tick >= end:
+            next_tick = end
+        loop = self._loop or asyncio.get_running_loop()
+        self._timer = loop.call_at(next_tick, self._on_timer, motion, next_tick, slot, start, end)
+
+    def _preempt(self) -> Optional[Motion]:
+        motion = self.current
+        if motion is None:
+            return None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._finish(motion, "preempted")
+        if motion.trajectory is not None:
+            motion.trajectory._finish("cancelled")
+        return motion
+
+    def _finish(self, motion: Motion, status: str):
+        motion.status = status
+        motion.finished_at = time.time()
+        motion.done.set()
+        if self.current is motion:
+            self.current = None
+            self._timer = None
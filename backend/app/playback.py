@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import logging
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.metrics import log
+
+MAX_FINISHED_JOBS = 256
+
+
+class PlaybackNotStarted(RuntimeError):
+    """Speech was submitted to a queue whose worker is not running."""
+
+
+class SpeechJob:
+    __slots__ = ("id", "text", "priority", "status", "error", "cached",
+                 "created_at", "started_at", "finished_at", "done")
+
+    def __init__(self, text: str, priority: int = 0):
+        self.id = str(uuid.uuid4())
+        self.text = text
+        self.priority = priority
+        self.status = "queued"  # queued -> playing -> done | failed | cancelled
+        self.error = None
+        self.cached = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "text": self.text,
+            "priority": self.priority,
+            "status": self.status,
+            "error": self.error,
+            "cached": self.cached,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class PlaybackQueue:
+    """Single-worker speech queue that keeps playback off the event loop.
+
+    Jobs play one at a time in priority order (higher first, FIFO within a
+    priority). `speak(job, on_player)` does the blocking synthesis and
+    playback on a worker thread and must call `on_player` with the player
+    process so it can be terminated by `cancel`, `stop` or a barge-in.
+    """
+
+    def __init__(self, speak: Callable[[SpeechJob, Callable[[subprocess.Popen], None]], None]):
+        self.speak = speak
+        self.current: Optional[SpeechJob] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._jobs = OrderedDict()
+        self._order = itertools.count()
+        self._player: Optional[subprocess.Popen] = None
+        self._player_lock = threading.Lock()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    def start(self):
+        if self._worker is None:
+            self._queue = asyncio.PriorityQueue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self.stop_all()
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def submit(self, text: str, priority: int = 0, interrupt: bool = False) -> SpeechJob:
+        """Queue text for playback; `interrupt` cuts off everything else first."""
+        if self._worker is None:
+            raise PlaybackNotStarted("Speech playback is not running")
+        if interrupt:
+            self.stop_all()
+        job = SpeechJob(text, priority)
+        self._remember(job)
+        self._queue.put_nowait((-priority, next(self._order), job))
+        return job
+
+    def get(self, job_id: str) -> Optional[SpeechJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.done.is_set():
+            return False
+        if job is self.current:
+            self._terminate_player()
+        self._finish(job, "cancelled")
+        return True
+
+    def stop_all(self) -> int:
+        """Cancel every queued job and cut off the one that is playing."""
+        stopped = 0
+        for job in list(self._jobs.values()):
+            if not job.done.is_set():
+                self._finish(job, "cancelled")
+                stopped += 1
+        self._terminate_player()
+        return stopped
+
+    def queued(self) -> list:
+        return [job for job in self._jobs.values() if job.status == "queued"]
+
+    async def _run(self):
+        while True:
+            _, _, job = await self._queue.get()
+            if job.done.is_set():
+                continue  # cancelled while queued
+            self.current = job
+            job.status = "playing"
+            job.started_at = time.time()
+            try:
+                await asyncio.to_thread(self.speak, job, self._set_player)
+                self._finish(job, "done")
+            except Exception as e:
+                log(f"Error playing speech job {job.id}: {str(e)}", logging.ERROR)
+                job.error = str(e)
+                self._finish(job, "failed")
+            finally:
+                self.current = None
+                self._set_player(None)
+
+    def _set_player(self, player: Optional[subprocess.Popen]):
+        with self._player_lock:
+            self._player = player
+            cancelled = self.current is not None and self.current.status == "cancelled"
+        if player is not None and cancelled:
+            player.terminate()
+
+    def _terminate_player(self):
+        with self._player_lock:
+            if self._player is not None and self._player.poll() is None:
+                self._player.terminate()
+
+    def _finish(self, job: SpeechJob, status: str):
+        if job.done.is_set():
+            return
+        job.status = status
+        job.finished_at = time.time()
+        job.done.set()
+
+    def _remember(self, job: SpeechJob):
+        self._jobs[job.id] = job
+        while len(self._jobs) > MAX_FINISHED_JOBS:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.done.is_set():
+                break
+            del self._jobs[oldest_id]
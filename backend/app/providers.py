@@ -0,0 +1,70 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from app.metrics import log
+
+PROVIDER_RETRY_AFTER = float(os.getenv("PROVIDER_RETRY_AFTER", "30"))  # seconds before a failed provider is retried
+
+
+class ProviderUnavailable(RuntimeError):
+    """An optional external service is not configured or could not be set up."""
+
+
+class LazyProvider:
+    """A client for an external service, built on first use instead of at import.
+
+    `factory` runs once, on whichever thread first calls `get()`, so the
+    SDK it imports is only loaded when something needs it. If it fails,
+    e.g. because an API key is missing, `get()` raises ProviderUnavailable
+    with the reason and the endpoints that depend on it fail on their own
+    while the rest of the app keeps working. The factory is tried again
+    after `retry_after` seconds.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], retry_after: float = PROVIDER_RETRY_AFTER):
+        self.name = name
+        self.factory = factory
+        self.retry_after = retry_after
+        self.instance = None
+        self.error: Optional[str] = None
+        self.init_ms: Optional[float] = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.instance is not None
+
+    def get(self):
+        if self.instance is not None:
+            return self.instance
+        with self._lock:
+            if self.instance is not None:
+                return self.instance
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+                raise ProviderUnavailable(f"{self.name} is unavailable: {self.error}")
+            started = time.perf_counter()
+            try:
+                instance = self.factory()
+            except Exception as e:
+                self.error = str(e)
+                self._failed_at = time.monotonic()
+                log(f"Error initializing {self.name}: {self.error}", logging.ERROR)
+                raise ProviderUnavailable(f"{self.name} is unavailable: {self.error}") from e
+            self.init_ms = (time.perf_counter() - started) * 1000
+            self.error = None
+            self._failed_at = None
+            self.instance = instance
+            return instance
+
+    def status(self) -> dict:
+        if self.instance is not None:
+            state = "ready"
+        elif self._failed_at is not None:
+            state = "unavailable"
+        else:
+            state = "not started"
+        return {"status": state, "error": self.error, "init_ms": self.init_ms}
@@ -0,0 +1,227 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import paho.mqtt.client as mqtt
+
+from app.metrics import log, observe
+
+MQTT_HOST = os.getenv("MQTT_HOST", "localhost")
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+MQTT_QOS = int(os.getenv("MQTT_QOS", "1"))
+MQTT_QUEUE_SIZE = int(os.getenv("MQTT_QUEUE_SIZE", "100"))  # commands held while disconnected
+MQTT_COMMAND_TTL = float(os.getenv("MQTT_COMMAND_TTL", "1.0"))  # seconds a queued drive command stays valid; 0 keeps them
+MQTT_RECONNECT_MIN = float(os.getenv("MQTT_RECONNECT_MIN", "1"))  # seconds
+MQTT_RECONNECT_MAX = float(os.getenv("MQTT_RECONNECT_MAX", "30"))  # seconds
+MQTT_KEEPALIVE = 30  # seconds
+
+MQTT_TOPIC = "robot/drive"
+STOP_COMMAND = "stop"
+
+LATENCY_SAMPLES = 1000
+
+
+class RobotTransport:
+    """Shared MQTT connection used for every command sent to the robot.
+
+    The paho network thread connects in the background and reconnects with
+    exponential backoff (`reconnect_min` doubling up to `reconnect_max`), so
+    a broker that is down at boot is picked up once it comes back.
+
+    While disconnected, commands wait in a bounded queue that drains in
+    order on reconnect; when it is full the oldest command is dropped. A
+    stop jumps to the head of the queue and drops the drive commands queued
+    for that topic before it, so they cannot run after the stop. Drive
+    commands that waited longer than `command_ttl` are dropped instead of
+    sent, so a reconnect does not replay stale motion; stops never expire.
+
+    Publish latency is measured from `publish` to the broker's ack (QoS 1/2)
+    or to the hand-off to the socket (QoS 0), including any time queued.
+    """
+
+    def __init__(self, host: str = MQTT_HOST, port: int = MQTT_PORT, qos: int = MQTT_QOS,
+                 queue_size: int = MQTT_QUEUE_SIZE, reconnect_min: float = MQTT_RECONNECT_MIN,
+                 reconnect_max: float = MQTT_RECONNECT_MAX, command_ttl: float = MQTT_COMMAND_TTL):
+        self.host = host
+        self.port = port
+        self.qos = qos
+        self.queue_size = queue_size
+        self.command_ttl = command_ttl
+        self.connected = False
+        self.published = 0
+        self.dropped = 0
+        self.expired = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.last_error = None
+        self._queue = deque()  # (topic, payload, qos, requested_at)
+        self._inflight = {}  # mid -> requested_at, until acked
+        self._early_acks = set()  # acked before publish() returned the mid
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()  # keeps sends in queue order
+
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        self.client.reconnect_delay_set(min_delay=reconnect_min, max_delay=reconnect_max)
+        self.client.on_connect = self._on_connect
+        self.client.on_connect_fail = self._on_connect_fail
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        self.client.connect_async(self.host, self.port, MQTT_KEEPALIVE)
+        self.client.loop_start()
+
+    def stop(self, flush_timeout: float = 2.0):
+        """Give queued and unacknowledged commands a moment to go out, then disconnect."""
+        if not self._started:
+            return
+        deadline = time.monotonic() + flush_timeout
+        while self.connected and (self._queue or self._inflight) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self._started = False
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def publish(self, topic: str, payload: str, qos: Optional[int] = None) -> bool:
+        """Send a command now if connected, otherwise queue it.
+
+        Returns True if it was handed to the broker connection, False if it
+        is waiting in the queue.
+        """
+        qos = self.qos if qos is None else qos
+        requested_at = time.perf_counter()
+        with self._send_lock:
+            with self._lock:
+                # Behind a backlog, queue too so commands keep their order
+                queued = not self.connected or bool(self._queue)
+                if queued:
+                    self._enqueue(topic, payload, qos, requested_at)
+            if queued:
+                self._drain_locked()
+                return False
+            return self._send(topic, payload, qos, requested_at)
+
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "connected": self.connected,
+                "broker": f"{self.host}:{self.port}",
+                "qos": self.qos,
+                "queued": len(self._queue),
+                "inflight": len(self._inflight),
+                "published": self.published,
+                "dropped": self.dropped,
+                "expired": self.expired,
+                "connects": self.connects,
+                "disconnects": self.disconnects,
+                "last_error": self.last_error,
+                "latency_ms": {
+                    "samples": len(latencies),
+                    "p50": latencies[len(latencies) // 2] * 1000 if latencies else None,
+                    "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else None,
+                    "max": latencies[-1] * 1000 if latencies else None,
+                },
+            }
+
+    def _enqueue(self, topic: str, payload: str, qos: int, requested_at: float):
+        if payload == STOP_COMMAND:
+            superseded = [item for item in self._queue if item[0] == topic]
+            self.dropped += len(superseded)
+            self._queue = deque(item for item in self._queue if item[0] != topic)
+            self._queue.appendleft((topic, payload, qos, requested_at))
+            return
+        if len(self._queue) >= self.queue_size:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append((topic, payload, qos, requested_at))
+
+    def _expired(self, payload: str, requested_at: float) -> bool:
+        return (payload != STOP_COMMAND and self.command_ttl > 0
+                and time.perf_counter() - requested_at > self.command_ttl)
+
+    def _send(self, topic: str, payload: str, qos: int, requested_at: float) -> bool:
+        info = self.client.publish(topic, payload, qos=qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            if qos == 0:
+                # paho only keeps QoS 1/2 messages for redelivery
+                with self._lock:
+                    self._enqueue(topic, payload, qos, requested_at)
+            return False
+
+        with self._lock:
+            self.published += 1
+            if qos == 0:
+                self._record_latency(requested_at)
+            elif info.mid in self._early_acks:
+                self._early_acks.discard(info.mid)
+                self._record_latency(requested_at)
+            else:
+                self._inflight[info.mid] = requested_at
+        return True
+
+    def _drain(self):
+        with self._send_lock:
+            self._drain_locked()
+
+    def _drain_locked(self):
+        while True:
+            with self._lock:
+                if not self.connected or not self._queue:
+                    return
+                topic, payload, qos, requested_at = self._queue.popleft()
+                if self._expired(payload, requested_at):
+                    self.expired += 1
+                    continue
+            if not self._send(topic, payload, qos, requested_at):
+                return
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            self.last_error = str(reason_code)
+            log(f"MQTT connection to {self.host}:{self.port} refused: {reason_code}", logging.WARNING)
+            return
+        log(f"Connected to MQTT broker at {self.host}:{self.port}")
+        with self._lock:
+            self.connected = True
+            self.connects += 1
+        # Drain off the network thread: paho holds its callback lock here,
+        # which a concurrent publish() may be waiting on while holding ours
+        threading.Thread(target=self._drain, daemon=True).start()
+
+    def _on_connect_fail(self, client, userdata):
+        self.last_error = f"could not connect to {self.host}:{self.port}"
+
+    def _on_disconnect(self, client, userdata, disconnect_flags, reason_code, properties):
+        with self._lock:
+            was_connected = self.connected
+            self.connected = False
+            if was_connected:
+                self.disconnects += 1
+        if was_connected and self._started:
+            self.last_error = str(reason_code)
+            log(f"Lost connection to MQTT broker ({reason_code}); reconnecting", logging.WARNING)
+
+    def _record_latency(self, requested_at: float):
+        latency = time.perf_counter() - requested_at
+        self._latencies.append(latency)
+        observe("mqtt", "publish", latency)
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        with self._lock:
+            requested_at = self._inflight.pop(mid, None)
+            if requested_at is None:
+                self._early_acks.add(mid)
+            else:
+                self._record_latency(requested_at)
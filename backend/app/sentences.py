@@ -0,0 +1,50 @@
+import re
+from typing import List, Optional
+
+# Words ending in "." that do not end a sentence
+ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "st", "vs", "etc", "e.g", "i.e", "approx", "no"}
+MIN_SENTENCE_CHARS = 20
+
+# Sentence punctuation, optionally followed by closing quotes/brackets, then whitespace
+_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
+
+
+class SentenceChunker:
+    """Split streamed text into sentences as soon as each one is complete.
+
+    Feed text fragments as they arrive; `feed` returns the sentences that
+    the new text completed and `flush` returns whatever is left at the end.
+    Sentences shorter than `min_chars` are held and joined with the next
+    one so TTS is not called for fragments like "Okay."
+    """
+
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()]
+            if self._is_abbreviation(self._buffer[start:match.start() + 1]):
+                continue
+            if len(candidate.strip()) < self.min_chars:
+                continue
+            sentences.append(candidate.strip())
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest or None
+
+    @staticmethod
+    def _is_abbreviation(text: str) -> bool:
+        if not text.endswith("."):
+            return False
+        words = text[:-1].split()
+        return bool(words) and words[-1].lower() in ABBREVIATIONS
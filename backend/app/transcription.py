@@ -0,0 +1,237 @@
+import importlib.util
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.metrics import log
+
+SAMPLE_RATE = 16000  # every backend takes mono float32 audio at this rate
+MAX_SEGMENT_S = 30  # Whisper's window; longer segments would be cut off
+
+# "local" (Whisper on this machine's CPU), "modal" (remote GPU) or "fake" (placeholder text,
+# only when asked for); by default local when openai-whisper is installed and modal otherwise
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND") or ("local" if importlib.util.find_spec("whisper") else "modal")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "tiny.en")
+TRANSCRIBE_MAX_BATCH = int(os.getenv("TRANSCRIBE_MAX_BATCH", "8"))
+TRANSCRIBE_MAX_WAIT_MS = float(os.getenv("TRANSCRIBE_MAX_WAIT_MS", "30"))  # latency budget for filling a batch
+
+LATENCY_SAMPLES = 1000
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    """Float samples in [-1, 1] as 16-bit little-endian PCM."""
+    return (np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def from_pcm16(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+
+
+class TranscriptionBackend(ABC):
+    """Turns 16 kHz mono float32 segments into text, several at a time."""
+
+    name = "base"
+
+    @abstractmethod
+    def transcribe_batch(self, segments: List[np.ndarray]) -> List[str]:
+        """One transcript per segment, in order."""
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.transcribe_batch([audio])[0]
+
+
+class WhisperBackend(TranscriptionBackend):
+    """openai-whisper in this process, on the CPU unless `device` says otherwise.
+
+    Segments stay in memory: each is padded to Whisper's 30 s window,
+    turned into a log-mel spectrogram, and the batch is decoded in one
+    forward pass.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name: str = WHISPER_MODEL, device: str = "cpu", download_root: Optional[str] = None):
+        import torch
+        import whisper
+
+        self._torch = torch
+        self._whisper = whisper
+        self.model = whisper.load_model(model_name, device=device, download_root=download_root)
+        self.options = whisper.DecodingOptions(
+            language="en",
+            without_timestamps=True,
+            fp16=device != "cpu",
+        )
+
+    def transcribe_batch(self, segments: List[np.ndarray]) -> List[str]:
+        whisper = self._whisper
+        n_mels = self.model.dims.n_mels
+        mels = self._torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(np.asarray(audio, dtype=np.float32)), n_mels=n_mels)
+            for audio in segments
+        ]).to(self.model.device)
+        results = whisper.decode(self.model, mels, self.options)
+        return [result.text.strip() for result in results]
+
+
+class ModalBackend(TranscriptionBackend):
+    """A remote Whisper reached through a Modal method.
+
+    `remote` is e.g. `WhisperModel().transcribe_batch.remote`: it takes a
+    list of 16-bit PCM byte strings and returns one transcript each, so a
+    batch costs one round trip and no files on either side.
+    """
+
+    name = "modal"
+
+    def __init__(self, remote: Callable[[List[bytes]], List[str]]):
+        self.remote = remote
+
+    def transcribe_batch(self, segments: List[np.ndarray]) -> List[str]:
+        return list(self.remote([to_pcm16(audio) for audio in segments]))
+
+
+class FakeBackend(TranscriptionBackend):
+    """Deterministic stand-in for tests and benchmarks.
+
+    Returns `text(audio)` for each segment (by default its duration) after
+    sleeping `call_latency` per batch plus `per_second` per second of audio,
+    a rough model of a model call with fixed overhead.
+    """
+
+    name = "fake"
+
+    def __init__(self, text: Optional[Callable[[np.ndarray], str]] = None,
+                 call_latency: float = 0.0, per_second: float = 0.0):
+        self.text = text or (lambda audio: f"{len(audio) / SAMPLE_RATE:.2f} seconds of audio")
+        self.call_latency = call_latency
+        self.per_second = per_second
+        self.calls = 0
+
+    def transcribe_batch(self, segments: List[np.ndarray]) -> List[str]:
+        self.calls += 1
+        seconds = sum(len(audio) for audio in segments) / SAMPLE_RATE
+        delay = self.call_latency + self.per_second * seconds
+        if delay:
+            time.sleep(delay)
+        return [self.text(audio) for audio in segments]
+
+
+def create_backend(name: str, remote: Optional[Callable[[List[bytes]], List[str]]] = None) -> TranscriptionBackend:
+    """Backend by name: "local", "modal" (needs `remote`) or "fake"."""
+    if name == "local":
+        return WhisperBackend()
+    if name == "modal":
+        if remote is None:
+            raise ValueError("The modal backend needs a remote transcribe_batch method")
+        return ModalBackend(remote)
+    if name == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown transcription backend: {name}")
+
+
+class MicroBatcher:
+    """Groups segments submitted around the same time into one backend call.
+
+    A single worker thread takes the first waiting segment, then keeps
+    collecting for up to `max_wait_ms` or until `max_batch` segments are
+    in hand, and transcribes them together. The wait counts from when the
+    oldest segment was submitted, so segments that queued up while the
+    previous batch was running go out straight away.
+    """
+
+    def __init__(self, backend: TranscriptionBackend, max_batch: int = TRANSCRIBE_MAX_BATCH,
+                 max_wait_ms: float = TRANSCRIBE_MAX_WAIT_MS):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.segments = 0
+        self.errors = 0
+        self._queue = deque()  # (audio, future, submitted_at)
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, audio: np.ndarray) -> Future:
+        future = Future()
+        with self._wake:
+            if self._stopping:
+                raise RuntimeError("Transcription batcher is stopped")
+            self._queue.append((audio, future, time.perf_counter()))
+            self._wake.notify()
+        return future
+
+    def transcribe(self, audio: np.ndarray, timeout: Optional[float] = None) -> str:
+        return self.submit(audio).result(timeout)
+
+    def stop(self):
+        with self._wake:
+            self._stopping = True
+            self._wake.notify()
+        self._worker.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "backend": self.backend.name,
+                "batches": self.batches,
+                "segments": self.segments,
+                "errors": self.errors,
+                "mean_batch": self.segments / self.batches if self.batches else None,
+                "queued": len(self._queue),
+                "latency_ms": {
+                    "samples": len(latencies),
+                    "p50": latencies[len(latencies) // 2] * 1000 if latencies else None,
+                    "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else None,
+                },
+            }
+
+    def _next_batch(self) -> list:
+        with self._wake:
+            while not self._queue and not self._stopping:
+                self._wake.wait()
+            if not self._queue:
+                return []
+            # Other callers can join until the oldest segment has used up its wait budget
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch and not self._stopping:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self._wake.wait(remaining):
+                    break
+            return [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                texts = self.backend.transcribe_batch([audio for audio, _, _ in batch])
+            except Exception as e:
+                log(f"Error in transcription batch: {str(e)}", logging.ERROR)
+                with self._lock:
+                    self.errors += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.segments += len(batch)
+                for _, _, submitted_at in batch:
+                    self._latencies.append(finished - submitted_at)
+            for (_, future, _), text in zip(batch, texts):
+                future.set_result(text)
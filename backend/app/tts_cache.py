@@ -0,0 +1,134 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of a phrase.
+
+    Punctuation is kept: "Really?" and "Really." are spoken differently.
+    """
+    return " ".join(text.lower().split())
+
+
+class AudioCache:
+    """Content-addressed on-disk cache of synthesized speech.
+
+    Audio is stored as <key>.mp3 in `directory`, where the key hashes the
+    normalized text, voice id and model. A small SQLite index tracks sizes
+    and last use so the least recently played clips are evicted once the
+    cache grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS audio (
+                    key TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_last_used ON audio (last_used_at)")
+
+    @staticmethod
+    def key(text: str, voice: str, model: str) -> str:
+        return hashlib.sha256(f"{voice}\0{model}\0{normalize_text(text)}".encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file for `key`, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT filename FROM audio WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                path = os.path.join(self.directory, row[0])
+                if os.path.exists(path):
+                    with self._conn:
+                        self._conn.execute("UPDATE audio SET last_used_at = ? WHERE key = ?", (time.time(), key))
+                    self.hits += 1
+                    return path
+                with self._conn:
+                    self._conn.execute("DELETE FROM audio WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def put(self, key: str, data: bytes, text: str) -> str:
+        """Store synthesized audio and return its path."""
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute('''
+                    INSERT OR REPLACE INTO audio (key, filename, size, text, last_used_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (key, os.path.basename(path), len(data), normalize_text(text), time.time()))
+            self._evict()
+        return path
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM audio").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, filename, size in self._conn.execute("SELECT key, filename, size FROM audio ORDER BY last_used_at"):
+            if total <= self.max_bytes:
+                break
+            evicted.append(key)
+            total -= size
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+        with self._conn:
+            self._conn.executemany("DELETE FROM audio WHERE key = ?", [(key,) for key in evicted])
+
+    def prewarm(self, phrases: Iterable[str], voice: str, model: str, synthesize: Callable[[str], bytes]) -> int:
+        """Synthesize any phrases that are not cached yet; returns how many were added."""
+        added = 0
+        for phrase in phrases:
+            phrase = phrase.strip()
+            if not phrase:
+                continue
+            key = self.key(phrase, voice, model)
+            with self._lock:
+                cached = self._conn.execute("SELECT 1 FROM audio WHERE key = ?", (key,)).fetchone()
+            if cached is None or not os.path.exists(self.path(key)):
+                self.put(key, synthesize(phrase), phrase)
+                added += 1
+        return added
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM audio").fetchone()
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,192 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+
+VAD_FRAME_MS = 20
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "10"))  # above the noise floor
+VAD_MIN_ENERGY_DB = -55.0  # dBFS; quieter frames are never speech
+VAD_VOICE_BAND = (80, 4000)  # Hz; above mains hum, below most hiss
+VAD_VOICE_RATIO = 0.6  # share of frame energy that must fall in the voice band
+VAD_START_MS = 60  # speech needed before a segment opens
+VAD_PRE_ROLL_MS = int(os.getenv("VAD_PRE_ROLL_MS", "300"))  # audio kept from before the onset
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "300"))  # silence that ends a segment
+VAD_TAIL_MS = 100  # silence kept after the last speech frame
+VAD_MAX_SEGMENT_S = float(os.getenv("VAD_MAX_SEGMENT_S", "5"))
+VAD_OVERLAP_MS = 500  # repeated at the start of the next piece when a segment is split
+
+
+class SpeechSegment:
+    __slots__ = ("audio", "start", "sample_rate", "split")
+
+    def __init__(self, audio: np.ndarray, start: int, sample_rate: int, split: bool):
+        self.audio = audio
+        self.start = start  # sample index in the stream
+        self.sample_rate = sample_rate
+        self.split = split  # cut at the length cap; the speech goes on in the next segment
+
+    @property
+    def start_time(self) -> float:
+        return self.start / self.sample_rate
+
+    @property
+    def end_time(self) -> float:
+        return (self.start + len(self.audio)) / self.sample_rate
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / self.sample_rate
+
+
+class AudioRing:
+    """Fixed-size ring of the most recent samples."""
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._end = 0
+        self.count = 0
+
+    def write(self, samples: np.ndarray):
+        capacity = len(self._data)
+        if len(samples) >= capacity:
+            self._data[:] = samples[-capacity:]
+            self._end = 0
+            self.count = capacity
+            return
+        first = min(len(samples), capacity - self._end)
+        self._data[self._end:self._end + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+        self._end = (self._end + len(samples)) % capacity
+        self.count = min(capacity, self.count + len(samples))
+
+    def read(self) -> np.ndarray:
+        """The buffered samples, oldest first, as a copy."""
+        return np.roll(self._data, -self._end)[len(self._data) - self.count:]
+
+    def clear(self):
+        self._end = 0
+        self.count = 0
+
+
+class SpeechSegmenter:
+    """Energy and spectral voice activity detection over a live sample stream.
+
+    Feed mono float samples as they arrive; `feed` returns the speech
+    segments that ended in them. A frame counts as speech when it is
+    `threshold_db` above an adaptive noise floor and most of its energy is
+    in the voice band, which rules out hum and broadband hiss.
+
+    A segment opens after `VAD_START_MS` of speech and includes the
+    `pre_roll_ms` before it (kept in a ring buffer), so onsets are not
+    clipped. It closes after `hangover_ms` of silence. Segments longer than
+    `max_segment_s` are emitted in pieces, each starting with the last
+    `VAD_OVERLAP_MS` of the one before, so a word cut at the boundary is
+    whole in one of them.
+    """
+
+    def __init__(self, sample_rate: int = 16000, threshold_db: float = VAD_THRESHOLD_DB,
+                 pre_roll_ms: int = VAD_PRE_ROLL_MS, hangover_ms: int = VAD_HANGOVER_MS,
+                 max_segment_s: float = VAD_MAX_SEGMENT_S):
+        self.sample_rate = sample_rate
+        self.threshold_db = threshold_db
+        self.frame = sample_rate * VAD_FRAME_MS // 1000
+        self.start_frames = max(1, VAD_START_MS // VAD_FRAME_MS)
+        self.hangover_frames = max(1, hangover_ms // VAD_FRAME_MS)
+        self.tail_frames = min(self.hangover_frames, VAD_TAIL_MS // VAD_FRAME_MS)
+        self.max_samples = int(max_segment_s * sample_rate)
+        self.overlap = min(sample_rate * VAD_OVERLAP_MS // 1000, self.max_samples // 2)
+        self.noise_db = VAD_MIN_ENERGY_DB
+
+        freqs = np.fft.rfftfreq(self.frame, 1 / sample_rate)
+        self._band = (freqs >= VAD_VOICE_BAND[0]) & (freqs <= VAD_VOICE_BAND[1])
+        self._window = np.hanning(self.frame).astype(np.float32)
+        self._pre_roll = AudioRing(max(self.frame, sample_rate * pre_roll_ms // 1000))
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._segment = np.empty(self.max_samples, dtype=np.float32)
+        self._length = 0  # samples in the open segment; 0 when idle
+        self._segment_start = 0
+        self._position = 0  # samples consumed so far
+        self._run = 0  # consecutive speech frames while idle
+        self._silence = 0  # consecutive non-speech frames in a segment
+        self.frames = 0
+        self.speech_frames = 0
+
+    @property
+    def active(self) -> bool:
+        return self._length > 0
+
+    def feed(self, samples: np.ndarray) -> List[SpeechSegment]:
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if len(self._pending):
+            samples = np.concatenate([self._pending, samples])
+        count = len(samples) // self.frame
+        self._pending = samples[count * self.frame:].copy()
+        if not count:
+            return []
+
+        frames = samples[:count * self.frame].reshape(count, self.frame)
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2
+        voice_ratio = power[:, self._band].sum(axis=1) / (power.sum(axis=1) + 1e-12)
+
+        segments = []
+        for frame, db, ratio in zip(frames, energy_db, voice_ratio):
+            speech = db > max(self.noise_db + self.threshold_db, VAD_MIN_ENERGY_DB) and ratio >= VAD_VOICE_RATIO
+            self.frames += 1
+            self.speech_frames += speech
+            segment = self._step(frame, speech, db)
+            if segment is not None:
+                segments.append(segment)
+            self._position += self.frame
+        return segments
+
+    def flush(self) -> Optional[SpeechSegment]:
+        """Close the open segment at the end of the stream, if there is one."""
+        if not self._length:
+            return None
+        return self._emit(self._length, split=False)
+
+    def _step(self, frame: np.ndarray, speech: bool, db: float) -> Optional[SpeechSegment]:
+        if not self._length:
+            self._pre_roll.write(frame)
+            if not speech:
+                self._run = 0
+                # Follow the noise floor down quickly and up slowly
+                rate = 0.5 if db < self.noise_db else 0.05
+                self.noise_db += rate * (db - self.noise_db)
+                return None
+            self._run += 1
+            if self._run < self.start_frames:
+                return None
+            # Open a segment with the pre-roll, which already holds this onset
+            audio = self._pre_roll.read()
+            self._pre_roll.clear()
+            self._segment[:len(audio)] = audio
+            self._length = len(audio)
+            self._segment_start = self._position + self.frame - len(audio)
+            self._silence = 0
+            return None
+
+        self._segment[self._length:self._length + self.frame] = frame
+        self._length += self.frame
+        self._silence = 0 if speech else self._silence + 1
+
+        if self._silence >= self.hangover_frames:
+            # Drop the trailing silence beyond a short tail
+            keep = self._length - (self._silence - self.tail_frames) * self.frame
+            return self._emit(keep, split=False)
+        if self._length + self.frame > self.max_samples:
+            return self._emit(self._length, split=True)
+        return None
+
+    def _emit(self, length: int, split: bool) -> SpeechSegment:
+        segment = SpeechSegment(self._segment[:length].copy(), self._segment_start, self.sample_rate, split)
+        if split:
+            # Carry the overlap into the next piece
+            self._segment[:self.overlap] = self._segment[self._length - self.overlap:self._length]
+            self._segment_start += self._length - self.overlap
+            self._length = self.overlap
+        else:
+            self._length = 0
+            self._run = 0
+        return segment
@@ -0,0 +1,124 @@
+"""Throughput of the upload pipeline behind POST /api/audio.
+
+Builds --minutes of synthetic speech (voiced bursts between quiet gaps)
+and encodes it the ways an upload can arrive: 16 kHz mono 16-bit WAV,
+44.1 kHz stereo 16-bit WAV, 48 kHz stereo 24-bit WAV and raw 48 kHz
+float32 PCM. Each is run through app.audio_input.prepare, and the CPU
+time of each stage (decode, resample to 16 kHz, normalize, VAD trim) is
+reported as minutes of audio per second of CPU. For comparison, the same
+inputs go through a straightforward version: the wave module, float64
+copies and FFT resampling with scipy.signal.resample.
+
+Exits non-zero if the slowest input runs at less than --min-throughput
+minutes of audio per CPU second. That every encoding decodes to the same
+signal, and what the resampler and VAD keep, is checked by
+tests/test_audio_input.py:
+
+    python benchmarks/audio_preprocessing.py --minutes 10
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio_input import prepare
+from app.transcription import SAMPLE_RATE
+from tests.synthetic_audio import synthetic_speech, wav_bytes
+
+STAGES = ["decode", "resample", "normalize", "vad"]
+
+
+def straightforward(data):
+    """The pipeline without in-place or zero-copy work, for comparison."""
+    from scipy.signal import resample as fft_resample
+
+    timings = {}
+    started = time.process_time()
+    with wave.open(io.BytesIO(data)) as source:
+        rate, channels, width = source.getframerate(), source.getnchannels(), source.getsampwidth()
+        frames = source.readframes(source.getnframes())
+    if width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float64) / 32768
+    else:
+        packed = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = ((packed[:, 0] << 8 | packed[:, 1] << 16 | packed[:, 2] << 24) >> 8) / 2 ** 23
+    audio = samples.reshape(-1, channels).mean(axis=1)
+    timings["decode"] = time.process_time() - started
+    started = time.process_time()
+    if rate != SAMPLE_RATE:
+        audio = fft_resample(audio, int(len(audio) * SAMPLE_RATE / rate))
+    timings["resample"] = time.process_time() - started
+    started = time.process_time()
+    audio = audio - np.mean(audio)
+    audio = audio * (0.9 / np.abs(audio).max())
+    timings["normalize"] = time.process_time() - started
+    return timings
+
+
+def cpu_timed(fn, repeat):
+    """(result of the median run, its stage timings, its total CPU seconds)."""
+    runs = []
+    for _ in range(repeat):
+        started = time.process_time()
+        result = fn()
+        runs.append((time.process_time() - started, result))
+    runs.sort(key=lambda run: run[0])
+    total, result = runs[len(runs) // 2]
+    return result, (result.timings if hasattr(result, "timings") else result), total
+
+
+def check(name, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-throughput", type=float, default=5,
+                        help="minutes of audio per CPU second, end to end, for the slowest input")
+    args = parser.parse_args()
+    seconds = args.minutes * 60
+    minutes = args.minutes
+
+    speech16, _ = synthetic_speech(SAMPLE_RATE, seconds)
+    speech44, _ = synthetic_speech(44100, seconds)
+    speech48, _ = synthetic_speech(48000, seconds)
+    inputs = [
+        ("16 kHz mono 16-bit WAV", wav_bytes(speech16, SAMPLE_RATE, 1, 2), {}),
+        ("44.1 kHz stereo 16-bit WAV", wav_bytes(speech44, 44100, 2, 2), {}),
+        ("48 kHz stereo 24-bit WAV", wav_bytes(speech48, 48000, 2, 3), {}),
+        ("48 kHz mono f32 raw PCM", speech48.astype("<f4").tobytes(), {"sample_rate": 48000, "encoding": "f32le"}),
+    ]
+
+    print(f"{minutes:g} min of audio, median of {args.repeat} runs, minutes of audio per CPU second:")
+    print(f"{'input':<28}" + "".join(f"{stage:>11}" for stage in STAGES) + f"{'total':>11}{'baseline':>11}")
+    slowest = None
+    for name, data, options in inputs:
+        _, timings, total = cpu_timed(lambda: prepare(data, **options), args.repeat)
+        # No VAD in the baseline, so compare it with the stages it does have
+        _, baseline, _ = cpu_timed(lambda: straightforward(data), args.repeat) if name.endswith("WAV") else (None, None, None)
+        rate = minutes / total
+        slowest = rate if slowest is None else min(slowest, rate)
+        cells = "".join(f"{minutes / timings[stage]:>11.0f}" if timings[stage] > 0 else f"{'-':>11}" for stage in STAGES)
+        if baseline:
+            ours = sum(timings[stage] for stage in baseline)
+            base = f"{minutes / sum(baseline.values()):.0f} ({sum(baseline.values()) / ours:.1f}x)"
+        else:
+            base = "-"
+        print(f"{name:<28}{cells}{rate:>11.0f}{base:>11}")
+    print("(baseline: decode, resample and normalize only, with the speedup of the same stages here)")
+    ok = check(f"slowest input runs at {slowest:.0f} min of audio per CPU second "
+               f"(at least {args.min_throughput:g})", slowest >= args.min_throughput)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Search benchmark: FTS5 index versus LIKE scans.
+
+Seeds a temporary catalog with varied titles, descriptions, authors and tags,
+then times the same queries through the designs_fts index as used by
+GET /api/designs/search: BM25 over every match (the default) and over the
+newest --candidates matches (with SEARCH_RANK_CANDIDATES set). It also
+times the LIKE scan the marketplace used to rely on. "robot" is in nearly
+every design, the worst case for ranking.
+
+Checks that with the cap, the slowest query stays within --max-ms at the
+median, and that queries with at most --candidates matches come back in
+the same order as with every match ranked:
+
+    python benchmarks/design_search.py --designs 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "robot dance greeter patrol follow line maze speech talk listen joke story "
+    "weather assistant security camera kitchen helper butler pet dog cat music "
+    "party lights forward turn spin explore map warehouse delivery tour guide"
+).split()
+TAGS = ["robot", "movement", "speech", "ai", "llm", "decide", "demo", "wip"]
+QUERIES = ["robot", "dance party", "warehouse delivery", "tour gui", "kitchen helper joke", "maker1234", "no such design"]
+
+SUMMARY = "d.id, d.title, d.description, d.author, d.created_at, d.tags, d.downloads"
+
+
+def seed(conn, count, rng):
+    from app.database import store_content
+    from app.design_content import canonical_content
+
+    content_hash, raw = canonical_content({"shapes": []})
+    start = datetime(2024, 1, 1)
+    with conn:
+        store_content(conn, content_hash, raw)
+        conn.executemany('''
+            INSERT INTO designs (id, title, description, author, content_hash, created_at, tags, downloads)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+        ''', [
+            (
+                str(uuid.uuid4()),
+                " ".join(rng.sample(WORDS, 3)).title(),
+                " ".join(rng.choices(WORDS, k=12)),
+                f"maker{rng.randrange(2000)}",
+                content_hash,
+                (start + timedelta(seconds=i)).isoformat(),
+                json.dumps(rng.sample(TAGS, 2)),
+            )
+            for i in range(count)
+        ])
+
+
+def like_search(conn, q, limit):
+    clauses = []
+    params = []
+    for word in q.split():
+        clauses.append("(d.title LIKE ? OR d.description LIKE ? OR d.author LIKE ? OR d.tags LIKE ?)")
+        params.extend([f"%{word}%"] * 4)
+    return conn.execute(
+        f"SELECT {SUMMARY} FROM designs d WHERE {' AND '.join(clauses)} ORDER BY d.created_at DESC LIMIT ?",
+        params + [limit],
+    ).fetchall()
+
+
+def fts_search(conn, q, limit, candidates=500):
+    """BM25 over the newest `candidates` matches, as search does with SEARCH_RANK_CANDIDATES set."""
+    from app.database import fts_query
+
+    match = fts_query(q)
+    cutoff = conn.execute('''
+        SELECT rowid FROM designs_fts
+        WHERE designs_fts MATCH ?
+        ORDER BY rowid DESC
+        LIMIT 1 OFFSET ?
+    ''', (match, candidates)).fetchone()
+    return conn.execute(f'''
+        SELECT {SUMMARY} FROM (
+            SELECT design_id, rank FROM designs_fts
+            WHERE designs_fts MATCH :match AND rowid > :cutoff
+            ORDER BY rank
+            LIMIT :limit
+        ) AS hits
+        JOIN designs d ON d.id = hits.design_id
+        ORDER BY hits.rank
+    ''', {"match": match, "cutoff": cutoff[0] if cutoff else 0, "limit": limit}).fetchall()
+
+
+def fts_full_rank(conn, q, limit):
+    """BM25 over every match, as search does by default."""
+    from app.database import fts_query
+
+    return conn.execute(f'''
+        SELECT {SUMMARY} FROM (
+            SELECT design_id, rank FROM designs_fts
+            WHERE designs_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ) AS hits
+        JOIN designs d ON d.id = hits.design_id
+        ORDER BY hits.rank
+    ''', (fts_query(q), limit)).fetchall()
+
+
+def match_count(conn, q):
+    from app.database import fts_query
+
+    return conn.execute("SELECT count(*) FROM designs_fts WHERE designs_fts MATCH ?", (fts_query(q),)).fetchone()[0]
+
+
+def measure(search, conn, q, runs, limit):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        search(conn, q, limit)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[max(0, int(len(latencies) * 0.99) - 1)]
+
+
+def check(name, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--designs", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--candidates", type=int, default=500, help="SEARCH_RANK_CANDIDATES")
+    parser.add_argument("--max-ms", type=float, default=40.0, help="budget for the slowest query, median")
+    args = parser.parse_args()
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = os.path.join(tmp, "search.db")
+        from app.database import init_db, pool
+
+        init_db()
+        with pool.connection() as conn:
+            start = time.perf_counter()
+            seed(conn, args.designs, random.Random(0))
+            print(f"Seeded {args.designs} designs in {time.perf_counter() - start:.1f}s\n")
+
+            def bounded(conn, q, limit):
+                return fts_search(conn, q, limit, args.candidates)
+
+            print(f"{'query':<22} {'matches':>8} {'LIKE p50/p99 (ms)':>20} {'all ranked p50/p99':>20} "
+                  f"{'capped p50/p99 (ms)':>20}")
+            worst = (0, None)
+            for q in QUERIES:
+                like = measure(like_search, conn, q, args.runs, args.limit)
+                fts = measure(bounded, conn, q, args.runs, args.limit)
+                full = measure(fts_full_rank, conn, q, args.runs, args.limit)
+                matches = match_count(conn, q)
+                print(f"{q:<22} {matches:>8} {like[0] * 1000:>9.2f}/{like[1] * 1000:<10.2f} "
+                      f"{full[0] * 1000:>9.2f}/{full[1] * 1000:<10.2f} {fts[0] * 1000:>9.2f}/{fts[1] * 1000:<10.2f}")
+                worst = max(worst, (fts[0], q))
+                if matches <= args.candidates:
+                    same = bounded(conn, q, args.limit) == fts_full_rank(conn, q, args.limit)
+                    results.append(check(f"{q!r}: {matches} matches, same order as ranking every match", same))
+            results.append(check(f"capped, slowest query {worst[1]!r} takes {worst[0] * 1000:.1f} ms "
+                                 f"(at most {args.max_ms:g})", worst[0] * 1000 <= args.max_ms))
+        pool.close()
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Storage benchmark for design content.
+
+Builds a synthetic corpus of tldraw snapshots (originals, forks with small
+edits, and exact re-shares) and stores it twice: once as raw JSON TEXT the way
+designs used to be stored, and once through the compressed, content-addressed
+blob table. Reports bytes per design and read latency for both:
+
+    python benchmarks/design_storage.py --designs 2000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NODE_TYPES = ["start", "llm", "decide", "speech", "movement", "arrow", "text"]
+
+
+def make_design(rng, shapes):
+    store = {}
+    for n in range(shapes):
+        shape_id = f"shape:{rng.getrandbits(64):x}"
+        store[shape_id] = {
+            "id": shape_id,
+            "typeName": "shape",
+            "type": rng.choice(NODE_TYPES),
+            "x": rng.uniform(0, 2000),
+            "y": rng.uniform(0, 2000),
+            "rotation": 0,
+            "isLocked": False,
+            "opacity": 1,
+            "parentId": "page:page",
+            "index": f"a{n}",
+            "props": {"w": 250, "h": 180, "title": "Node", "instruction": "Say something friendly", "isLoading": False},
+            "meta": {},
+        }
+    return {"store": store, "schema": {"schemaVersion": 2, "sequences": {"com.tldraw.shape": 4}}}
+
+
+def make_corpus(count, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        roll = rng.random()
+        if corpus and roll < 0.2:
+            corpus.append(rng.choice(corpus))  # re-shared as-is
+        elif corpus and roll < 0.5:
+            fork = json.loads(json.dumps(rng.choice(corpus)))
+            shape = rng.choice(list(fork["store"].values()))
+            shape["x"] += 10
+            corpus.append(fork)
+        else:
+            corpus.append(make_design(rng, rng.randint(5, 80)))
+    return corpus
+
+
+def db_bytes(conn):
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_size * conn.execute("PRAGMA page_count").fetchone()[0]
+
+
+def time_reads(read, ids, reads):
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        read(rng.choice(ids))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def bench_raw(path, corpus, reads):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE designs (id TEXT PRIMARY KEY, content TEXT NOT NULL)")
+    with conn:
+        conn.executemany(
+            "INSERT INTO designs (id, content) VALUES (?, ?)",
+            [(str(i), json.dumps(content)) for i, content in enumerate(corpus)],
+        )
+    size = db_bytes(conn)
+
+    def read(design_id):
+        row = conn.execute("SELECT content FROM designs WHERE id = ?", (design_id,)).fetchone()
+        return json.loads(row[0])
+
+    return size, time_reads(read, [str(i) for i in range(len(corpus))], reads)
+
+
+def bench_blobs(path, corpus, reads):
+    os.environ["DATABASE_URL"] = path
+    from app.database import init_db, pool, store_content
+    from app.design_content import canonical_content, decode_content
+
+    init_db()
+    with pool.connection() as conn:
+        with conn:
+            for i, content in enumerate(corpus):
+                content_hash, raw = canonical_content(content)
+                store_content(conn, content_hash, raw)
+                conn.execute('''
+                    INSERT INTO designs (id, title, description, author, content_hash, created_at, tags)
+                    VALUES (?, '', '', '', ?, '', '[]')
+                ''', (str(i), content_hash))
+        size = db_bytes(conn)
+
+        def read(design_id):
+            row = conn.execute('''
+                SELECT b.codec, b.data FROM designs d
+                JOIN design_blobs b ON b.hash = d.content_hash
+                WHERE d.id = ?
+            ''', (design_id,)).fetchone()
+            return decode_content(row["codec"], row["data"])
+
+        return size, time_reads(read, [str(i) for i in range(len(corpus))], reads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--designs", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.designs)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "raw TEXT": bench_raw(os.path.join(tmp, "raw.db"), corpus, args.reads),
+            "zlib blobs": bench_blobs(os.path.join(tmp, "blobs.db"), corpus, args.reads),
+        }
+
+    print(f"{'storage':<12} {'bytes/design':>14} {'read p50 (ms)':>14} {'read p99 (ms)':>14}")
+    for name, (size, (p50, p99)) in results.items():
+        print(f"{name:<12} {size / len(corpus):>14.0f} {p50 * 1000:>14.3f} {p99 * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Listing benchmark for a large design catalog.
+
+Seeds the database directly (fast, no HTTP) and then measures how the cost of
+GET /api/designs grows with page depth, comparing OFFSET paging (`skip`) with
+keyset paging (`cursor`), with and without a tag filter:
+
+    DATABASE_URL=bench.db python benchmarks/designs_listing.py --seed 100000
+    DATABASE_URL=bench.db uvicorn app.main:app --port 8000
+    python benchmarks/designs_listing.py --url http://localhost:8000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TAGS = ["robot", "movement", "speech", "ai", "llm", "decide", "demo", "wip"]
+
+
+def seed(count, batch=5000):
+    from app.database import init_db, pool, store_content
+    from app.design_content import canonical_content
+
+    init_db()
+    start = datetime(2024, 1, 1)
+    content_hash, raw = canonical_content({"shapes": [], "connections": []})
+    with pool.connection() as conn:
+        with conn:
+            store_content(conn, content_hash, raw)
+        for offset in range(0, count, batch):
+            rows = []
+            for i in range(offset, min(offset + batch, count)):
+                tags = [TAGS[i % len(TAGS)], TAGS[(i * 7 + 3) % len(TAGS)]]
+                rows.append((
+                    str(uuid.uuid4()),
+                    f"Seeded design {i}",
+                    "Seeded by designs_listing.py",
+                    f"author{i % 500}",
+                    content_hash,
+                    (start + timedelta(seconds=i)).isoformat(),
+                    json.dumps(tags),
+                ))
+            with conn:
+                conn.executemany('''
+                    INSERT INTO designs (id, title, description, author, content_hash, created_at, tags, downloads)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                ''', rows)
+                conn.executemany('''
+                    INSERT OR IGNORE INTO design_tags (design_id, tag, created_at)
+                    SELECT designs.id, json_each.value, designs.created_at
+                    FROM designs, json_each(designs.tags) WHERE designs.id = ?
+                ''', [(row[0],) for row in rows])
+    print(f"Seeded {count} designs into {pool.database}")
+
+
+def fetch(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as resp:
+        resp.read()
+        cursor = resp.headers.get("X-Next-Cursor")
+    return time.perf_counter() - start, cursor
+
+
+def walk(base_url, depths, limit, tag):
+    query = {"limit": limit}
+    if tag:
+        query["tag"] = tag
+    label = f"tag={tag}" if tag else "all designs"
+    print(f"\n{label} (limit={limit})")
+    print(f"  {'page':>8}  {'skip (ms)':>10}  {'cursor (ms)':>12}")
+
+    cursor = None
+    page = 0
+    for depth in depths:
+        while page < depth:
+            params = dict(query, cursor=cursor) if cursor else query
+            _, cursor = fetch(f"{base_url}/api/designs?{urllib.parse.urlencode(params)}")
+            page += 1
+            if cursor is None:
+                return
+        skip_params = dict(query, skip=depth * limit)
+        skip_time, _ = fetch(f"{base_url}/api/designs?{urllib.parse.urlencode(skip_params)}")
+        cursor_time, _ = fetch(f"{base_url}/api/designs?{urllib.parse.urlencode(dict(query, cursor=cursor))}")
+        print(f"  {depth:>8}  {skip_time * 1000:>10.2f}  {cursor_time * 1000:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="server to benchmark (omit to only seed)")
+    parser.add_argument("--seed", type=int, default=0, help="designs to insert into DATABASE_URL")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--depths", default="1,10,100,1000,4000")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed)
+    if args.url:
+        depths = [int(d) for d in args.depths.split(",")]
+        walk(args.url, depths, args.limit, None)
+        walk(args.url, depths, args.limit, "robot")
+
+
+if __name__ == "__main__":
+    main()
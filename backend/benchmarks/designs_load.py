@@ -0,0 +1,92 @@
+"""Load benchmark for the designs API.
+
+Hammers GET /api/designs from many concurrent clients while probing
+/api/stop, then reports requests/sec and latency percentiles for both. Run it
+against a server started from the old and the new tree to compare:
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/designs_load.py --url http://localhost:8000
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed_request(url, method="GET", body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    start = time.perf_counter()
+    with urllib.request.urlopen(req) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def seed(base_url, count):
+    for i in range(count):
+        timed_request(f"{base_url}/api/designs", "POST", {
+            "title": f"Benchmark design {i}",
+            "description": "Seeded by designs_load.py",
+            "author": "bench",
+            "content": {"shapes": [{"id": f"shape:{n}", "type": "llm"} for n in range(50)]},
+            "tags": ["robot", "movement"] if i % 2 else ["speech", "ai"],
+        })
+
+
+def report(name, latencies, elapsed):
+    print(f"{name}:")
+    print(f"  requests     {len(latencies)}")
+    print(f"  req/sec      {len(latencies) / elapsed:.1f}")
+    print(f"  p50 (ms)     {statistics.median(latencies) * 1000:.2f}")
+    print(f"  p99 (ms)     {percentile(latencies, 99) * 1000:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0, help="designs to create before measuring")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.url, args.seed)
+
+    list_url = f"{args.url}/api/designs?limit=20"
+    done = threading.Event()
+    stop_latencies = []
+
+    def probe_stop():
+        while not done.is_set():
+            stop_latencies.append(timed_request(f"{args.url}/api/stop", "POST"))
+            time.sleep(0.05)
+
+    prober = threading.Thread(target=probe_stop, daemon=True)
+    prober.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list_latencies = list(executor.map(lambda _: timed_request(list_url), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    done.set()
+    prober.join()
+
+    report("GET /api/designs", list_latencies, elapsed)
+    report("POST /api/stop (under load)", stop_latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Command-to-publish latency: REST /api/move versus the /ws/drive WebSocket.
+
+Starts uvicorn on a local port with a small app that has the same drive
+paths as the backend: POST /api/move (CORS middleware, pydantic
+validation) and the /ws/drive channel, both feeding the real motion
+scheduler, with a recording publish in place of MQTT. Then sends drive
+commands one at a time, alternating direction, and reports per transport:
+
+- publish: from the client sending the command to the scheduler
+  publishing it
+- ack: the full round trip until the client has the response or ack
+
+REST uses one keep-alive connection, like a browser would:
+
+    python benchmarks/drive_latency.py --commands 500
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+from websockets.sync.client import connect
+
+from app.drive_channel import BINARY_COMMANDS, FRAME, DriveChannel
+from app.motion import MotionScheduler
+
+DIRECTIONS = ("forward", "left")
+
+
+class MovementRequest(BaseModel):
+    direction: str
+    value: Optional[float] = None
+
+
+def build_app(published):
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+
+    def publish(command):
+        published.append(time.perf_counter())
+        published.event.set()
+
+    motion = MotionScheduler(publish)
+    channel = DriveChannel(motion, lambda: {}, watchdog_timeout=5, state_interval=3600)
+
+    @app.post("/api/move")
+    async def handle_movement(request: MovementRequest):
+        try:
+            current = motion.move(request.direction, request.value)
+            return {"status": "success", "message": f"Moving {request.direction}", "motion": current.to_dict()}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.websocket("/ws/drive")
+    async def drive_socket(websocket: WebSocket):
+        await channel.serve(websocket)
+
+    return app
+
+
+class Published(list):
+    def __init__(self):
+        super().__init__()
+        self.event = threading.Event()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure(published, send, receive, commands):
+    to_publish, round_trip = [], []
+    for n in range(commands):
+        published.event.clear()
+        before = len(published)
+        started = time.perf_counter()
+        send(DIRECTIONS[n % 2], n)
+        receive()
+        acked = time.perf_counter()
+        published.event.wait(5)
+        to_publish.append(published[before] - started)
+        round_trip.append(acked - started)
+    return to_publish, round_trip
+
+
+def summary(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2] * 1000, samples[max(0, int(len(samples) * 0.99) - 1)] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=500)
+    args = parser.parse_args()
+
+    published = Published()
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(build_app(published), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    results = {}
+    rest = http.client.HTTPConnection("127.0.0.1", port)
+
+    def rest_send(direction, n):
+        body = json.dumps({"direction": direction, "value": None})
+        rest.request("POST", "/api/move", body, {"Content-Type": "application/json", "Origin": "http://localhost:3000"})
+
+    results["REST /api/move"] = measure(published, rest_send, lambda: rest.getresponse().read(), args.commands)
+    rest.close()
+
+    with connect(f"ws://127.0.0.1:{port}/ws/drive") as ws:
+        ws.recv()  # state pushed on connect
+        results["WebSocket JSON"] = measure(
+            published, lambda direction, n: ws.send(json.dumps({"d": direction, "s": n})), ws.recv, args.commands)
+        codes = {name: code for code, name in enumerate(BINARY_COMMANDS)}
+        results["WebSocket binary"] = measure(
+            published, lambda direction, n: ws.send(FRAME.pack(codes[direction], n % 65536)), ws.recv, args.commands)
+
+    server.should_exit = True
+    print(f"{args.commands} commands each")
+    print(f"{'':<18} {'publish p50':>12} {'p99':>9} {'ack p50':>10} {'p99':>9}")
+    for name, (to_publish, round_trip) in results.items():
+        p50, p99 = summary(to_publish)
+        a50, a99 = summary(round_trip)
+        print(f"{name:<18} {p50:>9.3f} ms {p99:>6.3f} ms {a50:>7.3f} ms {a99:>6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
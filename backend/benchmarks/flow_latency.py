@@ -0,0 +1,161 @@
+"""End-to-end latency of running a flow: browser-driven versus server executor.
+
+Builds a synthetic design (a Start node fanning out to several
+Think -> text -> Talk branches plus a Move) and runs it two ways:
+
+- browser-driven: walks the graph one node at a time like StartNode.tsx,
+  making one HTTP request per node to a local fake backend. Pass --ui-delays
+  to also replay the fixed waits StartNode.tsx adds (1 s after each click,
+  0.5 s before following arrows).
+- executor: compiles the design and runs it with app.flows in-process, with
+  independent branches running concurrently.
+
+Both use the same fake LLM/speech/movement latencies:
+
+    python benchmarks/flow_latency.py --branches 4 --llm-ms 300 --speak-ms 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.flows import FlowActions, FlowRun, compile_flow
+
+CLICK_WAIT = 1.0  # StartNode.tsx waits this long after clicking a node
+NODE_EXECUTION_DELAY = 0.5  # and this long before following its arrows
+
+
+def build_design(branches):
+    store = {}
+
+    def shape(shape_id, shape_type, **props):
+        store[shape_id] = {"id": shape_id, "typeName": "shape", "type": shape_type, "props": props}
+        return shape_id
+
+    def arrow(source, target):
+        arrow_id = f"shape:arrow{len(store)}"
+        store[arrow_id] = {"id": arrow_id, "typeName": "shape", "type": "arrow", "props": {}}
+        for terminal, to_id in (("start", source), ("end", target)):
+            binding_id = f"binding:{arrow_id}-{terminal}"
+            store[binding_id] = {"id": binding_id, "typeName": "binding", "type": "arrow", "fromId": arrow_id, "toId": to_id, "props": {"terminal": terminal}}
+
+    start = shape("shape:start", "start", title="Start")
+    for n in range(branches):
+        think = shape(f"shape:llm{n}", "llm", instruction=f"Say something about topic {n}")
+        answer = shape(f"shape:text{n}", "text", text="")
+        talk = shape(f"shape:speech{n}", "speech", text="")
+        arrow(start, think)
+        arrow(think, answer)
+        arrow(answer, talk)
+    direction = shape("shape:direction", "text", text="forward")
+    move = shape("shape:move", "movement", direction="forward", value=0)
+    arrow(start, direction)
+    arrow(direction, move)
+    return {"store": store}
+
+
+def fake_backend(latencies):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latencies[self.path])
+            body = json.dumps({"response": "A short answer."}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def browser_driven(plan, url, ui_delays):
+    """Depth-first, one node at a time, one HTTP request per node (StartNode.tsx)."""
+    endpoints = {"llm": "/api/generate", "speech": "/api/speak", "movement": "/api/move"}
+    # Shapes with a button in the UI get clicked; text shapes do not
+    clickable = {"start", "llm", "decide", "speech", "movement", "audio_input"}
+
+    def post(path):
+        request = urllib.request.Request(url + path, data=b"{}", headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+
+    def trigger(i):
+        node_type = plan.types[i]
+        if node_type in endpoints:
+            post(endpoints[node_type])
+        if ui_delays and node_type in clickable:
+            time.sleep(CLICK_WAIT)
+        successors = plan.successors(i)
+        if ui_delays and successors:
+            time.sleep(NODE_EXECUTION_DELAY)
+        for next_i in successors:
+            trigger(next_i)
+
+    start = time.perf_counter()
+    for start_i in plan.start_nodes:
+        trigger(start_i)
+    return time.perf_counter() - start
+
+
+def executor(plan, latencies):
+    async def generate(prompt):
+        await asyncio.sleep(latencies["/api/generate"])
+        return "A short answer."
+
+    async def speak(text):
+        await asyncio.sleep(latencies["/api/speak"])
+
+    async def move(direction, value):
+        await asyncio.sleep(latencies["/api/move"])
+
+    async def move_sequence(steps):
+        await asyncio.sleep(latencies["/api/move"])
+
+    async def run():
+        flow = FlowRun(plan, FlowActions(generate, speak, move, move_sequence))
+        started = time.perf_counter()
+        flow.start()
+        await flow.done.wait()
+        assert flow.status == "done", flow.status
+        return time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--llm-ms", type=float, default=300)
+    parser.add_argument("--speak-ms", type=float, default=200)
+    parser.add_argument("--move-ms", type=float, default=5)
+    parser.add_argument("--ui-delays", action="store_true", help="include StartNode.tsx's fixed waits")
+    args = parser.parse_args()
+
+    latencies = {"/api/generate": args.llm_ms / 1000, "/api/speak": args.speak_ms / 1000, "/api/move": args.move_ms / 1000}
+    plan = compile_flow(build_design(args.branches))
+    server = fake_backend(latencies)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        name = "browser-driven" + (" + UI waits" if args.ui_delays else "")
+        print(f"{len(plan)} nodes, {args.branches} parallel branches")
+        print(f"{name:<28} {browser_driven(plan, url, args.ui_delays) * 1000:9.1f} ms")
+        print(f"{'server executor':<28} {executor(plan, latencies) * 1000:9.1f} ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
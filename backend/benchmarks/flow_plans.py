@@ -0,0 +1,121 @@
+"""Compile time and memory footprint of flow plans on large designs.
+
+Generates tldraw-style designs with thousands of nodes (Start nodes fanning
+out into Think -> text -> Decide -> text -> Talk/Move chains) and reports,
+per size:
+
+- parse + compile: json.loads of the stored content plus compile_flow, i.e.
+  what every run paid before plans were cached
+- cached: fetching the compiled plan from the plan cache
+- memory of the parsed content versus the compiled plan (tracemalloc)
+
+    python benchmarks/flow_plans.py --sizes 1000,5000,20000
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cache import LRUCache
+from app.flows import compile_flow
+
+
+def build_design(nodes):
+    store = {}
+
+    def shape(shape_type, **props):
+        shape_id = f"shape:{len(store)}"
+        store[shape_id] = {
+            "id": shape_id, "typeName": "shape", "type": shape_type,
+            "x": 0, "y": 0, "rotation": 0, "isLocked": False, "opacity": 1, "meta": {},
+            "parentId": "page:page", "index": "a1", "props": {"w": 200, "h": 100, **props},
+        }
+        return shape_id
+
+    def arrow(source, target):
+        arrow_id = f"shape:{len(store)}"
+        store[arrow_id] = {"id": arrow_id, "typeName": "shape", "type": "arrow", "props": {"start": {"x": 0, "y": 0}, "end": {"x": 1, "y": 1}}}
+        for terminal, to_id in (("start", source), ("end", target)):
+            binding_id = f"binding:{arrow_id}-{terminal}"
+            store[binding_id] = {
+                "id": binding_id, "typeName": "binding", "type": "arrow", "fromId": arrow_id, "toId": to_id,
+                "props": {"terminal": terminal, "isPrecise": False, "isExact": False, "normalizedAnchor": {"x": 0.5, "y": 0.5}},
+            }
+
+    chain = 7  # nodes per chain below
+    for n in range(max(1, nodes // (chain * 8))):
+        start = shape("start", title="Start")
+        for _ in range(8):
+            think = shape("llm", instruction="Is the path ahead clear? Answer left or right.", response="", isLoading=False)
+            answer = shape("text", text="")
+            decide = shape("decide", title="Decide", isLoading=False)
+            left = shape("text", text="left")
+            right = shape("text", text="right")
+            talk = shape("speech", text="", isLoading=False)
+            move = shape("movement", direction="forward", value=0, isLoading=False)
+            arrow(start, think)
+            arrow(think, answer)
+            arrow(answer, decide)
+            arrow(decide, left)
+            arrow(decide, right)
+            arrow(left, talk)
+            arrow(right, move)
+    return {"store": store, "schema": {}}
+
+
+def measure_memory(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>7} {'JSON KB':>9} {'parse+compile':>14} {'cached':>9} {'content MB':>11} {'plan MB':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        raw = json.dumps(build_design(size))
+        plan = compile_flow(json.loads(raw))
+
+        cache = LRUCache(maxsize=16, ttl=3600)
+        cache.set(("design", "hash"), plan)
+        cold = timed(lambda: compile_flow(json.loads(raw)), args.runs)
+        cached = timed(lambda: cache.get(("design", "hash")), args.runs)
+
+        _, content_bytes = measure_memory(lambda: json.loads(raw))
+
+        def compiled_only():
+            content = json.loads(raw)
+            compiled = compile_flow(content)
+            del content
+            return compiled
+        _, plan_bytes = measure_memory(compiled_only)
+
+        print(f"{len(plan):>7} {len(raw) / 1024:>9.0f} {cold * 1000:>11.1f} ms {cached * 1e6:>6.1f} us "
+              f"{content_bytes / 1e6:>11.2f} {plan_bytes / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""How fast the intent matcher is.
+
+Times IntentMatcher.match and the substring chain that voice_commands.py
+used before on a generated corpus of transcripts (--count, default 5000)
+from tests/phrasings.py. Whether the matcher gets them right is checked
+by tests/test_intents.py.
+
+Exits non-zero if matching a transcript takes more than --budget-us at
+the median:
+
+    python benchmarks/intent_matching.py --count 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.intents import IntentMatcher
+from tests.phrasings import build_corpus
+
+
+def legacy_match(text):
+    """The substring chain process_command used before IntentMatcher."""
+    text = text.lower().strip()
+    if "forward" in text or "go forward" in text or "move forward" in text:
+        return "forward"
+    elif "back" in text or "backward" in text or "go back" in text:
+        return "back"
+    elif "left" in text or "turn left" in text:
+        return "left"
+    elif "right" in text or "turn right" in text:
+        return "right"
+    elif "stop" in text or "halt" in text:
+        return "stop"
+    return None
+
+
+def timed(fn, corpus, repeat):
+    """Median microseconds per transcript over `repeat` passes."""
+    passes = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text, _, _ in corpus:
+            fn(text)
+        passes.append((time.perf_counter() - started) / len(corpus) * 1e6)
+    return sorted(passes)[len(passes) // 2]
+
+
+def check(name, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=200)
+    args = parser.parse_args()
+    results = []
+
+    started = time.perf_counter()
+    matcher = IntentMatcher()
+    print(f"matcher compiled in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    corpus = build_corpus(args.count, args.seed)
+    per_transcript = timed(matcher.match, corpus, args.repeat)
+    legacy = timed(legacy_match, corpus, args.repeat)
+    results.append(check(f"{per_transcript:.1f} us per transcript over {len(corpus)} transcripts "
+                         f"(substring chain {legacy:.1f} us)",
+                         per_transcript <= args.budget_us))
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
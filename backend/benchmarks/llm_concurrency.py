@@ -0,0 +1,74 @@
+"""LLM throughput benchmark against a local fake model.
+
+The fake model answers after a fixed latency. Fires a burst of prompts (as a
+flow with parallel LLM/Decide branches would) and reports throughput for the
+old pattern (blocking generate_content inside the async handler) and for
+LLMClient at several concurrency limits:
+
+    python benchmarks/llm_concurrency.py --requests 64 --latency-ms 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.llm import LLMClient
+
+
+class FakeResponse:
+    def __init__(self, text):
+        part = type("Part", (), {"text": text})()
+        content = type("Content", (), {"parts": [part]})()
+        self.candidates = [type("Candidate", (), {"content": content})()]
+
+
+class FakeModel:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return FakeResponse(prompt[::-1])
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.latency)
+        return FakeResponse(prompt[::-1])
+
+
+async def blocking_burst(model, requests):
+    async def handler(n):
+        return model.generate_content(f"prompt {n}").candidates[0].content.parts[0].text
+
+    return await asyncio.gather(*(handler(n) for n in range(requests)))
+
+
+async def client_burst(model, requests, concurrency):
+    client = LLMClient(model, max_concurrency=concurrency, timeout=600)
+    return await asyncio.gather(*(client.generate(f"prompt {n}") for n in range(requests)))
+
+
+def run(name, coro, requests):
+    start = time.perf_counter()
+    asyncio.run(coro)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {requests / elapsed:>8.1f} req/s   {elapsed:6.2f} s total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--concurrency", default="1,4,8,16,32")
+    args = parser.parse_args()
+
+    model = FakeModel(args.latency_ms / 1000)
+    run("blocking generate_content", blocking_burst(model, args.requests), args.requests)
+    for limit in [int(c) for c in args.concurrency.split(",")]:
+        run(f"LLMClient concurrency={limit}", client_burst(model, args.requests, limit), args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Time-to-first-token and time-to-first-audio for LLM responses.
+
+Uses a local fake streaming model that emits a response word by word after a
+first-token delay, and a fake TTS whose first audio arrives a fixed time after
+it is handed a sentence. Compares waiting for the whole completion (the old
+/api/generate -> /api/speak path) with streaming tokens through the sentence
+chunker so the first sentence is spoken while the rest is still generating:
+
+    python benchmarks/llm_streaming.py --first-token-ms 400 --token-ms 30 --tts-ms 250
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.llm import LLMClient
+from app.sentences import SentenceChunker
+
+RESPONSE = (
+    "I can see a red ball about two meters ahead of me. "
+    "I will drive forward slowly and stop right in front of it. "
+    "After that I will turn left and look for the charging dock, which should be near the wall."
+)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        part = type("Part", (), {"text": text})()
+        content = type("Content", (), {"parts": [part]})()
+        self.candidates = [type("Candidate", (), {"content": content})()]
+
+
+class FakeStreamingModel:
+    def __init__(self, first_token_delay, token_delay):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    async def _tokens(self):
+        await asyncio.sleep(self.first_token_delay)
+        for n, word in enumerate(RESPONSE.split(" ")):
+            if n:
+                await asyncio.sleep(self.token_delay)
+            yield FakeResponse(word + " ")
+
+    async def generate_content_async(self, prompt, stream=False):
+        if stream:
+            return self._tokens()
+        text = "".join([chunk.candidates[0].content.parts[0].text async for chunk in self._tokens()])
+        return FakeResponse(text)
+
+
+async def whole_response(client, tts_delay):
+    start = time.perf_counter()
+    text = await client.generate("prompt")
+    first_token = time.perf_counter() - start
+    # The whole text goes to TTS in one request
+    await asyncio.sleep(tts_delay)
+    return first_token, time.perf_counter() - start, text
+
+
+async def streamed(client, tts_delay):
+    start = time.perf_counter()
+    chunker = SentenceChunker()
+    first_token = None
+    first_audio = asyncio.get_running_loop().create_future()
+
+    def synthesize(sentence):
+        # Fake TTS: audio starts `tts_delay` after the sentence is submitted
+        async def play():
+            await asyncio.sleep(tts_delay)
+            if not first_audio.done():
+                first_audio.set_result(time.perf_counter() - start)
+        return asyncio.create_task(play())
+
+    tasks, parts = [], []
+    async for token in client.stream("prompt"):
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        parts.append(token)
+        tasks.extend(synthesize(sentence) for sentence in chunker.feed(token))
+    rest = chunker.flush()
+    if rest:
+        tasks.append(synthesize(rest))
+    await asyncio.gather(*tasks)
+    return first_token, first_audio.result(), "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--token-ms", type=float, default=30)
+    parser.add_argument("--tts-ms", type=float, default=250)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    model = FakeStreamingModel(args.first_token_ms / 1000, args.token_ms / 1000)
+    client = LLMClient(model, timeout=600)
+    for name, run in [("whole response", whole_response), ("streamed + sentence chunks", streamed)]:
+        samples = [asyncio.run(run(client, args.tts_ms / 1000)) for _ in range(args.runs)]
+        assert all(text.strip() == RESPONSE for _, _, text in samples)
+        ttft = statistics.median(s[0] for s in samples) * 1000
+        ttfa = statistics.median(s[1] for s in samples) * 1000
+        print(f"{name:<28} first token {ttft:7.1f} ms   first audio {ttfa:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
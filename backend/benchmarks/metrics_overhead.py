@@ -0,0 +1,235 @@
+"""Overhead of the metrics middleware and tracing spans on the request path.
+
+Starts one uvicorn server per mode on a shared scratch database and times
+HTTP round trips over keep-alive connections, as a client sees them:
+
+- off: METRICS_ENABLED=0
+- metrics: request histograms, request ids and dependency spans
+- tracing: metrics plus a span log line for every request (TRACE_REQUESTS=1)
+
+Requests run in short blocks, each mode in turn in a rotating order, and
+every block is compared with the "off" block run next to it. The median of
+those ratios is the overhead, so drift on the machine and GC pauses affect
+every mode alike. Two processes running the same code can differ by a
+few percent, so the blocks are spread over --rounds fresh sets of
+servers. Endpoints: GET /api/robot/motion (no I/O, the worst case
+for relative overhead), GET /api/designs (SQLite and the response cache)
+and GET /metrics itself. Exits non-zero if metrics add more than
+--max-overhead-pct to a round trip at the median.
+
+For reference it also calls the app in-process as a bare ASGI app, with
+no server or socket in the numbers (an upper bound on the relative
+overhead, not gated), and reports the cost of the middleware around a
+minimal ASGI app and of one histogram observation:
+
+    python benchmarks/metrics_overhead.py --rounds 6
+"""
+import argparse
+import asyncio
+import contextlib
+import http.client
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.startup_time import isolated_env, serve
+
+ENDPOINTS = [("/api/robot/motion", b""), ("/api/designs", b"limit=20"), ("/metrics", b"")]
+MODES = ["off", "metrics", "tracing"]
+
+
+MODE_ENV = {
+    "off": {"METRICS_ENABLED": "0", "TRACE_REQUESTS": "0"},
+    "metrics": {"METRICS_ENABLED": "1", "TRACE_REQUESTS": "0"},
+    "tracing": {"METRICS_ENABLED": "1", "TRACE_REQUESTS": "1"},
+}
+
+
+def set_mode(metrics, mode):
+    metrics.METRICS_ENABLED = mode != "off"
+    metrics.TRACE_REQUESTS = mode == "tracing"
+
+
+async def call(app, path, query):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 5000), "server": ("bench", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def middleware_cost(metrics, requests):
+    """Median microseconds per request for a minimal ASGI app, bare and wrapped in MetricsMiddleware."""
+    class Route:
+        path = "/bench"
+
+    async def bare(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/bench", "headers": [(b"host", b"bench")]}
+    wrapped = metrics.MetricsMiddleware(bare)
+    times = {bare: [], wrapped: []}
+    for _ in range(5):
+        for app in times:
+            started = time.perf_counter()
+            for _ in range(requests):
+                await app(dict(scope), receive, send)
+            times[app].append((time.perf_counter() - started) / requests * 1e6)
+    return statistics.median(times[bare]), statistics.median(times[wrapped])
+
+
+async def run(app, path, query, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path, query)
+    return (time.perf_counter() - started) / requests
+
+
+def http_block(connection, path, query, requests):
+    """Mean seconds per round trip for `requests` GETs on one keep-alive connection."""
+    target = f"{path}?{query.decode()}" if query else path
+    started = time.perf_counter()
+    for _ in range(requests):
+        connection.request("GET", target)
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"GET {target} returned {response.status}")
+    return (time.perf_counter() - started) / requests
+
+
+def compare(timings):
+    """Print a table of median microseconds and overheads; returns {path: metrics overhead %}."""
+    overheads = {}
+    print(f"{'endpoint':<20} {'off us':>8} {'metrics us':>11} {'overhead':>9} {'tracing us':>11} {'overhead':>9}")
+    for path, _ in ENDPOINTS:
+        off, on, traced = (statistics.median(timings[path, mode]) * 1e6 for mode in MODES)
+        overhead, traced_overhead = (
+            (statistics.median(a / b for a, b in zip(timings[path, mode], timings[path, "off"])) - 1) * 100
+            for mode in MODES[1:])
+        print(f"{path:<20} {off:>8.1f} {on:>11.1f} {overhead:>8.1f}% {traced:>11.1f} {traced_overhead:>8.1f}%")
+        overheads[path] = overhead
+    return overheads
+
+
+def over_http(args, database, timings, seed):
+    """Paired blocks of keep-alive HTTP requests against a fresh server per mode."""
+    servers = {}
+    try:
+        for mode in MODES:
+            env = isolated_env(database)
+            env.update(MODE_ENV[mode], PYTHONHASHSEED="0")
+            server, port, _ = serve(env, timeout=30)
+            servers[mode] = (server, http.client.HTTPConnection("127.0.0.1", port, timeout=10))
+        if seed:
+            connection = servers["off"][1]
+            for n in range(args.designs):
+                body = {"title": f"Design {n}", "description": "d", "author": "a", "content": {}, "tags": []}
+                connection.request("POST", "/api/designs", json.dumps(body), {"Content-Type": "application/json"})
+                connection.getresponse().read()
+        for _, connection in servers.values():
+            for path, query in ENDPOINTS:
+                http_block(connection, path, query, 100)  # warm up
+
+        for pair in range(args.pairs // args.rounds):
+            order = MODES[pair % len(MODES):] + MODES[:pair % len(MODES)]
+            for path, query in ENDPOINTS:
+                for mode in order:
+                    timings[path, mode].append(http_block(servers[mode][1], path, query, args.requests))
+    finally:
+        for server, connection in servers.values():
+            connection.close()
+            server.terminate()
+            server.wait(timeout=10)
+
+
+def check(name, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="requests per block")
+    parser.add_argument("--pairs", type=int, default=80, help="blocks per endpoint and mode")
+    parser.add_argument("--rounds", type=int, default=4, help="fresh sets of servers the blocks are spread over")
+    parser.add_argument("--designs", type=int, default=50)
+    parser.add_argument("--max-overhead-pct", type=float, default=5.0)
+    args = parser.parse_args()
+    results = []
+
+    scratch = tempfile.mkdtemp()
+    database = os.path.join(scratch, "designs.db")
+
+    timings = {(path, mode): [] for path, _ in ENDPOINTS for mode in MODES}
+    for n in range(args.rounds):
+        over_http(args, database, timings, seed=n == 0)
+    print(f"HTTP round trips, keep-alive, {len(timings[ENDPOINTS[0][0], 'off'])} blocks of {args.requests} "
+          f"requests per mode over {args.rounds} sets of servers:")
+    overheads = compare(timings)
+    for path, overhead in overheads.items():
+        if path != "/metrics":
+            results.append(check(f"{path}: metrics add at most {args.max_overhead_pct:g}% to a round trip",
+                                 overhead <= args.max_overhead_pct))
+
+    os.environ["DATABASE_URL"] = database
+    from app import metrics
+    from app.main import app
+
+    loop = asyncio.new_event_loop()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        streams = [handler.setStream(devnull) for handler in metrics.logger.handlers]  # log() lines too
+        for path, query in ENDPOINTS:
+            loop.run_until_complete(run(app, path, query, 200))  # warm up
+        timings = {(path, mode): [] for path, _ in ENDPOINTS for mode in MODES}
+        for pair in range(args.pairs):
+            order = MODES[pair % len(MODES):] + MODES[:pair % len(MODES)]
+            for path, query in ENDPOINTS:
+                for mode in order:
+                    set_mode(metrics, mode)
+                    timings[path, mode].append(loop.run_until_complete(run(app, path, query, args.requests * 2)))
+        for handler, stream in zip(metrics.logger.handlers, streams):
+            handler.setStream(stream)
+    set_mode(metrics, "metrics")
+    print("\nIn-process ASGI calls, no server or socket (upper bound, not gated):")
+    compare(timings)
+
+    bare, wrapped = loop.run_until_complete(middleware_cost(metrics, 20000))
+    print(f"middleware alone: {wrapped - bare:.2f} us per request ({bare:.2f} us for a bare ASGI app)")
+
+    observations = 200000
+    started = time.perf_counter()
+    for _ in range(observations):
+        metrics.observe("bench", "observe", 0.003)
+    print(f"one dependency observation: {(time.perf_counter() - started) / observations * 1e9:.0f} ns")
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""How steadily the motion scheduler publishes on a real event loop.
+
+Runs a move on asyncio at --rate Hz and reports the jitter of the drive
+commands against their slots. Command times, drift, skipped slots and
+preemption are checked on a fake clock by tests/test_motion.py:
+
+    python benchmarks/motion_timing.py --rate 10 --real-seconds 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.motion import MotionScheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=10, help="control rate in Hz")
+    parser.add_argument("--real-seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    async def real():
+        sent = []
+        scheduler = MotionScheduler(lambda command: sent.append(time.perf_counter()), control_rate=args.rate)
+        current = scheduler.move("forward", args.real_seconds * 20)  # cm at 0.2 m/s
+        await current.done.wait()
+        return scheduler.stats()["jitter_ms"]
+
+    jitter = asyncio.run(real())
+    print(f"real loop, {args.real_seconds:g} s at {args.rate:g} Hz: jitter p50 {jitter['p50']:.3f} ms  "
+          f"p99 {jitter['p99']:.3f} ms  max {jitter['max']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Gaps between movement steps: one /api/move per step versus /api/move/sequence.
+
+Serves /api/move and /api/move/sequence from a local HTTP server backed by
+the real motion scheduler on its own event loop, with a recording publish
+in place of MQTT. Then drives the same list of steps two ways:
+
+- per step: like a chain of Move nodes in the browser, POST /api/move,
+  wait out the step's duration with a client-side timer, then POST the
+  next one. Pass --rtt-ms to add network round-trip time per request.
+- sequence: one POST /api/move/sequence; the server runs the steps back
+  to back from its own timers.
+
+The gap of a step is how long after the previous step's end its first
+drive command went out. Also counts the stops the robot sees between steps.
+
+    python benchmarks/move_sequence.py --steps 20 --value 4 --rtt-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.motion import MotionScheduler, motion_duration
+
+
+def serve(scheduler, loop, rtt):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            time.sleep(rtt / 2)  # request leg
+            if self.path == "/api/move":
+                call = lambda: scheduler.move(body["direction"], body["value"]).to_dict()
+            else:
+                call = lambda: scheduler.run_sequence([(s["direction"], s["value"]) for s in body["steps"]]).to_dict()
+
+            async def run():
+                return call()
+            result = asyncio.run_coroutine_threadsafe(run(), loop).result()
+            time.sleep(rtt / 2)  # response leg
+            data = json.dumps(result).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def gaps(sent, steps):
+    """Per step after the first: ms between the end of the step before and its first command."""
+    starts, stops_between = [], 0
+    previous = None
+    for at, command in sent:
+        if command == "stop":
+            if len(starts) < len(steps):
+                stops_between += 1
+            previous = None
+            continue
+        if command != previous:
+            starts.append(at)
+        previous = command
+    ends = [start + motion_duration(*step) for start, step in zip(starts, steps)]
+    result = [(start - end) * 1000 for start, end in zip(starts[1:], ends)]
+    return result, stops_between
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--value", type=float, default=4, help="cm per forward/back step, degrees per turn")
+    parser.add_argument("--rtt-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    # Alternate directions so every step boundary is visible in the commands
+    steps = [("forward" if n % 2 == 0 else "left", args.value) for n in range(args.steps)]
+    sent = []
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    scheduler = MotionScheduler(lambda command: sent.append((time.perf_counter(), command)), loop=loop)
+    server = serve(scheduler, loop, args.rtt_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        print(f"{args.steps} steps, {args.rtt_ms:g} ms RTT")
+        print(f"{'':<12} {'total s':>8} {'gap p50':>10} {'gap p99':>10} {'gap max':>10} {'stops':>6}")
+
+        for name in ("per step", "sequence"):
+            sent.clear()
+            started = time.perf_counter()
+            if name == "per step":
+                for direction, value in steps:
+                    move = post(url + "/api/move", {"direction": direction, "value": value})
+                    time.sleep(move["duration"])  # the browser waiting before its next request
+                while not sent or sent[-1][1] != "stop":
+                    time.sleep(0.005)
+            else:
+                trajectory = post(url + "/api/move/sequence", {"steps": [{"direction": d, "value": v} for d, v in steps]})
+                time.sleep(trajectory["duration"])
+                while not sent or sent[-1][1] != "stop":
+                    time.sleep(0.005)
+            total = sent[-1][0] - started
+            step_gaps, stops = gaps(list(sent), steps)
+            step_gaps.sort()
+            print(f"{name:<12} {total:>8.2f} {statistics.median(step_gaps):>7.2f} ms "
+                  f"{step_gaps[max(0, int(len(step_gaps) * 0.99) - 1)]:>7.2f} ms {step_gaps[-1]:>7.2f} ms {stops:>6}")
+    finally:
+        server.shutdown()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+if __name__ == "__main__":
+    main()
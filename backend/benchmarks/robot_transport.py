@@ -0,0 +1,58 @@
+"""Publish latency and throughput of the shared MQTT robot transport.
+
+Runs against the in-process stand-in broker from tests/mqtt_broker.py
+(enough of MQTT 3.1.1 for CONNECT, PUBLISH with QoS 0/1/2 and PINGREQ) on
+a local port, so no mosquitto is needed. Reports publish latency at QoS
+0, 1 and 2 (one command at a time) and burst throughput. Queueing while
+the broker is down, stop-first draining, redelivery after a restart and
+expiry of stale commands are checked by tests/test_robot_transport.py:
+
+    python benchmarks/robot_transport.py --messages 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.robot_transport import MQTT_TOPIC, RobotTransport
+from tests.mqtt_broker import StandInBroker, free_port, wait_for
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    args = parser.parse_args()
+
+    broker = StandInBroker(free_port())
+    broker.start()
+    transport = RobotTransport("127.0.0.1", broker.port, qos=1, reconnect_min=0.05, reconnect_max=0.2)
+    transport.start()
+    wait_for(lambda: transport.connected)
+
+    # Latency one command at a time, then throughput for a burst
+    for qos in (0, 1, 2):
+        transport._latencies.clear()
+        expected = len(broker.received)
+        for n in range(args.messages):
+            transport.publish(MQTT_TOPIC, "forward", qos=qos)
+            expected += 1
+            wait_for(lambda: len(broker.received) == expected and not transport.stats()["inflight"])
+        latency = transport.stats()["latency_ms"]
+
+        expected += args.messages
+        start = time.perf_counter()
+        for n in range(args.messages):
+            transport.publish(MQTT_TOPIC, "forward", qos=qos)
+        wait_for(lambda: len(broker.received) == expected and not transport.stats()["inflight"])
+        elapsed = time.perf_counter() - start
+        print(f"QoS {qos}: latency p50 {latency['p50']:.3f} ms  p99 {latency['p99']:.3f} ms  "
+              f"max {latency['max']:.3f} ms   burst {args.messages / elapsed:8.0f} msg/s")
+
+    transport.stop()
+    broker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Startup-time budget for the backend, from `python -X importtime`.
+
+Imports app.main in a fresh interpreter with `-X importtime`, several times
+(the first run also compiles bytecode), and reports the median import time
+and the heaviest top-level imports. The checks are:
+
+1. importing app.main stays within --import-budget-ms
+2. the provider SDKs and audio libraries (google.generativeai, elevenlabs,
+   sounddevice, soundfile, scipy) are not imported at all
+3. the server comes up with no API keys and no reachable MQTT broker:
+   uvicorn is started in a subprocess, and the time until GET /api/health
+   answers must be within --startup-budget-ms
+4. in that state the designs API still works, /api/generate fails with
+   503, and /api/health reports the missing provider
+
+The budgets are regression budgets: raise them only on purpose. Run on the
+target board to check it there (e.g. --import-budget-ms 3000):
+
+    python benchmarks/startup_time.py --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 1500
+STARTUP_BUDGET_MS = 3000
+LAZY_MODULES = ["google.generativeai", "elevenlabs", "sounddevice", "soundfile", "scipy"]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def isolated_env(database):
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("GEMINI_API_KEY", "ELEVENLABS_API_KEY")}
+    env.update({
+        "DATABASE_URL": database,
+        "MQTT_HOST": "127.0.0.1",
+        "MQTT_PORT": str(free_port()),  # nothing listens there
+        "TTS_PREWARM_FILE": "",
+    })
+    return env
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_profile(env):
+    """{module: (self us, cumulative us, depth)} for one fresh `import app.main`."""
+    # load_dotenv() must not bring the keys back from a .env file
+    code = "import dotenv; dotenv.load_dotenv = lambda *a, **k: False; import app.main"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import app.main failed:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules[name] = (int(own), int(cumulative), len(indent) // 2)
+    return modules
+
+
+def get(port, path, method="GET", body=None):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", method=method,
+                                     data=json.dumps(body).encode() if body is not None else None,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+
+def serve(env, timeout):
+    """Start uvicorn; returns (process, port, seconds until /api/health answered)."""
+    port = free_port()
+    code = ("import dotenv; dotenv.load_dotenv = lambda *a, **k: False; import uvicorn; "
+            f"uvicorn.run('app.main:app', host='127.0.0.1', port={port}, log_level='warning')")
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited:\n{server.stderr.read()[-2000:]}")
+        try:
+            status, _ = get(port, "/api/health")
+            if status == 200:
+                return server, port, time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.01)
+    server.kill()
+    raise RuntimeError(f"server did not answer within {timeout} s")
+
+
+def check(name, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest top-level imports to list")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+    results = []
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = isolated_env(os.path.join(scratch, "designs.db"))
+
+        profiles = [import_profile(env) for _ in range(args.runs)]
+        totals = [profile["app.main"][1] / 1000 for profile in profiles]
+        median = statistics.median(totals[1:] or totals)
+        profile = profiles[-1]
+
+        print(f"import app.main: {median:.0f} ms median over {max(1, len(totals) - 1)} warm runs "
+              f"(first run {totals[0]:.0f} ms)")
+        top = sorted(((cumulative, name) for name, (_, cumulative, depth) in profile.items() if depth == 1),
+                     reverse=True)[:args.top]
+        for cumulative, name in top:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        results.append(check(f"import within {args.import_budget_ms:g} ms budget", median <= args.import_budget_ms))
+        loaded = [name for name in LAZY_MODULES if name in profile]
+        results.append(check(f"not imported: {', '.join(LAZY_MODULES)}" + (f" (found {loaded})" if loaded else ""),
+                             not loaded))
+
+        server, port, startup = serve(env, timeout=max(10, args.startup_budget_ms / 1000 * 3))
+        try:
+            results.append(check(f"server answered /api/health {startup * 1000:.0f} ms after launch, "
+                                 f"with no API keys or MQTT broker", startup * 1000 <= args.startup_budget_ms))
+            created, _ = get(port, "/api/designs", "POST",
+                             {"title": "T", "description": "D", "author": "A", "content": {}, "tags": []})
+            listed, designs = get(port, "/api/designs")
+            generate, _ = get(port, "/api/generate", "POST", {"prompt": "hello", "cache": False})
+            _, health = get(port, "/api/health")
+            results.append(check(f"designs API up (create {created}, list {listed}), /api/generate {generate}",
+                                 created == 200 and listed == 200 and len(designs) == 1 and generate == 503))
+            results.append(check(f"/api/health is {health['status']!r} with {health['down']} down",
+                                 health["status"] == "degraded" and "Gemini" in health["down"]
+                                 and health["subsystems"]["database"]["status"] == "ok"))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
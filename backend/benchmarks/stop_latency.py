@@ -0,0 +1,135 @@
+"""How long does a stop command wait while the robot is talking?
+
+Plays several utterances through a fake player (a process that sleeps for the
+clip length) while a probe on the same event loop simulates a stop request
+every 20 ms, and measures how long each one takes to get served. Compares
+the old pattern of running the player inside the async handler with the
+PlaybackQueue worker.
+
+Then does the same through the real app: starts app.main with a scratch
+database and no MQTT broker, swaps the speech player for the fake one,
+queues the utterances with POST /api/speak and times POST /api/stop through
+TestClient every 20 ms while they play. That a stop is served promptly while
+speech plays is checked by tests/test_stop_latency.py:
+
+    python benchmarks/stop_latency.py --utterances 3 --clip-ms 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio_player import play_file
+from app.playback import PlaybackQueue
+
+
+async def probe_stop(done: asyncio.Event, latencies: list, interval: float = 0.02):
+    """Simulate a stop request arriving every `interval` seconds.
+
+    Latency is measured from when each request arrives to when the loop gets
+    around to serving it, so requests that arrive while the loop is blocked
+    wait for the block to end.
+    """
+    arrives_at = time.perf_counter()
+    while not done.is_set():
+        arrives_at += interval
+        await asyncio.sleep(max(0.0, arrives_at - time.perf_counter()))
+        latencies.append(max(0.0, time.perf_counter() - arrives_at))
+
+
+async def blocking_handler(args):
+    done = asyncio.Event()
+    latencies = []
+    prober = asyncio.create_task(probe_stop(done, latencies))
+    await asyncio.sleep(0.05)
+    for _ in range(args.utterances):
+        # What the old /api/speak did: subprocess.run inside an async def
+        subprocess.run(["sleep", str(args.clip_ms / 1000)])
+        await asyncio.sleep(0.03)
+    done.set()
+    await prober
+    return latencies
+
+
+async def playback_queue(args):
+    queue = PlaybackQueue(lambda job, on_player: play_file(str(args.clip_ms / 1000), on_start=on_player, command=["sleep"]))
+    queue.start()
+    done = asyncio.Event()
+    latencies = []
+    prober = asyncio.create_task(probe_stop(done, latencies))
+    jobs = [queue.submit(f"utterance {n}") for n in range(args.utterances)]
+    for job in jobs:
+        await job.done.wait()
+    done.set()
+    await prober
+    await queue.stop()
+    return latencies
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def through_app(args):
+    """Round trips of POST /api/stop while /api/speak jobs play through a fake player."""
+    os.environ.update({
+        "DATABASE_URL": os.path.join(tempfile.mkdtemp(), "designs.db"),
+        "MQTT_HOST": "127.0.0.1",
+        "MQTT_PORT": str(free_port()),  # nothing listens there; commands queue up
+        "TTS_PREWARM_FILE": "",
+    })
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    logging.getLogger("app").setLevel(logging.ERROR)  # one "queued command: stop" line per request otherwise
+    main.speech_queue.speak = lambda job, on_player: play_file(str(args.clip_ms / 1000), on_start=on_player,
+                                                               command=["sleep"])
+    latencies = []
+    playing = 0
+    with TestClient(main.app) as client:
+        jobs = [client.post("/api/speak", json={"text": f"utterance {n}"}).json()["job_id"]
+                for n in range(args.utterances)]
+        time.sleep(0.05)
+        while client.get(f"/api/speak/{jobs[-1]}").json()["status"] in ("queued", "playing"):
+            playing += main.speech_queue.current is not None
+            started = time.perf_counter()
+            response = client.post("/api/stop")
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"POST /api/stop returned {response.status_code}")
+            time.sleep(0.02)
+    return latencies, playing
+
+
+def summarize(name, latencies):
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2] * 1000
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)] * 1000
+    print(f"{name:<28} probes {len(ordered):>4}  p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  max {ordered[-1] * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=3)
+    parser.add_argument("--clip-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    summarize("player inside async handler", asyncio.run(blocking_handler(args)))
+    summarize("PlaybackQueue worker", asyncio.run(playback_queue(args)))
+    latencies, playing = through_app(args)
+    summarize("POST /api/stop, TestClient", latencies)
+    print(f"{playing} of {len(latencies)} stops were sent while speech was playing")
+
+
+if __name__ == "__main__":
+    main()
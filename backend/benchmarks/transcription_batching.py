@@ -0,0 +1,92 @@
+"""Real-time factor and per-segment latency of the transcription micro-batcher.
+
+Runs a set of 1-3 s segments through a MicroBatcher. Several client threads
+each submit one segment at a time and wait for its transcript, like
+microphones or /api/audio uploads running side by side. Two settings are
+compared at each concurrency level:
+
+- one call per segment (max batch 1, no wait)
+- micro-batched (--max-batch, --wait-ms)
+
+Reports the real-time factor (wall time / seconds of audio; lower is
+better), segment latency p50/p95 and the mean batch size. The default fake
+backend costs --call-ms per call plus --per-second-ms per second of audio,
+so fixed overhead such as a remote round trip or a model forward pass is
+shared by a batch. Use --backend local to run Whisper on this machine's CPU
+(needs openai-whisper):
+
+    python benchmarks/transcription_batching.py --concurrency 1,2,4,8,16
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.transcription import SAMPLE_RATE, FakeBackend, MicroBatcher, WhisperBackend
+
+
+def make_segments(count, seed):
+    rng = np.random.default_rng(seed)
+    return [rng.normal(0, 0.05, int(rng.uniform(1, 3) * SAMPLE_RATE)).astype(np.float32) for _ in range(count)]
+
+
+def run(batcher, segments, concurrency):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(share):
+        for audio in share:
+            started = time.perf_counter()
+            batcher.transcribe(audio)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(segments[n::concurrency],)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fake", "local"], default="fake")
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--segments", type=int, default=64)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--wait-ms", type=float, default=30)
+    parser.add_argument("--call-ms", type=float, default=150, help="fake backend: cost per call")
+    parser.add_argument("--per-second-ms", type=float, default=20, help="fake backend: cost per second of audio")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.backend == "local":
+        backend = WhisperBackend()
+    else:
+        backend = FakeBackend(call_latency=args.call_ms / 1000, per_second=args.per_second_ms / 1000)
+    segments = make_segments(args.segments, args.seed)
+    audio_seconds = sum(len(audio) for audio in segments) / SAMPLE_RATE
+
+    print(f"{args.segments} segments, {audio_seconds:.0f} s of audio, {backend.name} backend")
+    print(f"{'clients':>7} {'mode':<14} {'RTF':>7} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        for mode, max_batch, wait_ms in (("per segment", 1, 0), ("micro-batched", args.max_batch, args.wait_ms)):
+            batcher = MicroBatcher(backend, max_batch=max_batch, max_wait_ms=wait_ms)
+            wall, latencies = run(batcher, segments, concurrency)
+            mean_batch = batcher.stats()["mean_batch"]
+            batcher.stop()
+            p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+            print(f"{concurrency:>7} {mode:<14} {wall / audio_seconds:>7.3f} {statistics.median(latencies) * 1000:>8.0f} "
+                  f"{p95 * 1000:>8.0f} {mean_batch:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
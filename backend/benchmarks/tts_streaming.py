@@ -0,0 +1,84 @@
+"""Time-to-first-sound benchmark for speech playback.
+
+Uses a local fake TTS generator that yields audio chunks with a first-byte
+delay and a per-chunk delay, and a fake player process that records when it
+receives its first byte of audio. Compares the old generate -> save file ->
+play path with piping chunks to the player as they arrive:
+
+    python benchmarks/tts_streaming.py --first-chunk-ms 300 --chunk-ms 40 --chunks 25
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio_player import play_file, play_stream
+
+# Records the monotonic time of the first audio byte, then drains the rest
+FAKE_PLAYER = r'''
+import sys, time
+out = sys.argv[1]
+source = open(sys.argv[2], "rb") if len(sys.argv) > 2 else sys.stdin.buffer
+first = source.read(1)
+stamp = time.monotonic()
+while source.read(65536):
+    pass
+with open(out, "w") as f:
+    f.write(repr(stamp))
+'''
+
+
+def fake_tts(chunks, first_chunk_delay, chunk_delay, chunk_size=4096):
+    time.sleep(first_chunk_delay)
+    for n in range(chunks):
+        if n:
+            time.sleep(chunk_delay)
+        yield b"\xff" * chunk_size
+
+
+def read_stamp(path):
+    with open(path) as f:
+        return float(f.read())
+
+
+def generate_then_play(args, tmp):
+    start = time.monotonic()
+    audio = b"".join(fake_tts(args.chunks, args.first_chunk_ms / 1000, args.chunk_ms / 1000))
+    audio_path = os.path.join(tmp, "speech.mp3")
+    with open(audio_path, "wb") as f:
+        f.write(audio)
+    stamp_path = os.path.join(tmp, "stamp")
+    play_file(audio_path, command=[sys.executable, "-c", FAKE_PLAYER, stamp_path])
+    return read_stamp(stamp_path) - start
+
+
+def streamed(args, tmp):
+    start = time.monotonic()
+    stamp_path = os.path.join(tmp, "stamp")
+    play_stream(
+        fake_tts(args.chunks, args.first_chunk_ms / 1000, args.chunk_ms / 1000),
+        command=[sys.executable, "-c", FAKE_PLAYER, stamp_path],
+    )
+    return read_stamp(stamp_path) - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-chunk-ms", type=float, default=300)
+    parser.add_argument("--chunk-ms", type=float, default=40)
+    parser.add_argument("--chunks", type=int, default=25)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, run in [("generate, save, play", generate_then_play), ("streamed to player", streamed)]:
+            samples = [run(args, tmp) for _ in range(args.runs)]
+            print(f"{name:<22} time to first sound: median {statistics.median(samples) * 1000:7.1f} ms, max {max(samples) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""How much audio the voice activity detector saves, and how fast it runs.
+
+Uses the synthetic recording from tests/synthetic_audio.py: speech-like
+bursts of 0.5-1.5 s separated by pauses, over background hiss and mains
+hum, through a 16-bit WAV round trip and fed to SpeechSegmenter in 0.1 s
+blocks like the microphone callback in voice_commands.py. Reports the
+seconds of audio sent for transcription compared with fixed 3 s blocks,
+the delay from the end of speech to each segment, and how fast the VAD
+runs. The segmentation itself is checked by tests/test_vad.py.
+
+Pass recorded WAV files with --wav to print the segments found in them.
+Pass --save to write the synthetic fixture out:
+
+    python benchmarks/vad_segments.py --utterances 20 --wav command.wav
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.synthetic_audio import SAMPLE_RATE, build_recording, read_wav, run, to_wav
+
+FIXED_BLOCK_S = 3.0  # what voice_commands.py used to send regardless of content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--wav", nargs="*", default=[], help="recorded WAV files to segment")
+    parser.add_argument("--save", help="write the synthetic fixture to this WAV path")
+    args = parser.parse_args()
+
+    audio, truth = build_recording(args.utterances, args.seed)
+    wav = to_wav(audio)
+    if args.save:
+        with open(args.save, "wb") as f:
+            f.write(wav)
+    audio = read_wav(io.BytesIO(wav))
+    seconds = len(audio) / SAMPLE_RATE
+
+    started = time.perf_counter()
+    emitted = run(audio)
+    elapsed = time.perf_counter() - started
+    segments = [segment for segment, _ in emitted]
+
+    delays = sorted(at - end / SAMPLE_RATE for (_, at), (_, end) in zip(emitted, truth))
+    shipped = sum(segment.duration for segment in segments)
+    speech = sum(end - start for start, end in truth) / SAMPLE_RATE
+    print(f"{seconds:.0f} s recording, {speech:.1f} s of speech")
+    print(f"sent for transcription: {shipped:.1f} s in {len(segments)} segments, "
+          f"versus {seconds:.0f} s in {int(np.ceil(seconds / FIXED_BLOCK_S))} fixed {FIXED_BLOCK_S:g} s blocks")
+    print(f"segments emitted {delays[len(delays) // 2] * 1000:.0f} ms (p50), {delays[-1] * 1000:.0f} ms (max) "
+          f"after speech ends")
+    print(f"VAD speed: {seconds / elapsed:.0f}x real time")
+
+    for path in args.wav:
+        print(f"\n{path}:")
+        for segment, at in run(read_wav(path)):
+            print(f"  {segment.start_time:7.2f} - {segment.end_time:7.2f} s  ({segment.duration:.2f} s{', split' if segment.split else ''})")
+
+
+if __name__ == "__main__":
+    main()
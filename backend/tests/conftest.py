@@ -0,0 +1,17 @@
+import os
+import socket
+import tempfile
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# The app reads its settings when it is imported, so point them at a scratch
+# database and an MQTT port nothing listens on before any test imports it
+os.environ["DATABASE_URL"] = os.path.join(tempfile.mkdtemp(prefix="backend-tests-"), "designs.db")
+os.environ["MQTT_HOST"] = "127.0.0.1"
+os.environ["MQTT_PORT"] = str(_free_port())
+os.environ["TTS_PREWARM_FILE"] = ""
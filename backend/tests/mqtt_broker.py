@@ -0,0 +1,128 @@
+"""A stand-in MQTT broker, so the robot transport can be exercised without mosquitto."""
+import socket
+import socketserver
+import threading
+import time
+
+
+class StandInBroker:
+    """Accepts MQTT clients and records every message published to it."""
+
+    def __init__(self, port):
+        self.port = port
+        self.received = []
+        self._server = None
+        self._connections = set()
+        self._closed = False
+
+    def start(self):
+        broker = self
+        self._closed = False
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                broker._connections.add(self.request)
+                try:
+                    # A client accepted while stopping must still see the broker as down
+                    if not broker._closed:
+                        broker._serve(self.request)
+                except OSError:
+                    pass
+                finally:
+                    broker._connections.discard(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._closed = True
+        self._server.shutdown()
+        self._server.server_close()
+        for connection in list(self._connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)  # wakes the handler blocked in recv and sends FIN
+            except OSError:
+                pass
+            connection.close()
+
+    def payloads(self):
+        return [payload for topic, payload in self.received]
+
+    def _serve(self, sock):
+        while True:
+            header = self._read(sock, 1)
+            if header is None:
+                return
+            length, multiplier = 0, 1
+            while True:
+                byte = self._read(sock, 1)[0]
+                length += (byte & 0x7F) * multiplier
+                multiplier *= 128
+                if not byte & 0x80:
+                    break
+            body = self._read(sock, length) if length else b""
+            packet_type = header[0] >> 4
+
+            if packet_type == 1:  # CONNECT
+                sock.sendall(b"\x20\x02\x00\x00")
+            elif packet_type == 3:  # PUBLISH
+                qos = (header[0] >> 1) & 3
+                topic_length = int.from_bytes(body[:2], "big")
+                topic = body[2:2 + topic_length].decode()
+                offset = 2 + topic_length
+                if qos:
+                    mid = body[offset:offset + 2]
+                    offset += 2
+                self.received.append((topic, body[offset:].decode()))
+                if qos == 1:
+                    sock.sendall(b"\x40\x02" + mid)
+                elif qos == 2:
+                    sock.sendall(b"\x50\x02" + mid)
+            elif packet_type == 6:  # PUBREL
+                sock.sendall(b"\x70\x02" + body[:2])
+            elif packet_type == 12:  # PINGREQ
+                sock.sendall(b"\xd0\x00")
+            elif packet_type == 14:  # DISCONNECT
+                return
+
+    @staticmethod
+    def _read(sock, size):
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
@@ -0,0 +1,82 @@
+"""Transcripts with the commands they must produce, for the intent matcher."""
+import random
+
+# (transcript, [(action or direction, value)]); "stop" for a stop, value None for the default
+TRICKY = [
+    ("Go forward", [("forward", None)]),
+    ("Forward!", [("forward", None)]),
+    ("Thanks for the feedback", []),
+    ("Give me some feedback on that", []),
+    ("All right, let's see", []),
+    ("Stop right now", [("stop", None)]),
+    ("Turn right now", [("right", None)]),
+    ("Turn left 90 degrees", [("left", 90)]),
+    ("Turn left ninety degrees", [("left", 90)]),
+    ("Rotate right 45°", [("right", 45)]),
+    ("Ninety degrees to the left", [("left", 90)]),
+    ("Forward two meters", [("forward", 200)]),
+    ("Go forward 30 cm", [("forward", 30)]),
+    ("Move forward half a meter", [("forward", 50)]),
+    ("Go forward a meter", [("forward", 100)]),
+    ("Back up three feet", [("back", 91.44)]),
+    ("Reverse one hundred and twenty centimeters", [("back", 120)]),
+    ("Turn a hundred and eighty degrees right", [("right", 180)]),
+    ("Turn around", [("right", 180)]),
+    ("Don't go forward", []),
+    ("Do not turn left, turn right", [("right", None)]),
+    ("Don't stop", []),
+    ("Turn left then go forward", [("left", None), ("forward", None)]),
+    ("Go forward then turn left", [("forward", None), ("left", None)]),
+    ("Turn left 45 degrees and then go forward one meter and stop", [("left", 45), ("forward", 100)]),
+    ("Go forward, no, stop", [("forward", None), ("stop", None)]),
+    ("Halt", [("stop", None)]),
+    ("Could you please move backwards a little bit", [("back", None)]),
+    ("Straight ahead", [("forward", None)]),
+    ("Spin counter clockwise", [("left", None)]),
+    ("What's left to do today", []),
+    ("We left it on the table yesterday", []),
+    ("I'll be right back", []),
+    ("I think we should go forward", [("forward", None)]),
+]
+
+# Generated corpus pieces: direction -> spoken forms
+SPOKEN = {
+    "forward": ["forward", "go forward", "move forward", "straight ahead", "forwards", "advance", "go straight"],
+    "back": ["back", "go back", "backwards", "move back", "reverse", "back up"],
+    "left": ["left", "turn left", "go left", "rotate left", "to the left", "spin left"],
+    "right": ["right", "turn right", "go right", "rotate right", "to the right", "spin right"],
+    "stop": ["stop", "halt", "stop moving", "freeze", "stand still"],
+}
+PREFIXES = ["", "please ", "robot ", "hey robot ", "okay ", "can you ", "now ", "could you please "]
+SUFFIXES = ["", " please", " quickly", " slowly", " a little bit"]
+DISTANCES = [("ten centimeters", 10), ("20 cm", 20), ("one meter", 100), ("two meters", 200), ("half a meter", 50),
+             ("3 feet", 91.44), ("forty five centimeters", 45)]
+ANGLES = [("90 degrees", 90), ("forty five degrees", 45), ("a hundred and eighty degrees", 180), ("30°", 30)]
+CHATTER = [
+    "thanks for the feedback", "that's all right", "I'll be right back", "what's left for lunch",
+    "the weather is nice today", "is it working", "hmm let me think", "we left it on the table yesterday",
+    "that is not what I meant", "I want some feedback on this design", "yes that looks right to me",
+]
+
+
+def build_corpus(count, seed):
+    """[(transcript, expected direction or "stop" or None, expected value or None)]"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.15:
+            corpus.append((rng.choice(CHATTER), None, None))
+            continue
+        target = rng.choice(list(SPOKEN))
+        phrase = rng.choice(SPOKEN[target])
+        value = None
+        if target != "stop" and kind < 0.6:
+            spoken, value = rng.choice(ANGLES if target in ("left", "right") else DISTANCES)
+            phrase = f"{phrase} {spoken}"
+        if kind > 0.9 and target != "stop":
+            # A second command with a "then": the first is what match() acts on
+            other = rng.choice([d for d in SPOKEN if d not in (target, "stop")])
+            phrase = f"{phrase} then {rng.choice(SPOKEN[other])}"
+        corpus.append((rng.choice(PREFIXES) + phrase + rng.choice(SUFFIXES), target, value))
+    return corpus
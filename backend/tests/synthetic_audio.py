@@ -0,0 +1,117 @@
+"""Synthetic recordings for the voice activity detector and the upload pipeline."""
+import io
+import random
+import wave
+
+import numpy as np
+
+from app.vad import SpeechSegmenter
+
+SAMPLE_RATE = 16000
+BLOCK = SAMPLE_RATE // 10  # 0.1 s, as in voice_commands.py
+
+
+def speech_like(seconds, rng):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = rng.uniform(100, 220) * (1 + 0.05 * np.sin(2 * np.pi * 3 * t))  # gliding pitch
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voiced = sum(np.sin(n * phase) / n for n in range(1, 16))
+    syllables = 0.55 + 0.45 * np.sin(2 * np.pi * rng.uniform(3, 5) * t) ** 2
+    ramp = np.minimum(1, np.minimum(t, t[-1] - t) / 0.03)  # 30 ms attack and release
+    return (0.2 * voiced * syllables * ramp).astype(np.float32)
+
+
+def background(samples, rng):
+    t = np.arange(samples) / SAMPLE_RATE
+    hiss = rng.normal(0, 0.003, samples)  # about -50 dBFS
+    hum = 0.02 * np.sin(2 * np.pi * 50 * t)
+    return (hiss + hum).astype(np.float32)
+
+
+def build_recording(utterances, seed):
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+    parts, truth, position = [], [], 0
+    for _ in range(utterances):
+        pause = int(rng.uniform(1.0, 3.0) * SAMPLE_RATE)
+        speech = speech_like(rng.uniform(0.5, 1.5), rng)
+        parts += [np.zeros(pause, dtype=np.float32), speech]
+        truth.append((position + pause, position + pause + len(speech)))
+        position += pause + len(speech)
+    parts.append(np.zeros(2 * SAMPLE_RATE, dtype=np.float32))
+    audio = np.concatenate(parts)
+    return audio + background(len(audio), nrng), truth
+
+
+def to_wav(audio):
+    with io.BytesIO() as buffer:
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+        return buffer.getvalue()
+
+
+def read_wav(source):
+    with wave.open(source, "rb") as wav_file:
+        rate, channels, width = wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth()
+        raw = wav_file.readframes(wav_file.getnframes())
+    if width != 2:
+        raise ValueError("expected 16-bit PCM")
+    audio = np.frombuffer(raw, dtype=np.int16).reshape(-1, channels).mean(axis=1) / 32768
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(audio), rate / SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio)
+    return audio.astype(np.float32)
+
+
+def run(audio):
+    """Feed in mic-sized blocks; returns [(segment, stream seconds when emitted)]."""
+    segmenter = SpeechSegmenter(SAMPLE_RATE)
+    emitted = []
+    for offset in range(0, len(audio), BLOCK):
+        for segment in segmenter.feed(audio[offset:offset + BLOCK]):
+            emitted.append((segment, min(offset + BLOCK, len(audio)) / SAMPLE_RATE))
+    last = segmenter.flush()
+    if last is not None:
+        emitted.append((last, len(audio) / SAMPLE_RATE))
+    return emitted
+
+
+def synthetic_speech(rate, seconds, seed=1):
+    """Voiced bursts of 0.4-2 s (harmonics of a 110-220 Hz pitch) between 0.5-3 s of low noise.
+
+    Returns the signal and the (start, end) of each burst in seconds.
+    """
+    rng = np.random.RandomState(seed)
+    bursts = []
+    position = 0.5
+    while position < seconds - 2.5:
+        length = rng.uniform(0.4, 2.0)
+        bursts.append((position, position + length))
+        position += length + rng.uniform(0.5, 3.0)
+    t = np.arange(int(rate * seconds)) / rate
+    audio = 0.002 * rng.randn(len(t))
+    for start, end in bursts:
+        span = (t >= start) & (t < end)
+        pitch = rng.uniform(110, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t[span]) / k for k in range(1, 6))
+        audio[span] += 0.15 * voiced * np.hanning(span.sum())
+    return audio, bursts
+
+
+def wav_bytes(audio, rate, channels, width):
+    """Integer PCM WAV at any rate, channel count and 16- or 24-bit width."""
+    samples = np.repeat(audio[:, None], channels, axis=1).reshape(-1)
+    if width == 2:
+        frames = (samples * 32767).astype("<i2").tobytes()
+    else:
+        frames = (samples * (2 ** 23 - 1)).astype("<i4").view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(width)
+        out.setframerate(rate)
+        out.writeframes(frames)
+    return buffer.getvalue()
@@ -0,0 +1,80 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from app.audio_input import AudioFormatError, decode, prepare, resample
+from app.transcription import MAX_SEGMENT_S, SAMPLE_RATE
+from tests.synthetic_audio import synthetic_speech, wav_bytes
+
+
+def float_wav(samples):
+    """32-bit float WAV; the wave module only writes integer PCM, so patch the format tag."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(4)
+        out.setframerate(16000)
+        out.writeframes(np.asarray(samples, dtype="<f4").tobytes())
+    data = bytearray(buffer.getvalue())
+    data[20:22] = (3).to_bytes(2, "little")  # WAVE_FORMAT_IEEE_FLOAT
+    return bytes(data)
+
+
+@pytest.mark.parametrize("rate, channels, width, raw", [
+    (16000, 1, 2, False),
+    (44100, 2, 2, False),
+    (48000, 2, 3, False),
+    (48000, 1, 4, True),
+])
+def test_every_encoding_decodes_to_the_source(rate, channels, width, raw):
+    speech, _ = synthetic_speech(rate, 5)
+    if raw:
+        audio, decoded_rate, _ = decode(speech.astype("<f4").tobytes(), sample_rate=rate, encoding="f32le")
+    else:
+        audio, decoded_rate, _ = decode(wav_bytes(speech, rate, channels, width))
+    assert decoded_rate == rate
+    assert np.abs(audio - speech).max() < 1e-4
+
+
+def test_resampling_keeps_a_tone_where_it_was():
+    tone = np.sin(2 * np.pi * 1000 * np.arange(44100) / 44100).astype(np.float32)
+    resampled = resample(tone, 44100)
+    peak = np.argmax(np.abs(np.fft.rfft(resampled))) * SAMPLE_RATE / len(resampled)
+    assert len(resampled) == SAMPLE_RATE
+    assert abs(peak - 1000) <= 2
+
+
+def test_vad_keeps_every_burst_and_drops_most_gaps():
+    seconds = 60
+    speech, bursts = synthetic_speech(SAMPLE_RATE, seconds)
+    segments = prepare(wav_bytes(speech, SAMPLE_RATE, 1, 2)).segments
+    for start, end in bursts:
+        assert any(s.start_time <= start + 0.05 and s.end_time >= end - 0.05 for s in segments)
+    assert sum(segment.duration for segment in segments) < 0.6 * seconds
+
+
+def test_untrimmed_recording_is_split_into_whole_pieces():
+    speech, _ = synthetic_speech(SAMPLE_RATE, 3 * MAX_SEGMENT_S)
+    prepared = prepare(wav_bytes(speech, SAMPLE_RATE, 1, 2), trim=False)
+    assert len(prepared.segments) > 1
+    assert max(segment.duration for segment in prepared.segments) <= MAX_SEGMENT_S
+    assert sum(segment.duration for segment in prepared.segments) == prepared.duration
+
+
+@pytest.mark.parametrize("bad", [np.nan, np.inf, -np.inf])
+def test_non_finite_samples_are_rejected(bad):
+    samples = np.zeros(16000, dtype=np.float32)
+    samples[100] = bad
+    with pytest.raises(AudioFormatError):
+        prepare(samples.astype("<f4").tobytes(), encoding="f32le")
+    with pytest.raises(AudioFormatError):
+        prepare(float_wav(samples))
+
+
+def test_finite_float_samples_decode():
+    samples = np.linspace(-0.5, 0.5, 16000, dtype=np.float32)
+    audio, rate, channels = decode(float_wav(samples))
+    assert rate == 16000 and channels == 1
+    assert np.array_equal(audio, samples)
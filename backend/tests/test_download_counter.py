@@ -0,0 +1,88 @@
+import random
+import threading
+from collections import Counter
+
+import pytest
+
+from app.counters import DownloadCounter
+from app.database import init_db, pool, store_content
+from app.design_content import canonical_content
+
+DESIGNS = [f"counter-{i}" for i in range(10)]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def designs():
+    init_db()
+    content_hash, raw = canonical_content({})
+    with pool.connection() as conn, conn:
+        store_content(conn, content_hash, raw)
+        conn.executemany('''
+            INSERT OR IGNORE INTO designs (id, title, description, author, content_hash, created_at, tags, downloads)
+            VALUES (?, '', '', '', ?, '', '[]', 0)
+        ''', [(design_id, content_hash) for design_id in DESIGNS])
+
+
+@pytest.fixture
+def counter():
+    with pool.connection() as conn, conn:
+        conn.execute(f"UPDATE designs SET downloads = 0 WHERE id IN ({', '.join('?' * len(DESIGNS))})", DESIGNS)
+    counter = DownloadCounter(pool, flush_interval=0.005, flush_threshold=100)
+    counter.start()
+    yield counter
+    counter.stop()
+
+
+def stored_counts():
+    with pool.connection() as conn:
+        rows = conn.execute(f"SELECT id, downloads FROM designs WHERE id IN ({', '.join('?' * len(DESIGNS))})", DESIGNS)
+        return {row["id"]: row["downloads"] for row in rows}
+
+
+def test_concurrent_clicks_are_counted_exactly(counter):
+    expected = Counter()
+    lock = threading.Lock()
+
+    def clicks(seed):
+        rng = random.Random(seed)
+        local = Counter()
+        for _ in range(500):
+            # Skewed towards the first few (popular) designs
+            design_id = DESIGNS[min(int(rng.expovariate(0.5)), len(DESIGNS) - 1)]
+            counter.increment(design_id)
+            local[design_id] += 1
+        with lock:
+            expected.update(local)
+
+    workers = [threading.Thread(target=clicks, args=(n,)) for n in range(16)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    counter.stop()  # writes what is still pending
+    assert stored_counts() == {design_id: expected[design_id] for design_id in DESIGNS}
+
+
+def test_reads_never_count_a_batch_twice_or_miss_it(counter):
+    issued = 0
+    finished = threading.Event()
+
+    def clicks():
+        nonlocal issued
+        for _ in range(20000):
+            counter.increment(DESIGNS[0])
+            issued += 1
+        finished.set()
+
+    writer = threading.Thread(target=clicks)
+    writer.start()
+    reads = 0
+    while not finished.is_set():
+        before = issued
+        stored, pending = counter.read(stored_counts)
+        total = stored[DESIGNS[0]] + pending[DESIGNS[0]]
+        # The writer may be between increment() and counting it, hence the + 1
+        assert before <= total <= issued + 1
+        reads += 1
+    writer.join()
+    assert reads > 0
@@ -0,0 +1,32 @@
+import pytest
+
+from app.intents import INTENT_MIN_CONFIDENCE, IntentMatcher
+from tests.phrasings import TRICKY, build_corpus
+
+
+def describe(intent):
+    if intent.action == "stop":
+        return ("stop", None)
+    return (intent.direction, round(intent.value, 2) if intent.value is not None else None)
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return IntentMatcher()
+
+
+@pytest.mark.parametrize("text,expected", TRICKY)
+def test_tricky_phrasings(matcher, text, expected):
+    got = [describe(intent) for intent in matcher.parse(text) if intent.confidence >= INTENT_MIN_CONFIDENCE]
+    assert got == expected
+
+
+def test_generated_corpus_accuracy(matcher):
+    corpus = build_corpus(5000, seed=1)
+    wrong = []
+    for text, target, value in corpus:
+        intent = matcher.match(text)
+        got = describe(intent) if intent else (None, None)
+        if got != (target, round(value, 2) if value is not None else None):
+            wrong.append((text, target, value, got))
+    assert len(wrong) / len(corpus) <= 0.02, wrong[:10]
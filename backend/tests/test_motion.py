@@ -0,0 +1,122 @@
+import heapq
+import itertools
+import math
+import random
+
+from app.motion import ANGULAR_SPEED, MotionScheduler
+
+
+class FakeTimer:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeLoop:
+    """The parts of an asyncio loop the scheduler uses, on a manual clock."""
+
+    def __init__(self, late=lambda: 0.0):
+        self.now = 0.0
+        self.late = late
+        self._timers = []
+        self._order = itertools.count()
+
+    def time(self):
+        return self.now
+
+    def call_at(self, when, callback, *args):
+        timer = FakeTimer()
+        heapq.heappush(self._timers, (when, next(self._order), timer, callback, args))
+        return timer
+
+    def advance(self, seconds):
+        until = self.now + seconds
+        while self._timers and self._timers[0][0] <= until:
+            when, _, timer, callback, args = heapq.heappop(self._timers)
+            if timer.cancelled:
+                continue
+            self.now = max(self.now, when + self.late())
+            callback(*args)
+        self.now = max(self.now, until)
+
+
+def recorder(loop):
+    sent = []
+    return sent, lambda command: sent.append((round(loop.time(), 6), command))
+
+
+def test_command_times_on_an_exact_clock():
+    loop = FakeLoop()
+    sent, publish = recorder(loop)
+    scheduler = MotionScheduler(publish, control_rate=10, loop=loop)
+    forward = scheduler.move("forward", 10)
+    loop.advance(1)
+    assert sent == [(0.0, "forward"), (0.1, "forward"), (0.2, "forward"), (0.3, "forward"), (0.4, "forward"),
+                    (0.5, "stop")]
+    assert forward.status == "done" and forward.done.is_set()
+
+    sent.clear()
+    start = loop.time()
+    scheduler.move("left", 90)
+    loop.advance(5)
+    assert sent[-1][1] == "stop"
+    assert abs(sent[-1][0] - start - math.radians(90) / ANGULAR_SPEED) < 1e-6
+
+
+def test_late_loop_jitters_without_drift():
+    rng = random.Random(1)
+    period, late = 0.1, 0.005
+    loop = FakeLoop(late=lambda: rng.uniform(0, late))
+    sent, publish = recorder(loop)
+    scheduler = MotionScheduler(publish, control_rate=1 / period, loop=loop)
+    scheduler.move("forward", 500)  # 25 s at LINEAR_SPEED
+    loop.advance(30)
+    drive = [t for t, command in sent if command == "forward"]
+    errors = [t - n * period for n, t in enumerate(drive)]
+    assert len(drive) == math.ceil(25 / period)
+    assert all(-1e-9 <= error <= late + 1e-9 for error in errors)
+
+
+def test_stall_skips_missed_slots():
+    period = 0.1
+    loop = FakeLoop()
+    sent, publish = recorder(loop)
+    scheduler = MotionScheduler(publish, control_rate=1 / period, loop=loop)
+    scheduler.move("forward", 100)
+    loop.advance(period * 2)
+    loop.late = lambda: period * 3.5  # the slot-3 timer runs at 6.5 periods
+    loop.advance(period)
+    loop.late = lambda: 0.0
+    loop.advance(period * 3)
+    slots = [t / period for t, _ in sent]
+    assert len(slots) == 7
+    assert all(abs(a - b) < 1e-6 for a, b in zip(slots, [0, 1, 2, 6.5, 7, 8, 9]))
+
+
+def test_stop_preempts_at_once():
+    loop = FakeLoop()
+    sent, publish = recorder(loop)
+    scheduler = MotionScheduler(publish, control_rate=10, loop=loop)
+    move = scheduler.move("forward", 100)
+    loop.advance(0.25)
+    assert scheduler.stop() is move
+    loop.advance(10)
+    assert move.status == "preempted"
+    assert sent[-1] == (0.25, "stop")
+    assert scheduler.current is None
+
+
+def test_new_move_replaces_current():
+    loop = FakeLoop()
+    sent, publish = recorder(loop)
+    scheduler = MotionScheduler(publish, control_rate=10, loop=loop)
+    first = scheduler.move("forward", 100)
+    loop.advance(0.15)
+    switched = len(sent)
+    second = scheduler.move("right", 45)
+    loop.advance(10)
+    after = [command for _, command in sent[switched:]]
+    assert first.status == "preempted" and second.status == "done"
+    assert after[-1] == "stop" and set(after[:-1]) == {"right"}
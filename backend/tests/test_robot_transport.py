@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from app.robot_transport import MQTT_TOPIC, RobotTransport
+from tests.mqtt_broker import StandInBroker, free_port, wait_for
+
+
+@pytest.fixture
+def broker():
+    broker = StandInBroker(free_port())
+    yield broker
+    if broker._server is not None:
+        broker.stop()
+
+
+def transport_for(broker, **options):
+    transport = RobotTransport("127.0.0.1", broker.port, qos=1, reconnect_min=0.05, reconnect_max=0.2, **options)
+    transport.start()
+    return transport
+
+
+def test_queues_while_down_and_drains_stop_first(broker):
+    # No expiry: the broker may take a while to be picked up here
+    transport = transport_for(broker, command_ttl=0)
+    try:
+        for command in ["forward", "left", "stop", "right"]:
+            transport.publish(MQTT_TOPIC, command)
+        assert transport.queued() == 2 and not transport.connected
+
+        broker.start()
+        assert wait_for(lambda: transport.connected and len(broker.received) == 2)
+        assert broker.payloads() == ["stop", "right"]
+        assert transport.stats()["dropped"] == 2
+    finally:
+        transport.stop()
+
+
+@pytest.mark.parametrize("qos", [0, 1, 2])
+def test_delivers_in_order_at_each_qos(broker, qos):
+    broker.start()
+    transport = transport_for(broker)
+    try:
+        assert wait_for(lambda: transport.connected)
+        commands = [["forward", "back", "left", "right"][n % 4] for n in range(200)]
+        for command in commands:
+            transport.publish(MQTT_TOPIC, command, qos=qos)
+        assert wait_for(lambda: len(broker.received) == len(commands) and not transport.stats()["inflight"])
+        assert broker.payloads() == commands
+    finally:
+        transport.stop()
+
+
+def test_redelivers_after_broker_restart(broker):
+    broker.start()
+    transport = transport_for(broker, command_ttl=0)
+    try:
+        assert wait_for(lambda: transport.connected)
+        broker.stop()
+        assert wait_for(lambda: not transport.connected)
+        for command in ["left", "forward"]:
+            transport.publish(MQTT_TOPIC, command)
+        broker.start()
+        assert wait_for(lambda: broker.payloads() == ["left", "forward"])
+        assert transport.connects == 2
+    finally:
+        transport.stop()
+
+
+def test_stale_drive_commands_expire(broker):
+    transport = transport_for(broker, command_ttl=0.5)
+    try:
+        transport.publish(MQTT_TOPIC, "forward")
+        time.sleep(0.6)
+        transport.publish(MQTT_TOPIC, "right")
+        broker.start()
+        assert wait_for(lambda: broker.payloads() == ["right"])
+        assert transport.expired == 1
+    finally:
+        transport.stop()
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.audio_player import play_file
+from app.playback import PlaybackQueue
+
+
+def sleeping_player(seconds):
+    """Stands in for the speaker: a process that runs for the length of the clip."""
+    return lambda job, on_player: play_file(str(seconds), on_start=on_player, command=["sleep"])
+
+
+def test_event_loop_stays_free_while_the_queue_plays():
+    async def scenario():
+        queue = PlaybackQueue(sleeping_player(0.3))
+        queue.start()
+        jobs = [queue.submit(f"utterance {n}") for n in range(2)]
+        waits = []
+        while not jobs[-1].done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            waits.append(time.perf_counter() - started - 0.01)
+        await queue.stop()
+        return waits
+
+    waits = asyncio.run(scenario())
+    assert len(waits) > 10
+    assert max(waits) < 0.1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from app import main
+
+    logger = logging.getLogger("app")
+    level = logger.level
+    logger.setLevel(logging.ERROR)  # one "queued command: stop" line per request otherwise
+    monkeypatch.setattr(main.speech_queue, "speak", sleeping_player(0.3))
+    with TestClient(main.app) as client:
+        yield client
+    logger.setLevel(level)
+
+
+def test_stop_is_served_while_speech_plays(client):
+    from app import main
+
+    jobs = [client.post("/api/speak", json={"text": f"utterance {n}"}).json()["job_id"] for n in range(2)]
+    latencies, playing = [], 0
+    while client.get(f"/api/speak/{jobs[-1]}").json()["status"] in ("queued", "playing"):
+        playing += main.speech_queue.current is not None
+        started = time.perf_counter()
+        assert client.post("/api/stop").status_code == 200
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.02)
+    assert playing
+    assert max(latencies) < 0.25
@@ -0,0 +1,48 @@
+import io
+import random
+
+import numpy as np
+import pytest
+
+from app.vad import VAD_MAX_SEGMENT_S, VAD_OVERLAP_MS
+from tests.synthetic_audio import SAMPLE_RATE, background, build_recording, read_wav, run, speech_like, to_wav
+
+
+def recorded(utterances=20, seed=1):
+    audio, truth = build_recording(utterances, seed)
+    return run(read_wav(io.BytesIO(to_wav(audio)))), truth
+
+
+def test_each_utterance_in_one_segment_from_its_onset():
+    emitted, truth = recorded()
+    segments = [segment for segment, _ in emitted]
+    assert len(segments) == len(truth)
+    for start, end in truth:
+        covering = [s for s in segments if s.start <= start and s.start + len(s.audio) >= end]
+        assert len(covering) == 1
+
+
+def test_background_alone_opens_no_segment():
+    quiet = background(30 * SAMPLE_RATE, np.random.default_rng(1))
+    loud_hiss = np.random.default_rng(1).normal(0, 0.05, 30 * SAMPLE_RATE).astype(np.float32)
+    assert run(quiet) == []
+    assert run(loud_hiss) == []
+
+
+def test_long_utterance_is_split_with_overlap():
+    silence = np.zeros(SAMPLE_RATE, np.float32)
+    audio = np.concatenate([silence, speech_like(12, random.Random(1)), silence])
+    audio += background(len(audio), np.random.default_rng(1))
+    pieces = [segment for segment, _ in run(audio)]
+    assert len(pieces) == 3
+    assert all(piece.duration <= VAD_MAX_SEGMENT_S for piece in pieces)
+    for a, b in zip(pieces, pieces[1:]):
+        assert (a.start + len(a.audio) - b.start) / SAMPLE_RATE == pytest.approx(VAD_OVERLAP_MS / 1000)
+    assert [piece.split for piece in pieces] == [True, True, False]
+
+
+def test_segments_emitted_soon_after_speech_ends():
+    emitted, truth = recorded()
+    # Delay on the stream clock, in audio seconds, so it does not depend on the machine
+    delays = [at - end / SAMPLE_RATE for (_, at), (_, end) in zip(emitted, truth)]
+    assert max(delays) < 0.5
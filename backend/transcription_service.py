@@ -28,15 +28,21 @@ class Model:
 
     @modal.method()
     def transcribe(self, audio_url: str):
+        import subprocess
+
+        import numpy as np
         import requests
 
         response = requests.get(audio_url)
 
-        # Save the audio file locally
-        with open("downloaded_audio.wav", "wb") as audio_file:
-            audio_file.write(response.content)
+        # Decode to 16 kHz mono in memory through an ffmpeg pipe instead of a temp file
+        pcm = subprocess.run(
+            ["ffmpeg", "-nostdin", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", "16000", "-loglevel", "error", "pipe:1"],
+            input=response.content, capture_output=True, check=True,
+        ).stdout
+        audio = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768
 
-        result = self.model.transcribe("downloaded_audio.wav")
+        result = self.model.transcribe(audio)
         return result["text"]
 
 
@@ -1,25 +1,30 @@
 import sys
 import os
+import asyncio
+import threading
 import sounddevice as sd
 import numpy as np
-import paho.mqtt.client as mqtt
 import logging
 import time
-from io import BytesIO
-import wave
 import modal
 
+from app.robot_transport import MQTT_TOPIC, RobotTransport
+from app.motion import MotionScheduler
+from app.intents import INTENT_MIN_CONFIDENCE, IntentMatcher, motion_steps
+from app.vad import SpeechSegmenter
+from app.transcription import TRANSCRIBE_BACKEND, MicroBatcher, create_backend
+
 # Suppress unnecessary logging
 logging.basicConfig(level=logging.INFO)
 
 # ------------------------------------------------------------------------------------
 # Constants & Setup
 # ------------------------------------------------------------------------------------
-MQTT_BROKER_ADDRESS = "localhost"
-MQTT_TOPIC = "robot/drive"
 SAMPLE_RATE = 16000
 CHANNELS = 1  # Mono audio
-STREAM_CHUNK_DURATION = 3.0  # Duration for stream updates
+BLOCK_DURATION = 0.1  # seconds of audio per input callback
+VOICE_MOVE_DISTANCE = 20  # cm per "forward"/"back" (1 s at LINEAR_SPEED)
+VOICE_TURN_ANGLE = 90  # degrees per "left"/"right"
 
 # Modal setup
 image = (
@@ -45,95 +50,100 @@ class WhisperModel:
         self.model = whisper.load_model("tiny.en", device="cuda", download_root=CACHE_DIR)
 
     @modal.method()
-    def transcribe(self, audio_data: bytes):
-        with open("temp_audio.wav", "wb") as f:
-            f.write(audio_data)
-        result = self.model.transcribe("temp_audio.wav")
-        return result["text"]
+    def transcribe_batch(self, segments: list):
+        # 16-bit PCM at 16 kHz, decoded in memory
+        texts = []
+        for pcm in segments:
+            audio = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768
+            texts.append(self.model.transcribe(audio)["text"])
+        return texts
+
+# Shared robot transport (broker from MQTT_HOST/MQTT_PORT, reconnects on its own)
+robot = RobotTransport()
+robot.start()
+
+# Timed moves run on their own event loop so the audio callback never sleeps
+motion_loop = asyncio.new_event_loop()
+motion_thread = threading.Thread(target=motion_loop.run_forever, daemon=True)
+motion_thread.start()
+motion = MotionScheduler(lambda command: robot.publish(MQTT_TOPIC, command), loop=motion_loop)
 
-# Create MQTT client
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-client.connect(MQTT_BROKER_ADDRESS)
-client.loop_start()
+# Compiled once; maps a transcript to commands in microseconds
+intent_matcher = IntentMatcher()
+
+def shutdown_robot():
+    """Cut off any timed move, send a final stop and close the connection"""
+    motion_loop.call_soon_threadsafe(motion.stop)
+    motion_loop.call_soon_threadsafe(motion_loop.stop)
+    motion_thread.join(timeout=1.0)
+    robot.stop()
 
 def process_command(text):
-    """Process transcribed text and send appropriate MQTT commands"""
+    """Map transcribed text to motion commands"""
     if not text:
         return
-        
-    text = text.lower().strip()
-    command = None
-    
-    # Movement commands
-    if "forward" in text or "go forward" in text or "move forward" in text:
-        command = "forward"
-    elif "back" in text or "backward" in text or "go back" in text:
-        command = "back"
-    elif "left" in text or "turn left" in text:
-        command = "left"
-    elif "right" in text or "turn right" in text:
-        command = "right"
-    elif "stop" in text or "halt" in text:
-        command = "stop"
-    
-    if command:
-        print(f"\nExecuting: {command}")
-        client.publish(MQTT_TOPIC, command)
-        
-        # Automatically stop after movement commands (except 'stop' command)
-        if command != "stop":
-            time.sleep(1.0)  # Move for 1 second
-            client.publish(MQTT_TOPIC, "stop")
-            print("Stopping")
-
-def save_audio_chunk(audio_data, sample_rate):
-    """Save audio data to a WAV format bytes object"""
-    with BytesIO() as wav_buffer:
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(CHANNELS)
-            wav_file.setsampwidth(2)  # 16-bit audio
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes((audio_data * 32767).astype(np.int16).tobytes())
-        return wav_buffer.getvalue()
-
-def transcribe_audio(audio_data):
-    """Send audio data to Modal for transcription"""
+
+    intents = [intent for intent in intent_matcher.parse(text) if intent.confidence >= INTENT_MIN_CONFIDENCE]
+    if not intents:
+        return
+
+    if any(intent.action == "stop" for intent in intents):
+        print("\nExecuting: stop")
+        motion_loop.call_soon_threadsafe(motion.stop)
+        return
+
+    # The scheduler sends the stop once the moves are done
+    steps = motion_steps(intents, VOICE_MOVE_DISTANCE, VOICE_TURN_ANGLE)
+    print(f"\nExecuting: {', '.join(f'{direction} {value:g}' for direction, value in steps)}")
+    if len(steps) == 1:
+        motion_loop.call_soon_threadsafe(motion.move, *steps[0])
+    else:
+        motion_loop.call_soon_threadsafe(motion.run_sequence, steps)
+
+def handle_transcript(future):
+    """Act on a finished transcription (runs on the batcher thread)"""
     try:
-        whisper_model = WhisperModel()
-        result = whisper_model.transcribe.remote(audio_data)
-        return result
+        result = future.result()
     except Exception as e:
         print(f"Transcription error: {e}")
-        return None
+        return
+    if result:
+        print(result, end="\r")
+        sys.stdout.flush()
+        process_command(result)
 
 def transcribe():
     """Continuously transcribe audio and process commands"""
     try:
+        if TRANSCRIBE_BACKEND == "fake":
+            # Placeholder text never matches a command, so the robot would ignore every word
+            print("Error: TRANSCRIBE_BACKEND=fake is for tests and benchmarks; use local or modal")
+            return
+
         print("\nVoice Control Active!")
-        print("Commands: forward, back, left, right, stop")
+        print("Commands: forward, back, left, right, stop (e.g. \"turn left 45 degrees\", \"forward two meters\")")
         print("Press Ctrl+C to exit\n")
         
+        # One backend for the whole session; segments that end close together share a call
+        remote = WhisperModel().transcribe_batch.remote if TRANSCRIBE_BACKEND == "modal" else None
+        batcher = MicroBatcher(create_backend(TRANSCRIBE_BACKEND, remote))
+
+        # Only speech leaves the audio callback
+        segmenter = SpeechSegmenter(SAMPLE_RATE)
+
         def audio_callback(indata, frames, time, status):
             if status:
                 print(f"Status: {status}")
                 return
             
-            # Save audio chunk to WAV format
-            audio_data = indata.flatten()
-            wav_data = save_audio_chunk(audio_data, SAMPLE_RATE)
-            
-            # Send to Modal for transcription
-            result = transcribe_audio(wav_data)
-            if result:
-                print(result, end="\r")
-                sys.stdout.flush()
-                process_command(result)
+            for segment in segmenter.feed(indata[:, 0]):
+                batcher.submit(segment.audio).add_done_callback(handle_transcript)
 
         # Start audio stream
         with sd.InputStream(
             samplerate=SAMPLE_RATE,
             channels=CHANNELS,
-            blocksize=int(SAMPLE_RATE * STREAM_CHUNK_DURATION),
+            blocksize=int(SAMPLE_RATE * BLOCK_DURATION),
             callback=audio_callback
         ):
             print("Listening... Press Ctrl+C to stop")
@@ -146,18 +156,17 @@ def transcribe():
         print(f"Error: {e}")
     finally:
         # Clean up
-        client.publish(MQTT_TOPIC, "stop")
-        client.loop_stop()
-        client.disconnect()
+        shutdown_robot()
         print("Shutdown complete.")
 
 if __name__ == "__main__":
     try:
-        with stub.run():
+        if TRANSCRIBE_BACKEND == "modal":
+            with stub.run():
+                transcribe()
+        else:
             transcribe()
     except Exception as e:
         print(f"Error: {e}")
         # Ensure cleanup happens
-        client.publish(MQTT_TOPIC, "stop")
-        client.loop_stop()
-        client.disconnect()
\ No newline at end of file
+        shutdown_robot()
\ No newline at end of file
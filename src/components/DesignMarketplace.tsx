@@ -11,10 +11,12 @@ interface Design {
   title: string
   description: string
   author: string
-  content: any
+  content?: any
   created_at: string
   tags: string[]
   downloads: number
+  shape_count: number
+  node_types: string[]
 }
 
 interface DesignMarketplaceProps {
@@ -37,9 +39,10 @@ export function DesignMarketplace({ editor, onClose }: DesignMarketplaceProps) {
   const fetchDesigns = async () => {
     try {
       setLoading(true)
+      // The grid only needs summaries; content is fetched when a design is used
       const url = selectedTag 
-        ? `${API_BASE_URL}/api/designs?tag=${selectedTag}`
-        : `${API_BASE_URL}/api/designs`
+        ? `${API_BASE_URL}/api/designs?fields=summary&tag=${selectedTag}`
+        : `${API_BASE_URL}/api/designs?fields=summary`
       const response = await fetch(url)
       if (!response.ok) throw new Error('Failed to fetch designs')
       const data = await response.json()
@@ -103,8 +106,13 @@ export function DesignMarketplace({ editor, onClose }: DesignMarketplaceProps) {
         method: 'POST',
       })
 
+      // Fetch the full design content
+      const response = await fetch(`${API_BASE_URL}/api/designs/${design.id}`)
+      if (!response.ok) throw new Error('Failed to fetch design')
+      const fullDesign: Design = await response.json()
+
       // Load the design into the editor
-      editor.store.loadSnapshot(design.content)
+      editor.store.loadSnapshot(fullDesign.content)
       onClose()
     } catch (err) {
       console.error('Error using design:', err)
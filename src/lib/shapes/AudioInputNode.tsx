@@ -1,6 +1,30 @@
-import { BaseBoxShapeUtil } from '@tldraw/tldraw'
+import { BaseBoxShapeUtil, HTMLContainer } from '@tldraw/tldraw'
 import { AudioInputNodeShape } from '.'
 import * as React from 'react'
+import { transcribeAudio } from '../utils/audio'
+
+// Record float32 samples from the microphone until the returned function is called
+async function startRecording(): Promise<() => Promise<{ audio: Blob; sampleRate: number }>> {
+  const stream = await navigator.mediaDevices.getUserMedia({ audio: true })
+  const context = new AudioContext()
+  const source = context.createMediaStreamSource(stream)
+  const processor = context.createScriptProcessor(4096, 1, 1)
+  const chunks: Float32Array[] = []
+  processor.onaudioprocess = (event) => {
+    chunks.push(new Float32Array(event.inputBuffer.getChannelData(0)))
+  }
+  source.connect(processor)
+  processor.connect(context.destination)
+
+  return async () => {
+    processor.disconnect()
+    source.disconnect()
+    stream.getTracks().forEach(track => track.stop())
+    const sampleRate = context.sampleRate
+    await context.close()
+    return { audio: new Blob(chunks), sampleRate }
+  }
+}
 
 export class AudioInputNodeUtil extends BaseBoxShapeUtil<AudioInputNodeShape> {
   static type = 'audio_input'
@@ -19,26 +43,84 @@ export class AudioInputNodeUtil extends BaseBoxShapeUtil<AudioInputNodeShape> {
       width: shape.props.w,
       height: shape.props.h,
     }
+
+    const [state, setState] = React.useState<'idle' | 'recording' | 'transcribing'>('idle')
+    const stopRef = React.useRef<(() => Promise<{ audio: Blob; sampleRate: number }>) | null>(null)
+
+    const handleListen = React.useCallback(async (e: React.MouseEvent) => {
+      e.stopPropagation()
+      try {
+        if (state === 'idle') {
+          stopRef.current = await startRecording()
+          setState('recording')
+          return
+        }
+        if (state !== 'recording' || !stopRef.current) return
+
+        setState('transcribing')
+        const { audio, sampleRate } = await stopRef.current()
+        stopRef.current = null
+        // The browser records float32 PCM; the backend resamples it to 16 kHz and trims it to speech
+        const transcript = await transcribeAudio(audio, { sampleRate, encoding: 'f32le' })
+        this.editor?.updateShape<AudioInputNodeShape>({
+          id: shape.id,
+          type: 'audio_input',
+          props: {
+            ...shape.props,
+            command: transcript.text ?? '',
+          },
+        })
+      } catch (error) {
+        console.error('Error listening:', error)
+      }
+      setState(current => current === 'transcribing' ? 'idle' : current)
+    }, [shape, state])
     
     return (
-      <div
-        style={{
-          width: bounds.width,
-          height: bounds.height,
-          backgroundColor: '#dc2626',
-          borderRadius: '8px',
-          padding: '12px',
-          color: 'white',
-          display: 'flex',
-          flexDirection: 'column',
-          gap: '8px',
-        }}
-      >
-        <div style={{ fontWeight: 'bold' }}>{shape.props.title}</div>
-        <div>
-          Command: {shape.props.command || '<listening>'}
+      <HTMLContainer id={shape.id}>
+        <div
+          style={{
+            width: bounds.width,
+            height: bounds.height,
+            backgroundColor: '#dc2626',
+            borderRadius: '8px',
+            padding: '12px',
+            color: 'white',
+            display: 'flex',
+            flexDirection: 'column',
+            gap: '8px',
+          }}
+        >
+          <div
+            style={{
+              fontWeight: 'bold',
+              display: 'flex',
+              justifyContent: 'space-between',
+              alignItems: 'center',
+            }}
+          >
+            {shape.props.title}
+            <button
+              onClick={handleListen}
+              disabled={state === 'transcribing'}
+              style={{
+                backgroundColor: state === 'idle' ? '#ef4444' : '#991b1b',
+                border: 'none',
+                borderRadius: '4px',
+                padding: '4px 8px',
+                color: 'white',
+                cursor: state === 'transcribing' ? 'not-allowed' : 'pointer',
+                pointerEvents: 'all',
+              }}
+            >
+              {state === 'idle' ? 'Listen' : state === 'recording' ? 'Stop' : 'Transcribing...'}
+            </button>
+          </div>
+          <div>
+            Command: {shape.props.command || '<listening>'}
+          </div>
         </div>
-      </div>
+      </HTMLContainer>
     )
   }
 
@@ -52,4 +134,4 @@ export class AudioInputNodeUtil extends BaseBoxShapeUtil<AudioInputNodeShape> {
       />
     )
   }
-} 
\ No newline at end of file
+} 
@@ -1,7 +1,7 @@
 import { BaseBoxShapeUtil, HTMLContainer, stopEventPropagation, useValue, createShapeId, RecordProps, T, TLShape, TLArrowShape, TLTextShape, TLShapeId, TLBinding, Editor } from '@tldraw/tldraw'
 import { LLMNodeShape } from '.'
 import * as React from 'react'
-import { generateWithGemini } from '../utils/gemini'
+import { streamWithGemini } from '../utils/gemini'
 
 function getArrowBindings(editor: Editor, arrow: TLArrowShape) {
   return {
@@ -197,7 +197,12 @@ export class LLMNodeUtil extends BaseBoxShapeUtil<LLMNodeShape> {
 
       try {
         console.log('Calling Gemini API...')
-        const response = await generateWithGemini(completePrompt)
+        const response = await streamWithGemini(completePrompt, (partial) => {
+          // Show the response in connected text shapes as it streams in
+          if (this.editor) {
+            updateConnectedTextShapes(this.editor, shape.id, partial)
+          }
+        })
         console.log('Gemini response:', response)
         
         // Update any connected text shapes with the response
@@ -1,7 +1,7 @@
 import { BaseBoxShapeUtil, HTMLContainer, stopEventPropagation, Editor, TLShapeId } from '@tldraw/tldraw'
 import { MovementNodeShape } from '.'
 import * as React from 'react'
-import { sendMovementCommand } from '../utils/movement'
+import { sendMovementCommand, sendMovementSequence } from '../utils/movement'
 
 function getTextPointingToShape(editor: Editor, targetShapeId: TLShapeId): string[] {
   // Get all bindings where this shape is the target
@@ -46,6 +46,11 @@ function parseMovementCommand(text: string): { direction: string; value: number
   }
 }
 
+// Turns are in degrees and drives in cm, timed by the backend at its robot speeds
+function formatMoveValue(direction: string, value: number): string {
+  return direction === 'left' || direction === 'right' ? `${value}°` : `${value} cm`
+}
+
 /** @public */
 export class MovementNodeUtil extends BaseBoxShapeUtil<MovementNodeShape> {
   static type = 'movement'
@@ -82,11 +87,11 @@ export class MovementNodeUtil extends BaseBoxShapeUtil<MovementNodeShape> {
       const connectedTexts = getTextPointingToShape(this.editor!, shape.id)
       console.log('Connected texts:', connectedTexts)
 
-      // Parse the last movement command
-      const lastCommand = connectedTexts
+      // Parse the movement commands; the last one decides what is shown
+      const commands = connectedTexts
         .map(text => parseMovementCommand(text))
         .filter((cmd): cmd is { direction: string; value: number } => cmd !== null)
-        .pop()
+      const lastCommand = commands[commands.length - 1]
 
       if (!lastCommand) {
         console.log('No valid movement command found')
@@ -110,7 +115,10 @@ export class MovementNodeUtil extends BaseBoxShapeUtil<MovementNodeShape> {
       console.log("before try block")
       try {
         console.log("sending move command")
-        const response = await sendMovementCommand(lastCommand.direction, lastCommand.direction === 'stop' ? 0 : lastCommand.value)
+        // Several moves and no stop: send them as one sequence the backend times
+        const response = commands.length > 1 && commands.every(cmd => cmd.direction !== 'stop')
+          ? await sendMovementSequence(commands)
+          : await sendMovementCommand(lastCommand.direction, lastCommand.direction === 'stop' ? 0 : lastCommand.value)
         console.log('Movement response:', response)
 
         // Update node state
@@ -192,7 +200,7 @@ export class MovementNodeUtil extends BaseBoxShapeUtil<MovementNodeShape> {
                 Direction: {currentCommand.direction}
                 <br />
                 {currentCommand.direction !== 'stop' && (
-                  <>Value: {currentCommand.value} {currentCommand.direction === 'left' || currentCommand.direction === 'right' ? 'degrees' : 'cm'}</>
+                  <>Value: {formatMoveValue(currentCommand.direction, currentCommand.value)}, then stops</>
                 )}
               </>
             ) : (
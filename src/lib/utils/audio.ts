@@ -0,0 +1,47 @@
+import { API_BASE_URL } from './config'
+
+export interface AudioSegment {
+  start: number
+  end: number
+  text?: string
+}
+
+export interface AudioTranscript {
+  text: string | null
+  duration: number
+  speech_duration: number
+  segments: AudioSegment[]
+}
+
+// Raw PCM has no header, so its format goes in the query string
+export interface PcmFormat {
+  sampleRate: number
+  encoding: 's16le' | 'f32le'
+  channels?: number
+}
+
+// Send a recording (a WAV Blob, or raw PCM described by `pcm`) to be resampled, trimmed to speech and transcribed
+export async function transcribeAudio(audio: Blob, pcm?: PcmFormat): Promise<AudioTranscript> {
+  const query = pcm
+    ? `?sample_rate=${pcm.sampleRate}&encoding=${pcm.encoding}&channels=${pcm.channels ?? 1}`
+    : ''
+  const response = await fetch(`${API_BASE_URL}/api/audio${query}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': pcm ? 'application/octet-stream' : audio.type || 'audio/wav',
+    },
+    body: audio,
+  });
+
+  if (!response.ok) {
+    const errorText = await response.text()
+    console.error('Backend API error:', {
+      status: response.status,
+      statusText: response.statusText,
+      error: errorText
+    })
+    throw new Error(`HTTP error! status: ${response.status}, message: ${errorText}`);
+  }
+
+  return response.json();
+}
@@ -21,4 +21,55 @@ export async function generateWithGemini(prompt: string): Promise<string> {
     console.error('Error generating with backend:', error)
     return 'Error: Could not generate response'
   }
-} 
\ No newline at end of file
+} 
+
+export async function streamWithGemini(
+  prompt: string,
+  onToken: (textSoFar: string) => void
+): Promise<string> {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/generate/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ prompt }),
+    })
+
+    if (!response.ok || !response.body) {
+      throw new Error(`HTTP error! status: ${response.status}`)
+    }
+
+    // Parse Server-Sent Events: blocks of "event: x\ndata: {...}" separated by a blank line
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let text = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      let boundary
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+        const event = block.match(/^event: (.*)$/m)?.[1]
+        const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? '{}')
+        if (event === 'token') {
+          text += data.text
+          onToken(text)
+        } else if (event === 'done') {
+          text = data.response
+        } else if (event === 'error') {
+          throw new Error(data.detail)
+        }
+      }
+    }
+
+    return text
+  } catch (error) {
+    console.error('Error streaming from backend:', error)
+    return 'Error: Could not generate response'
+  }
+}
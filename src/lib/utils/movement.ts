@@ -39,4 +39,26 @@ export async function sendMovementCommand(direction: string, value: number) {
     console.error('Error sending movement command:', error);
     throw error;
   }
-} 
\ No newline at end of file
+} 
+// Runs every step on the server in one request, timed by the backend
+// instead of one /api/move round trip per step
+export async function sendMovementSequence(steps: { direction: string; value: number }[]) {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/move/sequence`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ steps }),
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('Error sending movement sequence:', error);
+    throw error;
+  }
+}